@@ -1,6 +1,13 @@
 import sys
 import crosscheck.main_train
+import crosscheck.main_worker
+import crosscheck.main_bench
 
 # Sort out relative imports
 if __name__ == "__main__":
-    crosscheck.main_train.main(sys.argv[1:])
+    if sys.argv[1:2] == ['worker']:
+        crosscheck.main_worker.main(sys.argv[2:])
+    elif sys.argv[1:2] == ['bench']:
+        crosscheck.main_bench.main(sys.argv[2:])
+    else:
+        crosscheck.main_train.main(sys.argv[1:])
@@ -0,0 +1,54 @@
+import argparse
+import multiprocessing
+import sys
+import time
+from crosscheck import definitions
+from crosscheck.game_env import get_genv, load_state
+
+
+def measure_fps(headless: bool, ram_decoder: bool = False, frames: int = 3600,
+                save_state: str = "ChiAtBuf-Faceoff.state") -> float:
+    """
+    Step the emulator with no buttons pressed, the same way training does
+    :param headless: Which kind of environment to create (see game_env.create_genv)
+    :param ram_decoder: True to decode the info with a RamDecoder
+    :param frames: The number of frames to step
+    :param save_state: The save state to start from
+    :return: Frames per second
+    """
+    env = get_genv(headless, ram_decoder)
+    load_state(env, definitions.SAVE_STATE_FOLDER / save_state)
+    env.reset()
+    action = [0] * len(env.buttons)
+
+    start = time.perf_counter()
+    for _ in range(frames):
+        _ob, _rew, _done, _info = env.step(action)
+    return frames / (time.perf_counter() - start)
+
+
+def compare(frames: int = 3600) -> dict:
+    """
+    Frames per second of both kinds of environment. Each runs in a fresh process since retro only
+    allows one emulator per process
+    """
+    results = {}
+    for label, headless, ram_decoder in [("full", False, False), ("headless", True, False),
+                                         ("ram-decoder", True, True)]:
+        with multiprocessing.Pool(1) as pool:
+            results[label] = pool.apply(measure_fps, (headless, ram_decoder, frames))
+    return results
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Emulator frames/s for each kind of training environment')
+    parser.add_argument('--frames', type=int, default=3600, help="The number of frames to step in each mode")
+    args = parser.parse_args(argv)
+
+    results = compare(args.frames)
+    for label, fps in results.items():
+        print("{:12}: {:8,.0f} frames/s ({:.2f}x)".format(label, fps, fps / results["full"]))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
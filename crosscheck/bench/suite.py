@@ -0,0 +1,217 @@
+import pathlib
+import random
+import tempfile
+import time
+import timeit
+from typing import Callable, Dict, List
+import neat
+import numpy as np
+from .. import definitions, discretizers
+from ..info_utils import offline, possession
+from ..info_utils.feature_vector import PlayersAndPuck, players_and_puck
+from ..info_utils.ram_decoder import DecodedInfo
+from ..info_utils.wrapper import InfoAccumulator, InfoWrapper
+from ..metascorekeeper.nudged_median import NudgedMedian
+from ..neat_.network import CompiledRecurrentNetwork, GeneratedRecurrentNetwork
+from ..neat_.trainer import Trainer
+from ..neat_.utils import CustomParallelEvaluator
+from ..scenario import Scenario
+from ..scorekeeper import string_to_class as scorekeeper_string_to_class
+from ..scorekeeper.game_scoring_1 import GameScoring1
+from .trace_env import TraceEnv, TraceEnvFactory
+
+# Save states for the macro-benchmark scenarios. TraceEnv plays the same trace for each
+SAVE_STATES = ("ChiAtBuf-Faceoff.state", "BufAtChi-Faceoff.state")
+
+
+def time_per_item(run: Callable[[], int], min_seconds: float = 0.2, repeat: int = 3) -> float:
+    """
+    :param run: Does the work, and returns the number of items it processed
+    :return: Nanoseconds per item, best of several runs
+    """
+    best = None
+    for _ in range(repeat):
+        items = 0
+        start = time.perf_counter()
+        while True:
+            items += run()
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_seconds:
+                break
+        per_item = elapsed / items * 1e9
+        best = per_item if best is None else min(best, per_item)
+    return best
+
+
+def micro_benchmarks(trace: List[dict], neat_config: neat.Config) -> Dict[str, Callable[[], int]]:
+    """
+    The hot-path functions, each run over the infos of the trace
+    :return: Name to function that runs the benchmark once and returns the number of calls made
+    """
+    infos = trace[:600]
+
+    def feature_vector():
+        for info in infos:
+            players_and_puck(info)
+        return len(infos)
+
+    features_object = PlayersAndPuck()
+
+    def feature_vector_object():
+        for info in infos:
+            features_object(info)
+        return len(infos)
+
+    index = {name: i for i, name in enumerate(infos[0])}
+    decoded_infos = [DecodedInfo(np.array([info[x] for x in index]), index) for info in infos]
+
+    def feature_vector_decoded():
+        for info in decoded_infos:
+            features_object(info)
+        return len(decoded_infos)
+
+    def player_w_puck():
+        for info in infos:
+            _ = InfoWrapper(info).player_w_puck
+        return len(infos)
+
+    def possession_player_w_puck():
+        for info in infos:
+            possession.player_w_puck(info)
+        return len(infos)
+
+    columns = {name: np.array([info[name] for info in infos]) for name in infos[0]}
+
+    def possessors():
+        possession.possessors(columns)
+        return len(infos)
+
+    def accumulate():
+        accumulator = InfoAccumulator()
+        for info in infos:
+            accumulator.info = info
+            accumulator.accumulate()
+        return len(infos)
+
+    def accumulate_trace():
+        offline.accumulate_trace(columns)
+        return len(infos)
+
+    def tick(scorekeeper_class=GameScoring1):
+        scorekeeper = scorekeeper_class()
+        for info in infos:
+            scorekeeper.info = info
+            scorekeeper.buttons_pressed = []
+            scorekeeper.tick()
+        _ = scorekeeper.score
+        return len(infos)
+
+    def spec_tick():
+        return tick(scorekeeper_string_to_class['game-scoring-1-spec'])
+
+    env = discretizers.Genesis2ButtonBc(TraceEnv({'trace': trace}))
+    rng = random.Random(0)
+    outputs = [[rng.random() for _ in range(env.button_count())] for _ in range(100)]
+
+    def discretizer():
+        for output in outputs:
+            env.action_labels(output)
+        return len(outputs)
+
+    genome = _mutated_genome(neat_config)
+    net = neat.nn.recurrent.RecurrentNetwork.create(genome, neat_config)
+    compiled_net = CompiledRecurrentNetwork.create(genome, neat_config)
+    generated_net = GeneratedRecurrentNetwork.create(genome, neat_config)
+    features = [players_and_puck(info) for info in infos]
+
+    def activate():
+        for feature in features:
+            net.activate(feature)
+        return len(features)
+
+    def compiled_activate():
+        for feature in features:
+            compiled_net.activate(feature)
+        return len(features)
+
+    def generated_activate():
+        for feature in features:
+            generated_net.activate(feature)
+        return len(features)
+
+    return {
+        'players_and_puck': feature_vector,
+        'PlayersAndPuck': feature_vector_object,
+        'PlayersAndPuck (DecodedInfo)': feature_vector_decoded,
+        'InfoWrapper.player_w_puck': player_w_puck,
+        'possession.player_w_puck': possession_player_w_puck,
+        'possession.possessors (trace)': possessors,
+        'InfoAccumulator.accumulate': accumulate,
+        'offline.accumulate_trace (trace)': accumulate_trace,
+        'GameScoring1.tick': tick,
+        'game-scoring-1-spec tick': spec_tick,
+        'Genesis2ButtonBc.action_labels': discretizer,
+        'RecurrentNetwork.activate': activate,
+        'CompiledRecurrentNetwork.activate': compiled_activate,
+        'GeneratedRecurrentNetwork.activate': generated_activate,
+    }
+
+
+def _mutated_genome(neat_config: neat.Config, mutations: int = 30) -> neat.DefaultGenome:
+    """
+    A genome with some hidden nodes and connections, like those later in training
+    """
+    random.seed(0)
+    genome = neat.DefaultGenome(0)
+    genome.configure_new(neat_config.genome_config)
+    for _ in range(mutations):
+        genome.mutate(neat_config.genome_config)
+    return genome
+
+
+def bench_trainer(env_factory: TraceEnvFactory, nproc: int = 1) -> Trainer:
+    scenarios = [Scenario(name, definitions.SAVE_STATE_FOLDER / name, GameScoring1) for name in SAVE_STATES]
+    return Trainer(scenarios, NudgedMedian, PlayersAndPuck(), {}, discretizer=discretizers.Genesis2ButtonBc,
+                   nproc=nproc, env_factory=env_factory)
+
+
+def neat_config(trainer: Trainer, pop_size: int = None) -> neat.Config:
+    if pop_size is not None:
+        trainer.neat_settings = {'NEAT': {'pop_size': pop_size}}
+    with tempfile.TemporaryDirectory() as folder:
+        filename = trainer._setup_neat_config(pathlib.Path(folder))
+        return neat.Config(neat.DefaultGenome, neat.DefaultReproduction, neat.DefaultSpeciesSet,
+                           neat.DefaultStagnation, filename)
+
+
+def macro_benchmark(env_factory: TraceEnvFactory, pop_size: int, nproc: int, lockstep: bool = False) -> dict:
+    """
+    Evaluate a random initial population the way training does
+    :param lockstep: True to play the genomes side by side in this process (nproc is ignored)
+    :return: Wall time, genomes per second and frames per second
+    """
+    trainer = bench_trainer(env_factory, nproc)
+    config = neat_config(trainer, pop_size)
+    random.seed(0)
+    genomes = list(neat.Population(config).population.items())
+
+    if lockstep:
+        evaluator = None
+        # The networks that can be merged into one per batch
+        trainer.network = 'compiled'
+        evaluate = trainer._eval_genomes_lockstep
+    elif nproc <= 1:
+        evaluator = None
+        evaluate = trainer._eval_genomes
+    else:
+        evaluator = CustomParallelEvaluator(nproc, trainer._eval_genome_parallel, stream=lambda x: None)
+        evaluate = evaluator.evaluate
+
+    start = time.perf_counter()
+    evaluate(genomes, config)
+    elapsed = time.perf_counter() - start
+    if evaluator is not None:
+        evaluator.close()
+
+    frames = sum(genome.metascorekeeper.eval_stats.get('frames', 0) for _, genome in genomes)
+    return {'seconds': elapsed, 'genomes_per_s': len(genomes) / elapsed, 'frames_per_s': frames / elapsed}
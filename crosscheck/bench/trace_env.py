@@ -0,0 +1,216 @@
+import gzip
+import json
+import pathlib
+import random
+from typing import Dict, List, Optional, Union
+import gym
+import numpy as np
+from .. import definitions
+from ..info_utils.wrapper import TEAMS, POSITIONS, DIMS
+
+# The buttons of retro's Genesis environment, in its order
+BUTTONS = ['B', 'A', 'MODE', 'START', 'UP', 'DOWN', 'LEFT', 'RIGHT', 'C', 'Y', 'X', 'Z']
+
+# Game clock at the opening faceoff, in seconds
+START_TIME = 600
+FRAMES_PER_SECOND = 60
+
+
+class _TraceEmulator:
+    """
+    The part of retro's emulator that the trainer uses: the state is just the position in the trace
+    """
+    def __init__(self, env: 'TraceEnv'):
+        self.env = env
+
+    def get_state(self) -> bytes:
+        return self.env.frame.to_bytes(4, 'little')
+
+    def set_state(self, state: bytes):
+        self.env.frame = int.from_bytes(state, 'little')
+
+
+class TraceEnv(gym.Env):
+    """
+    Stand-in for retro.RetroEnv that replays recorded infos, for measuring everything but the
+    emulator without the ROM. The actions are ignored, so every rollout of a save state sees the
+    same game. Once the trace runs out its last info is repeated
+    """
+    metadata = {'render.modes': []}
+    reward_range = (-float('inf'), float('inf'))
+
+    def __init__(self, traces: Dict[str, List[dict]], default: Optional[str] = None):
+        """
+        :param traces: The infos to replay, by save state name (file name without suffix)
+        :param default: The trace for save states that have none. Defaults to the first trace
+        """
+        self.traces = traces
+        self.default = default if default is not None else next(iter(traces))
+        self.buttons = list(BUTTONS)
+        self.action_space = gym.spaces.MultiBinary(len(self.buttons))
+        self.observation_space = gym.spaces.Box(low=0, high=255, shape=(1,), dtype=np.uint8)
+        self.em = _TraceEmulator(self)
+        self.initial_state = None
+        self.statename = None
+        self.frame = 0
+        self._observation = np.zeros(1, dtype=np.uint8)
+
+    def load_state(self, statename: str, inttype=None):
+        self.statename = statename
+        self.initial_state = b''
+
+    def reset(self):
+        self.frame = 0
+        return self._observation
+
+    @property
+    def trace(self) -> List[dict]:
+        name = pathlib.Path(str(self.statename)).stem
+        return self.traces.get(name, self.traces[self.default])
+
+    def step(self, action):
+        trace = self.trace
+        info = trace[min(self.frame, len(trace) - 1)]
+        self.frame += 1
+        # A new dictionary every step, as retro does
+        return self._observation, 0., self.frame >= len(trace), dict(info)
+
+    def render(self, mode='human'):
+        pass
+
+    def close(self):
+        pass
+
+
+class TraceEnvFactory:
+    """
+    Picklable environment factory for the trainer (Trainer.env_factory). Builds the TraceEnvs of
+    each process, from a trace file or from synthetic_trace()
+    """
+    _envs: Dict[tuple, TraceEnv] = {}
+
+    def __init__(self, trace_filename: Union[str, pathlib.Path, None] = None, frames: int = None, seed: int = 0):
+        """
+        :param trace_filename: A trace saved with save_traces. None for a synthetic trace
+        :param frames: The length of the synthetic trace
+        :param seed: The seed of the synthetic trace
+        """
+        self.trace_filename = None if trace_filename is None else str(trace_filename)
+        self.frames = frames
+        self.seed = seed
+
+    def __call__(self, index: int = 0) -> TraceEnv:
+        """
+        :param index: Which of the process's environments. They all share the same traces
+        """
+        key = (self.trace_filename, self.frames, self.seed)
+        env = self._envs.get(key + (index,))
+        if env is None:
+            first = self._envs.get(key + (0,))
+            if first is not None:
+                traces = first.traces
+            elif self.trace_filename is not None:
+                traces = load_traces(self.trace_filename)
+            else:
+                traces = {'synthetic': synthetic_trace(self.frames, self.seed)}
+            env = self._envs[key + (index,)] = TraceEnv(traces)
+        return env
+
+
+def save_traces(traces: Dict[str, List[dict]], filename: Union[str, pathlib.Path]):
+    with gzip.open(filename, 'wt') as f:
+        json.dump(traces, f)
+
+
+def load_traces(filename: Union[str, pathlib.Path]) -> Dict[str, List[dict]]:
+    with gzip.open(filename, 'rt') as f:
+        return json.load(f)
+
+
+def record_trace(save_state: str, frames: int, seed: int = 0) -> List[dict]:
+    """
+    Record the infos of the real game, pressing random buttons every 10 frames
+    :param save_state: The save state to start from, in the save state folder
+    :param frames: The number of frames to record
+    :param seed: The seed for the buttons
+    """
+    from ..game_env import get_genv, load_state
+
+    rng = random.Random(seed)
+    env = get_genv(headless=True)
+    load_state(env, definitions.SAVE_STATE_FOLDER / save_state)
+    env.reset()
+
+    trace = []
+    action = [0] * len(env.buttons)
+    for frame in range(frames):
+        if frame % 10 == 0:
+            action = [rng.random() < 0.2 for _ in env.buttons]
+        _, _, _, info = env.step(action)
+        trace.append({key: int(value) for key, value in info.items()})
+    return trace
+
+
+def synthetic_trace(frames: Optional[int] = None, seed: int = 0) -> List[dict]:
+    """
+    A made-up game in which the home team wins the faceoff and passes the puck around its players
+    until a minute has run off the clock. Every scorekeeper plays it to the end, so each rollout
+    is as long as the trace
+    :param frames: The length of the trace. Defaults to long enough for the clock to reach 9:00
+    :param seed: Seed for the player movement and the passes
+    """
+    if frames is None:
+        frames = (FRAMES_PER_SECOND + 1) * FRAMES_PER_SECOND
+    rng = random.Random(seed)
+
+    with open(definitions.SAVE_STATE_FOLDER / "data.json") as f:
+        blank = {name: 0 for name in json.load(f)['info']}
+
+    # Faceoff formation, with the away team further up the ice
+    players = {}
+    for team_index, team in enumerate(TEAMS):
+        for position_index, position in enumerate(POSITIONS):
+            players[(team, position)] = [(position_index - 2) * 20, 60 + 60 * team_index + (position_index % 3) * 10]
+
+    skaters = [x for x in POSITIONS if x != 'G']
+    possessor = ('home', 'C')
+    next_pass = FRAMES_PER_SECOND
+    in_flight = 0
+    pass_frames = 10
+
+    trace = []
+    for frame in range(frames):
+        for position in players.values():
+            position[0] = max(-100, min(100, position[0] + rng.randint(-1, 1)))
+            position[1] = max(0, min(256, position[1] + rng.randint(-1, 1)))
+
+        # Passes: the puck leaves the passer and is in flight for a few frames
+        if possessor is not None and frame >= next_pass:
+            passer = possessor
+            possessor = None
+            in_flight = pass_frames
+        elif possessor is None:
+            in_flight -= 1
+            if in_flight <= 0:
+                possessor = ('home', rng.choice([x for x in skaters if x != passer[1]]))
+                next_pass = frame + rng.randint(30, 90)
+
+        info = dict(blank)
+        for (team, position), coordinates in players.items():
+            for dim, value in zip(DIMS, coordinates):
+                info['player-{}-{}-{}'.format(team, position, dim)] = value
+
+        if possessor is not None:
+            puck = players[possessor]
+            info['player-w-puck-ice-x'], info['player-w-puck-ice-y'] = puck
+        else:
+            puck = players[passer]
+            # Nobody is where the possessor's position says
+            info['player-w-puck-ice-x'], info['player-w-puck-ice-y'] = -1000, -1000
+        info['puck-ice-x'], info['puck-ice-y'] = puck
+
+        info['time'] = START_TIME - frame // FRAMES_PER_SECOND
+        info['period'] = 1
+        trace.append(info)
+
+    return trace
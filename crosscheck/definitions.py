@@ -6,4 +6,16 @@ SAVE_STATE_FOLDER = ROOT_FOLDER / 'rom-layout'
 
 LOG_ROOT = ROOT_FOLDER / "log"
 
-NEW_SAVE_STATE_FOLDER = ROOT_FOLDER / "save-states-pending"
\ No newline at end of file
+NEW_SAVE_STATE_FOLDER = ROOT_FOLDER / "save-states-pending"
+
+def relative_save_state(filename) -> str:
+    """
+    :param filename: A save state
+    :return: Its path relative to SAVE_STATE_FOLDER, which is the same on every machine (or the path
+    itself if it's elsewhere)
+    """
+    path = pathlib.Path(str(filename))
+    try:
+        return path.relative_to(SAVE_STATE_FOLDER).as_posix()
+    except ValueError:
+        return str(path)
@@ -1,25 +1,191 @@
+import gzip
+import os
+import pathlib
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 from loguru import logger
 import retro
+from .info_utils.ram_decoder import RamDecoder
 
 class _Singleton:
     genv = None
+    mode = None
 
-def get_genv():
+def get_genv(headless: bool = False, ram_decoder: bool = False):
     """
     Get or create environment for this process. This is created once per process to save CPU
+    :param headless: True for an environment that doesn't produce screen observations (see create_genv)
+    :param ram_decoder: True to decode the info from RAM with a RamDecoder (see create_genv)
     :return: The environment
     """
+    mode = (headless, ram_decoder)
+    if _Singleton.genv is not None and _Singleton.mode != mode:
+        # Retro only allows one emulator per process
+        logger.debug("Replacing Game env")
+        _Singleton.genv.close()
+        _Singleton.genv = None
+
     if _Singleton.genv is None:
         logger.debug("Creating Game env")
-        _Singleton.genv = create_genv()
+        _Singleton.genv = create_genv(headless, ram_decoder)
+        _Singleton.mode = mode
     return _Singleton.genv
 
-def create_genv() -> retro.RetroEnv:
+def create_genv(headless: bool = False, ram_decoder: bool = False) -> retro.RetroEnv:
     """
     Create the environment.
+    :param headless: True to skip copying out the screen on every step. Observations are then the
+    RAM instead of an RGB frame, and the info is unaffected. Training never looks at the screen,
+    but movies and live play need it
+    :param ram_decoder: True to build the info with a RamDecoder instead of retro's per-variable
+    lookup. Only available headless. The info is then a DecodedInfo rather than a dict
     """
-    env = retro.make('Nhl94-Genesis',
-                     state=retro.State.NONE,
-                     inttype=retro.data.Integrations.ALL)
+    if not headless:
+        if ram_decoder:
+            raise ValueError("The RAM decoder requires a headless environment")
+        return retro.make('Nhl94-Genesis',
+                          state=retro.State.NONE,
+                          inttype=retro.data.Integrations.ALL)
+
+    # Same as retro.make(), but with the subclass
+    retro.data.get_romfile_path('Nhl94-Genesis', retro.data.Integrations.ALL)
+    env = HeadlessRetroEnv('Nhl94-Genesis',
+                           state=retro.State.NONE,
+                           inttype=retro.data.Integrations.ALL,
+                           obs_type=retro.Observations.RAM)
+    if ram_decoder:
+        env.decoder = RamDecoder.from_data_json()
 
     return env
+
+
+class HeadlessRetroEnv(retro.RetroEnv):
+    """
+    Environment whose observation is the RAM. Optionally builds the info from that same RAM with a
+    RamDecoder, skipping retro's lookup of each variable
+    """
+    decoder: Optional[RamDecoder] = None
+
+    def compute_step(self):
+        if self.decoder is None:
+            return super().compute_step()
+
+        reward = self.data.current_reward()
+        done = self.data.is_done()
+
+        # self.ram was filled in by the observation for this step
+        if not self.decoder.calibrated:
+            self.decoder.calibrate(self.ram, self.data.lookup_all())
+        return reward, done, self.decoder.decode_info(self.ram)
+
+
+class SaveStateCache:
+    """
+    Per-process cache of decompressed save states, so that each .state file is read and
+    gunzipped once instead of on every scenario reset. Anything preloaded before worker
+    processes are forked is inherited by the workers.
+    """
+    # Filename to decompressed state
+    states: Dict[str, bytes] = {}
+    # Filename to (modification time, size) of the file when it was read
+    _file_stats: Dict[str, Tuple[int, int]] = {}
+    hits = 0
+    misses = 0
+
+    @classmethod
+    def get(cls, filename: Union[str, pathlib.Path]) -> bytes:
+        """
+        Accessor for a decompressed save state, reading it on a miss
+        :param filename: The save state file
+        :return: The decompressed state
+        """
+        key = str(filename)
+        state = cls.states.get(key)
+        if state is None:
+            cls.misses += 1
+            state = cls._read(key)
+        else:
+            cls.hits += 1
+        return state
+
+    @classmethod
+    def preload(cls, filenames: Iterable[Union[str, pathlib.Path]]):
+        """
+        Read save states ahead of time. Call before creating worker processes
+        :param filenames: The save state files
+        """
+        for filename in filenames:
+            if str(filename) not in cls.states:
+                cls._read(str(filename))
+
+    @classmethod
+    def validate(cls) -> List[str]:
+        """
+        Check the cached states against the files on disk, dropping any that have changed
+        so that they are re-read on the next access
+        :return: The filenames that were stale
+        """
+        stale = []
+        for filename, file_stat in list(cls._file_stats.items()):
+            try:
+                current = cls._stat(filename)
+            except FileNotFoundError:
+                current = None
+            if current != file_stat:
+                stale.append(filename)
+                del cls.states[filename]
+                del cls._file_stats[filename]
+        return stale
+
+    @classmethod
+    def counters(cls) -> dict:
+        """
+        Statistics on the cache, for logging
+        """
+        return {
+            'states': len(cls.states),
+            'bytes': sum(len(x) for x in cls.states.values()),
+            'hits': cls.hits,
+            'misses': cls.misses,
+        }
+
+    @classmethod
+    def clear(cls):
+        cls.states.clear()
+        cls._file_stats.clear()
+        cls.hits = 0
+        cls.misses = 0
+
+    @classmethod
+    def _read(cls, filename: str) -> bytes:
+        file_stat = cls._stat(filename)
+        # Reading the whole file also checks the gzip CRC
+        with gzip.open(filename, 'rb') as f:
+            state = f.read()
+        if not state:
+            raise ValueError(f"Save state is empty: {filename}")
+        cls.states[filename] = state
+        cls._file_stats[filename] = file_stat
+        return state
+
+    @staticmethod
+    def _stat(filename: str) -> Tuple[int, int]:
+        file_stat = os.stat(filename)
+        return file_stat.st_mtime_ns, file_stat.st_size
+
+
+def load_state(env, filename: Union[str, pathlib.Path], eval_stats: dict = None):
+    """
+    Same as env.load_state(), but served from the SaveStateCache. Like env.load_state(), it takes
+    effect on the next env.reset()
+    :param env: The environment (wrappers are fine)
+    :param filename: The save state file
+    :param eval_stats: Statistics on the evaluation, where the cache hit or miss is counted. The cache
+    is per process, so this is how workers' counts reach the parent
+    """
+    env = env.unwrapped
+    misses = SaveStateCache.misses
+    env.initial_state = SaveStateCache.get(filename)
+    if eval_stats is not None:
+        key = 'save_state_misses' if SaveStateCache.misses > misses else 'save_state_hits'
+        eval_stats[key] = eval_stats.get(key, 0) + 1
+    env.statename = str(filename)
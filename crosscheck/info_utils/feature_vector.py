@@ -1,5 +1,9 @@
-from typing import List
-from .wrapper import TEAMS, POSITIONS, DIMS, InfoWrapper
+import abc
+import operator
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from .ram_decoder import DecodedInfo
+from .wrapper import TEAMS, POSITIONS, DIMS, FrameContext, InfoWrapper
 
 
 def players_and_puck(info: dict) -> List[float]:
@@ -27,7 +31,77 @@ def players_and_puck(info: dict) -> List[float]:
 
     return features
 
+
+class FeatureVector(abc.ABC):
+    """
+    Turns an info into the inputs of a network. Each call fills and returns the same buffer, so
+    copy it to keep it past the next call
+    """
+    dtype = np.float32
+
+    @property
+    @abc.abstractmethod
+    def names(self) -> Tuple[str, ...]:
+        """
+        Accessor for the name of each feature
+        """
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @abc.abstractmethod
+    def __call__(self, info: dict, context: FrameContext = None) -> np.ndarray:
+        """
+        :param context: The derived info of the frame, shared with the scorekeeper, if available
+        :return: The features of the info
+        """
+
+
+class PlayersAndPuck(FeatureVector):
+    """
+    Same features as players_and_puck(): all of the player positions, then the position of the
+    player with the puck, then the puck position
+    """
+    KEYS = tuple(['player-{}-{}-{}'.format(team, position, dim)
+                  for team in TEAMS for position in POSITIONS for dim in DIMS] +
+                 ['player-w-puck-ice-{}'.format(dim) for dim in DIMS] +
+                 ['puck-ice-{}'.format(dim) for dim in DIMS])
+    # players_and_puck() meant to end with whether anyone has the puck, but its check is always
+    # true. It is kept as a constant so trained networks keep their inputs
+    CONSTANT = 'constant-1'
+
+    def __init__(self):
+        self._buffer = np.zeros(len(self.KEYS) + 1, dtype=self.dtype)
+        self._buffer[-1] = 1
+        self._values = self._buffer[:-1]
+        self._getter = operator.itemgetter(*self.KEYS)
+        # The positions of the keys in a DecodedInfo's array, for the last index seen
+        self._decoded_index: Optional[Dict[str, int]] = None
+        self._decoded_positions: Optional[np.ndarray] = None
+
+    def __getstate__(self):
+        # Pickling would turn the view of the buffer into a copy, so build them anew instead
+        return {}
+
+    def __setstate__(self, state):
+        self.__init__()
+
+    @property
+    def names(self) -> Tuple[str, ...]:
+        return self.KEYS + (self.CONSTANT,)
+
+    def __call__(self, info: dict, context: FrameContext = None) -> np.ndarray:
+        if isinstance(info, DecodedInfo):
+            if info.index is not self._decoded_index:
+                self._decoded_positions = np.array([info.index[x] for x in self.KEYS], dtype=np.intp)
+                self._decoded_index = info.index
+            self._values[:] = info.array[self._decoded_positions]
+        else:
+            self._values[:] = self._getter(info)
+        return self._buffer
+
+
 # Hash to convert a string to a class ctor
 string_to_class = {
-    'players_and_puck': players_and_puck
+    'players_and_puck': PlayersAndPuck
 }
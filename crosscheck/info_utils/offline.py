@@ -0,0 +1,113 @@
+import dataclasses
+from typing import Dict, Mapping, Optional
+import numpy as np
+from . import possession
+from .wrapper import HOME, AWAY, NO_TEAM, POSSESSOR_TEAMS, TEAM_CODES, TIME_PER_FRAME
+
+_POSSESSOR_TEAMS = np.array(POSSESSOR_TEAMS, dtype=np.intp)
+
+
+@dataclasses.dataclass
+class EpisodeStats:
+    """
+    What InfoAccumulator has accumulated by the end of a trace, plus the timelines it was built from
+    """
+    # Index in possession.PLAYERS of the player with the puck in each frame, -1 for no one
+    possessors: np.ndarray
+    # Index in possession.PLAYERS of each player that received the puck, in order (see PossessionHistory)
+    possessions: np.ndarray
+    # InfoAccumulator.has_play_stopped_after_game_start after each frame
+    play_stopped: np.ndarray
+    time_puck: Dict[Optional[str], float]
+    pass_completions: Dict[str, int]
+    steal_count: Dict[str, int]
+    pass_attempts: Dict[str, int]
+    max_puck_y: int
+    max_shooter_y: int
+
+    @property
+    def has_play_stopped_after_game_start(self) -> bool:
+        return bool(self.play_stopped[-1]) if len(self.play_stopped) else False
+
+
+def _previous(values: np.ndarray, first) -> np.ndarray:
+    """
+    :return: The values shifted one frame later, starting with first
+    """
+    previous = np.empty_like(values)
+    previous[0] = first
+    previous[1:] = values[:-1]
+    return previous
+
+
+def _team_counts(teams: np.ndarray) -> Dict[str, int]:
+    counts = np.bincount(teams, minlength=NO_TEAM + 1)
+    return {'home': int(counts[HOME]), 'away': int(counts[AWAY])}
+
+
+def _time(frame_count: int, frames: int) -> float:
+    # Summed frame by frame, as the accumulator does, so the rounding is the same
+    if not frame_count:
+        return 0.0
+    return np.cumsum(np.full(frame_count, TIME_PER_FRAME * frames))[-1].item()
+
+
+def accumulate_trace(columns: Mapping, frames: int = 1) -> EpisodeStats:
+    """
+    Same as feeding every frame of a trace to InfoAccumulator.accumulate(), all at once
+    :param columns: The info variables of a trace, a column per variable (e.g. an Episode)
+    :param frames: The number of frames each row of the trace stands for (see InfoAccumulator.accumulate)
+    """
+    possessors = possession.possessors(columns)
+    count = len(possessors)
+    if not count:
+        return EpisodeStats(possessors=possessors, possessions=possessors, play_stopped=np.zeros(0, dtype=bool),
+                            time_puck={'home': 0.0, None: 0.0, 'away': 0.0},
+                            pass_completions={'home': 0, 'away': 0}, steal_count={'home': 0, 'away': 0},
+                            pass_attempts={'home': 0, 'away': 0}, max_puck_y=0, max_shooter_y=0)
+
+    teams = _POSSESSOR_TEAMS[possessors]
+    last_frame = _previous(possessors, -1)
+    last_frame_teams = _POSSESSOR_TEAMS[last_frame]
+
+    # The last player to hold the puck before each frame, -1 until someone has
+    held = np.maximum.accumulate(np.where(possessors >= 0, np.arange(count), -1))
+    last_possessor = _previous(np.where(held >= 0, possessors[held], -1), -1)
+
+    # The possession changes, as classified by InfoAccumulator.accumulate()
+    got = (possessors >= 0) & (last_frame < 0)
+    caught_own_pass = got & (possessors == last_possessor)
+    lost = (possessors < 0) & (last_frame >= 0)
+    stolen_directly = (possessors >= 0) & (last_frame >= 0) & (possessors != last_frame)
+    received = (got & ~caught_own_pass) | stolen_directly
+
+    # A pass if the last player was a teammate, a steal otherwise. Nothing if it's the first possession
+    after_possession = received & (last_possessor >= 0)
+    same_team = teams == _POSSESSOR_TEAMS[last_possessor]
+    completed = teams[after_possession & same_team]
+    stolen = teams[after_possession & ~same_team]
+    attempts = _team_counts(last_frame_teams[lost | stolen_directly])
+    caught = _team_counts(teams[caught_own_pass])
+
+    # How long since the clock last changed, in frames
+    time = np.asarray(columns['time'])
+    ticked = np.ones(count, dtype=bool)
+    ticked[1:] = time[1:] != time[:-1]
+    last_tick = np.maximum.accumulate(np.where(ticked, np.arange(count), 0))
+    play_stopped = (time < 600) & ((np.arange(count) - last_tick) * frames > 120)
+
+    puck_y = np.asarray(columns['puck-ice-y'])
+    shooter_y = puck_y[teams == HOME]
+
+    return EpisodeStats(
+        possessors=possessors,
+        possessions=possessors[received],
+        play_stopped=play_stopped,
+        time_puck={team: _time(int(np.count_nonzero(teams == TEAM_CODES[team])), frames)
+                   for team in ('home', None, 'away')},
+        pass_completions=_team_counts(completed),
+        steal_count=_team_counts(stolen),
+        pass_attempts={team: attempts[team] - caught[team] for team in attempts},
+        max_puck_y=max(puck_y.max().item(), 0),
+        max_shooter_y=max(shooter_y.max().item(), 0) if len(shooter_y) else 0,
+    )
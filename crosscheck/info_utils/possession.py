@@ -0,0 +1,134 @@
+import operator
+from typing import Mapping
+import numpy as np
+
+TEAMS = ('home', 'away')
+POSITIONS = ('LW', 'C', 'RW', 'LD', 'RD', 'G')
+DIMS = ('x', 'y')
+
+# Every player, in the order they are checked for the puck (the first one close enough has it)
+PLAYERS = tuple((team, position) for team in TEAMS for position in POSITIONS)
+PLAYER_KEYS = tuple('player-{}-{}-{}'.format(team, position, dim) for team, position in PLAYERS for dim in DIMS)
+PUCK_KEYS = tuple('player-w-puck-ice-{}'.format(dim) for dim in DIMS)
+
+# Found empirically that the pixel can be off by two (as an L1 distance)
+MAX_DISTANCE = 2
+
+_player_values = operator.itemgetter(*PLAYER_KEYS)
+_puck_values = operator.itemgetter(*PUCK_KEYS)
+
+
+def player_positions(info: Mapping) -> np.ndarray:
+    """
+    :param info: An info, or the columns of a recorded trace (e.g. an Episode)
+    :return: The player positions as (teams, positions, dims), with a leading frame axis for a trace
+    """
+    values = np.array([info[x] for x in PLAYER_KEYS], dtype=np.int32)
+    positions = values.reshape((len(TEAMS), len(POSITIONS), len(DIMS)) + values.shape[1:])
+    return np.moveaxis(positions, (0, 1, 2), (-3, -2, -1))
+
+
+def puck_position(info: Mapping) -> np.ndarray:
+    """
+    :param info: An info, or the columns of a recorded trace (e.g. an Episode)
+    :return: The position of the player with the puck as (dims), with a leading frame axis for a trace
+    """
+    return np.moveaxis(np.array([info[x] for x in PUCK_KEYS], dtype=np.int32), 0, -1)
+
+
+def possessor_indices(positions: np.ndarray, puck: np.ndarray) -> np.ndarray:
+    """
+    Find who has the puck in any number of frames at once
+    :param positions: Player positions, (..., teams, positions, dims)
+    :param puck: The position of the player with the puck, (..., dims)
+    :return: The index in PLAYERS of the player with the puck, or -1 for no one, for each frame
+    """
+    distance = np.abs(positions - puck[..., np.newaxis, np.newaxis, :]).sum(axis=-1)
+    close = (distance <= MAX_DISTANCE).reshape(distance.shape[:-2] + (len(PLAYERS),))
+    return np.where(close.any(axis=-1), close.argmax(axis=-1), -1)
+
+
+def possessors(info: Mapping) -> np.ndarray:
+    """
+    :param info: The columns of a recorded trace (e.g. an Episode), or a single info
+    :return: The index in PLAYERS of the player with the puck, or -1 for no one, for each frame
+    """
+    return possessor_indices(player_positions(info), puck_position(info))
+
+
+def possessor(info: Mapping) -> int:
+    """
+    Same as InfoWrapper.player_w_puck, as an index. A single frame is too small for NumPy to pay
+    off, so the players are scanned with the keys looked up all at once
+    :return: The index in PLAYERS of the player with the puck, or -1 if no one has it
+    """
+    puck_x, puck_y = _puck_values(info)
+    values = _player_values(info)
+    for i in range(len(PLAYERS)):
+        if abs(values[2 * i] - puck_x) + abs(values[2 * i + 1] - puck_y) <= MAX_DISTANCE:
+            return i
+    return -1
+
+
+def as_player_w_puck(index: int) -> dict:
+    """
+    :param index: The index in PLAYERS of the player with the puck, or -1 for no one
+    :return: 'team' and 'pos' of the player with the puck. Empty if no one has it
+    """
+    if index < 0:
+        return {}
+    team, position = PLAYERS[index]
+    return {'team': team, 'pos': position}
+
+
+def player_w_puck(info: Mapping) -> dict:
+    """
+    Same as InfoWrapper.player_w_puck, without the loops over labels
+    :return: 'team' and 'pos' of the player with the puck. Empty if no one has it
+    """
+    return as_player_w_puck(possessor(info))
+
+
+class PossessionHistory:
+    """
+    The latest players to get the puck, oldest first, in a fixed-size ring buffer so that long
+    scenarios don't grow without bound
+    """
+    def __init__(self, capacity: int = 1024):
+        """
+        :param capacity: The number of possessions kept. Older ones are dropped
+        """
+        self._indices = np.zeros(capacity, dtype=np.int8)
+        self._total = 0
+
+    @property
+    def total(self) -> int:
+        """
+        Accessor for the number of possessions ever appended, including those dropped
+        """
+        return self._total
+
+    def append(self, index: int):
+        """
+        :param index: The index in PLAYERS of the player that got the puck
+        """
+        self._indices[self._total % len(self._indices)] = index
+        self._total += 1
+
+    def __len__(self) -> int:
+        return min(self._total, len(self._indices))
+
+    def indices(self) -> np.ndarray:
+        """
+        :return: The index in PLAYERS of each kept possession, oldest first
+        """
+        if self._total <= len(self._indices):
+            return self._indices[:self._total].copy()
+        start = self._total % len(self._indices)
+        return np.concatenate((self._indices[start:], self._indices[:start]))
+
+    def __iter__(self):
+        """
+        :return: (team, position) of each kept possession, oldest first
+        """
+        return (PLAYERS[x] for x in self.indices().tolist())
@@ -0,0 +1,147 @@
+import collections.abc
+import json
+import pathlib
+from typing import Dict, Iterator, List, Optional
+import numpy as np
+from .. import definitions
+
+DATA_JSON = definitions.SAVE_STATE_FOLDER / "data.json"
+
+# Where the 64KB of 68000 work RAM starts in the Genesis address space. Addresses in data.json are
+# absolute
+GENESIS_RAM_BASE = 0xFF0000
+
+
+class DecodedInfo(collections.abc.Mapping):
+    """
+    Drop-in replacement for the info dict from retro, backed by the array from RamDecoder.decode
+    """
+    __slots__ = ('array', 'index', '_values')
+
+    def __init__(self, array: np.ndarray, index: Dict[str, int]):
+        self.array = array
+        self.index = index
+        # Plain ints are faster to hand out one at a time than array elements
+        self._values: Optional[List[int]] = None
+
+    def __getitem__(self, key: str) -> int:
+        if self._values is None:
+            self._values = self.array.tolist()
+        return self._values[self.index[key]]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.index)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __getstate__(self):
+        return self.array, self.index
+
+    def __setstate__(self, state):
+        self.array, self.index = state
+        self._values = None
+
+
+class RamDecoder:
+
+    def __init__(self, variables: Dict[str, dict], ram_base: int = GENESIS_RAM_BASE):
+        """
+        Decode all of the variables in a retro data.json straight from env.get_ram() in a handful
+        of vectorized operations, instead of retro's per-variable lookup
+        :param variables: The "info" section of a data.json: name -> {address, type[, mask]}
+        :param ram_base: The address of the first byte of RAM
+        """
+        self.names = tuple(variables.keys())
+        self.index = {name: i for i, name in enumerate(self.names)}
+
+        offsets = []
+        widths = []
+        signed = []
+        masks = []
+        for name in self.names:
+            spec = variables[name]
+            dtype = np.dtype(spec['type'])
+            if dtype.itemsize not in (1, 2) or dtype.kind not in 'iu':
+                raise ValueError(f"Unsupported type for {name}: {spec['type']}")
+            offsets.append(spec['address'] - ram_base)
+            widths.append(dtype.itemsize)
+            signed.append(dtype.kind == 'i')
+            masks.append(spec.get('mask', (1 << (8 * dtype.itemsize)) - 1))
+
+        self._offsets = np.array(offsets, dtype=np.intp)
+        widths = np.array(widths)
+        # Multiplier for the high byte (0 for single byte values, whose "high byte" is the same byte)
+        self._high_multiplier = np.where(widths == 2, 256, 0).astype(np.int32)
+        self._low_delta = np.where(widths == 2, 1, 0).astype(np.intp)
+        self._masks = np.array(masks, dtype=np.int32)
+        # Values at or above the sign bit wrap to negative
+        sign_bits = np.where(widths == 2, 1 << 15, 1 << 7)
+        self._sign_bits = np.where(signed, sign_bits, 1 << 30).astype(np.int32)
+        self._sign_wrap = (self._sign_bits * 2).astype(np.int32)
+
+        # Byte order of the RAM from the emulator. The Genesis core keeps RAM as native 16-bit words,
+        # so on little endian hosts the bytes within each word are swapped. Settled by calibrate()
+        self.swap_bytes = False
+        self.calibrated = False
+        self._set_byte_indices()
+
+        # Reused between calls
+        self._high = np.empty(len(self.names), dtype=np.uint8)
+        self._low = np.empty(len(self.names), dtype=np.uint8)
+        self._sign = np.empty(len(self.names), dtype=np.int32)
+
+    @classmethod
+    def from_data_json(cls, filename: pathlib.Path = DATA_JSON) -> 'RamDecoder':
+        with open(filename) as f:
+            return cls(json.load(f)['info'])
+
+    def _set_byte_indices(self):
+        high = self._offsets
+        low = self._offsets + self._low_delta
+        if self.swap_bytes:
+            high = high ^ 1
+            low = low ^ 1
+        self._high_index = high
+        self._low_index = low
+
+    def decode(self, ram: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        """
+        :param ram: The RAM, as bytes (uint8)
+        :param out: Where to write, or None to allocate. The values are the same as retro's info,
+        in the order of self.names
+        :return: out
+        """
+        if out is None:
+            out = np.empty(len(self.names), dtype=np.int32)
+        np.take(ram, self._high_index, out=self._high)
+        np.take(ram, self._low_index, out=self._low)
+        np.multiply(self._high, self._high_multiplier, out=out)
+        np.add(out, self._low, out=out)
+        np.bitwise_and(out, self._masks, out=out)
+        np.greater_equal(out, self._sign_bits, out=self._sign)
+        np.multiply(self._sign, self._sign_wrap, out=self._sign)
+        np.subtract(out, self._sign, out=out)
+        return out
+
+    def decode_info(self, ram: np.ndarray) -> DecodedInfo:
+        """
+        Decode into a fresh info. Infos are kept around by scorekeepers (and snapshots of them), so
+        they are never reused
+        """
+        return DecodedInfo(self.decode(ram), self.index)
+
+    def calibrate(self, ram: np.ndarray, info: dict):
+        """
+        Settle the byte order by comparing against an info dict from retro for the same RAM
+        :raise ValueError: If neither byte order reproduces the info
+        """
+        expected = np.array([info[name] for name in self.names])
+        for swap_bytes in (self.swap_bytes, not self.swap_bytes):
+            self.swap_bytes = swap_bytes
+            self._set_byte_indices()
+            if np.array_equal(self.decode(ram), expected):
+                self.calibrated = True
+                return
+        mismatched = [name for name, a, b in zip(self.names, self.decode(ram), expected) if a != b]
+        raise ValueError(f"RAM decoder does not match retro's info for: {mismatched}")
@@ -0,0 +1,309 @@
+import itertools
+import json
+import operator
+import os
+import pathlib
+import time
+import uuid
+from typing import Dict, Iterator, List, Optional, Union
+import numpy as np
+from .ram_decoder import DATA_JSON, DecodedInfo
+
+MAGIC = b'CCREC001'
+SUFFIX = '.ccrec'
+# Columns start on multiples of this, so that they can be viewed in place
+ALIGNMENT = 64
+
+# Smallest first
+_INTEGER_TYPES = [np.dtype(x) for x in ('i1', 'u1', 'i2', 'u2', 'i4', 'u4', 'i8')]
+
+# Numbers the episodes written by this process. Per process rather than per recorder, since the
+# recorder is pickled along with the trainer for every genome a pool worker evaluates
+_episode_numbers = itertools.count()
+# Tells apart processes that reuse the same pid (e.g. recycled pool workers)
+_process_token = None
+_process_token_pid = None
+
+
+def _episode_filename(folder: pathlib.Path) -> pathlib.Path:
+    """
+    :return: A new file name in the folder, unique across processes and recorders
+    """
+    global _process_token, _process_token_pid
+    pid = os.getpid()
+    if _process_token_pid != pid:
+        # First episode of this process (including a forked child of a process that had one)
+        _process_token = uuid.uuid4().hex[:8]
+        _process_token_pid = pid
+    return folder / "episode-{}-{}-{:06d}{}".format(pid, _process_token, next(_episode_numbers), SUFFIX)
+
+
+def find_aliases(data_json: Union[str, pathlib.Path] = DATA_JSON) -> Dict[str, str]:
+    """
+    Variables in data.json that read the same memory the same way as an earlier variable
+    :return: Alias name to the name of the variable it duplicates
+    """
+    with open(data_json) as f:
+        variables = json.load(f)['info']
+    first = {}
+    aliases = {}
+    for name, spec in variables.items():
+        key = (spec['address'], spec['type'], spec.get('mask'))
+        if key in first:
+            aliases[name] = first[key]
+        else:
+            first[key] = name
+    return aliases
+
+
+def _smallest_dtype(column: np.ndarray) -> np.dtype:
+    if column.dtype.kind not in 'iu':
+        return column.dtype
+    if not len(column):
+        return _INTEGER_TYPES[0]
+    low, high = column.min(), column.max()
+    for dtype in _INTEGER_TYPES:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return dtype
+    return column.dtype
+
+
+class EpisodeRecorder:
+    """
+    Listener (see Trainer.listeners) that records every frame of an episode: the info variables,
+    the buttons chosen and the score vector. Each episode is written to its own file by
+    end_episode(), one typed column per variable so the file can be memory mapped (see Episode).
+    Recording only keeps references to the values; the columns are built when the episode ends.
+    Variables at the same address in data.json are stored once
+    """
+
+    def __init__(self, folder: Union[str, pathlib.Path], data_json: Optional[pathlib.Path] = DATA_JSON):
+        """
+        :param folder: Where to write the episodes
+        :param data_json: Used to store variables that are aliases of each other once. None to store all
+        """
+        self.folder = pathlib.Path(folder)
+        self.aliases = find_aliases(data_json) if data_json is not None else {}
+        self._reset()
+
+    def _reset(self):
+        self._names: Optional[List[str]] = None
+        self._getter = None
+        self._infos = []
+        self._buttons = []
+        self._scores = []
+        self._score_vectors = []
+
+    def __getstate__(self):
+        # Recordings in progress stay in their process
+        state = dict(self.__dict__)
+        state.update(_names=None, _getter=None, _infos=[], _buttons=[], _scores=[], _score_vectors=[])
+        return state
+
+    def __call__(self, ob, rew, done, info, stats: dict):
+        if self._names is None:
+            self._names = list(info)
+            self._getter = operator.itemgetter(*self._names)
+
+        if isinstance(info, DecodedInfo):
+            self._infos.append(info.array)
+        else:
+            self._infos.append(self._getter(info))
+
+        scorekeeper = stats['scorekeeper']
+        self._buttons.append(scorekeeper.buttons_pressed)
+        self._scores.append(scorekeeper.score)
+        self._score_vectors.append(scorekeeper.score_vector)
+
+    def end_episode(self, metadata: dict = None) -> Optional[pathlib.Path]:
+        """
+        Write the episode recorded since the last call
+        :param metadata: Anything JSON-serializable to keep with the episode (e.g. the scenario)
+        :return: The file written, or None if there were no frames
+        """
+        if not self._infos:
+            self._reset()
+            return None
+
+        columns = {}
+        groups = {}
+
+        if isinstance(self._infos[0], np.ndarray):
+            rows = np.stack(self._infos)
+        else:
+            rows = np.array(self._infos).reshape(len(self._infos), -1)
+        recorded = {name: rows[:, i] for i, name in enumerate(self._names)}
+
+        # Only store aliases once, if they really are the same
+        aliases = {}
+        for name, column in recorded.items():
+            original = self.aliases.get(name)
+            if original in recorded and np.array_equal(column, recorded[original]):
+                aliases[name] = original
+            else:
+                columns[name] = column
+                groups[name] = 'info'
+
+        # Buttons as bit masks, in the order they were first pressed
+        button_names = []
+        masks = np.zeros(len(self._buttons), dtype=np.int64)
+        for frame, pressed in enumerate(self._buttons):
+            for button in pressed:
+                if button not in button_names:
+                    button_names.append(button)
+                masks[frame] |= 1 << button_names.index(button)
+        columns['buttons'] = masks
+        groups['buttons'] = 'action'
+
+        columns['score'] = np.array(self._scores, dtype=np.float64)
+        groups['score'] = 'score'
+        score_names = []
+        for vector in self._score_vectors:
+            for key in vector:
+                if key not in score_names:
+                    score_names.append(key)
+        for key in score_names:
+            columns['score-' + key] = np.array([x.get(key, np.nan) for x in self._score_vectors], dtype=np.float32)
+            groups['score-' + key] = 'score_vector'
+
+        self.folder.mkdir(parents=True, exist_ok=True)
+        filename = _episode_filename(self.folder)
+        write_episode(filename, columns, groups, {
+            'aliases': aliases,
+            'buttons': button_names,
+            'metadata': metadata or {},
+            # Seconds since the epoch, to order episodes recorded by different processes
+            'recorded': time.time(),
+        })
+        self._reset()
+        return filename
+
+
+def episode_metadata(scenario, scorekeeper) -> dict:
+    """
+    What to keep about an episode of a scenario, for EpisodeRecorder.end_episode
+    """
+    return {
+        'scenario': scenario.name,
+        'save_state': pathlib.Path(str(scenario.save_state)).name,
+        'action_repeat': scenario.action_repeat,
+        'score': float(scorekeeper.score),
+        'done_reasons': [key for key, value in scorekeeper.done_reasons().items() if value],
+    }
+
+
+def write_episode(filename: Union[str, pathlib.Path], columns: Dict[str, np.ndarray], groups: Dict[str, str],
+                  extra: dict):
+    """
+    Write the columns of an episode. Integer columns are stored in the smallest type that holds them
+    """
+    frames = len(next(iter(columns.values())))
+    arrays = {name: np.ascontiguousarray(column, dtype=_smallest_dtype(np.asarray(column)).newbyteorder('<'))
+              for name, column in columns.items()}
+
+    # The header has the offsets of the columns, which depend on the length of the header
+    header_size = ALIGNMENT
+    while True:
+        offset = _align(len(MAGIC) + 4 + header_size)
+        layout = []
+        for name, array in arrays.items():
+            layout.append({'name': name, 'dtype': array.dtype.str, 'offset': offset, 'group': groups[name]})
+            offset = _align(offset + array.nbytes)
+        header = json.dumps(dict(extra, frames=frames, columns=layout)).encode()
+        if len(header) <= header_size:
+            break
+        header_size = _align(len(header))
+
+    with open(filename, 'wb') as f:
+        f.write(MAGIC)
+        f.write(header_size.to_bytes(4, 'little'))
+        f.write(header.ljust(header_size))
+        for column, array in zip(layout, arrays.values()):
+            f.seek(column['offset'])
+            f.write(array.tobytes())
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _read_header(filename: pathlib.Path) -> dict:
+    with open(filename, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"Not a recorded episode: {filename}")
+        header_size = int.from_bytes(f.read(4), 'little')
+        return json.loads(f.read(header_size))
+
+
+class Episode:
+    """
+    A recorded episode. The columns are memory mapped, so nothing is read until it is used
+    """
+
+    def __init__(self, filename: Union[str, pathlib.Path]):
+        self.filename = pathlib.Path(filename)
+        header = _read_header(self.filename)
+
+        self.frames: int = header['frames']
+        self.metadata: dict = header['metadata']
+        self.buttons: List[str] = header['buttons']
+        self.aliases: Dict[str, str] = header['aliases']
+        # When it was recorded, in seconds since the epoch (0 if unknown)
+        self.recorded: float = header.get('recorded', 0.0)
+        self._columns = {x['name']: x for x in header['columns']}
+        self._data = np.memmap(self.filename, dtype=np.uint8, mode='r') if self.frames else None
+
+    def _group(self, group: str) -> List[str]:
+        return [name for name, column in self._columns.items() if column['group'] == group]
+
+    @property
+    def info_names(self) -> List[str]:
+        """
+        All the info variables, including aliases
+        """
+        return self._group('info') + list(self.aliases)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        """
+        :return: A column (e.g. an info variable, 'buttons', 'score') as a read-only array
+        """
+        column = self._columns[self.aliases.get(name, name)]
+        dtype = np.dtype(column['dtype'])
+        if self._data is None:
+            # Nothing to map for an episode without frames
+            empty = np.zeros(0, dtype=dtype)
+            empty.flags.writeable = False
+            return empty
+        start = column['offset']
+        return self._data[start:start + self.frames * dtype.itemsize].view(dtype)
+
+    def info(self, frame: int) -> dict:
+        """
+        The info of one frame, as retro would have returned it
+        """
+        return {name: self[name][frame].item() for name in self.info_names}
+
+    def buttons_pressed(self, frame: int) -> List[str]:
+        mask = int(self['buttons'][frame])
+        return [button for bit, button in enumerate(self.buttons) if mask & (1 << bit)]
+
+    @property
+    def score_vector(self) -> Dict[str, np.ndarray]:
+        return {name[len('score-'):]: self[name] for name in self._group('score_vector')}
+
+
+def read_episodes(path: Union[str, pathlib.Path]) -> Iterator[Episode]:
+    """
+    Lazily open the recorded episodes in a folder (or a single episode file), in the order they were recorded
+    """
+    path = pathlib.Path(path)
+    if path.is_file():
+        yield Episode(path)
+        return
+    # The file names only give the order within a process (see _episode_filename), so order by
+    # the time in the headers
+    filenames = sorted(path.glob('*' + SUFFIX))
+    recorded = {x: _read_header(x).get('recorded', 0.0) for x in filenames}
+    for filename in sorted(filenames, key=recorded.get):
+        yield Episode(filename)
@@ -1,6 +1,8 @@
-TEAMS = ('home', 'away')
-POSITIONS = ('LW', 'C', 'RW', 'LD', 'RD', 'G')
-DIMS = ('x', 'y')
+from collections.abc import Mapping
+import numpy as np
+from . import possession
+from .possession import TEAMS, POSITIONS, DIMS
+
 TIME_PER_FRAME  = 1.0 / 60
 
 
@@ -49,6 +51,13 @@ class InfoWrapper:
 
         return {}
 
+    @property
+    def possessor(self) -> int:
+        """
+        Same as player_w_puck, as an index in possession.PLAYERS. -1 if no possessor
+        """
+        return possession.possessor(self.info)
+
     @property
     def puck_adjusted_away_goalie_x(self):
         return min(max(self.info['puck-ice-x'], -self.GOALIE_MAX_X), self.GOALIE_MAX_X)
@@ -69,8 +78,133 @@ class InfoWrapper:
         return 100
 
 
+class FrameContext(InfoWrapper):
+    """
+    InfoWrapper for a single frame, computing each derived quantity at most once. The trainer
+    creates one per step and shares it between the feature vector and the scorekeeper, so the
+    info must not be replaced afterwards
+    """
+
+    def __init__(self, info: dict = None):
+        super().__init__(info)
+        self._possessor = None
+        self._player_w_puck = None
+        self._delta_puck_away_goalie_x = None
+        self._delta_puck_away_net_y = None
+
+    @property
+    def possessor(self) -> int:
+        if self._possessor is None:
+            self._possessor = possession.possessor(self.info)
+        return self._possessor
+
+    @property
+    def player_w_puck(self):
+        if self._player_w_puck is None:
+            self._player_w_puck = possession.as_player_w_puck(self.possessor)
+        return self._player_w_puck
+
+    @property
+    def delta_puck_away_goalie_x(self):
+        if self._delta_puck_away_goalie_x is None:
+            self._delta_puck_away_goalie_x = InfoWrapper.delta_puck_away_goalie_x.fget(self)
+        return self._delta_puck_away_goalie_x
+
+    @property
+    def delta_puck_away_net_y(self):
+        if self._delta_puck_away_net_y is None:
+            self._delta_puck_away_net_y = InfoWrapper.delta_puck_away_net_y.fget(self)
+        return self._delta_puck_away_net_y
+
+
+# Integer codes of the teams, as indexed by the accumulator's counters (None is for no team)
+HOME, AWAY, NO_TEAM = 0, 1, 2
+TEAM_CODES = {'home': HOME, 'away': AWAY, None: NO_TEAM}
+# The team code of each possessor index (see possession.PLAYERS), with -1 (no one) last
+POSSESSOR_TEAMS = tuple(TEAM_CODES[team] for team, _ in possession.PLAYERS) + (NO_TEAM,)
+
+
+class TeamValues(Mapping):
+    """
+    Read-only view of a per-team list of the accumulator, by team name
+    """
+    __slots__ = ('_values', '_codes')
+
+    def __init__(self, values: list, teams: tuple):
+        """
+        :param values: Indexed by team code
+        :param teams: The team names in the view, in order
+        """
+        self._values = values
+        self._codes = {team: TEAM_CODES[team] for team in teams}
+
+    def __getitem__(self, team):
+        return self._values[self._codes[team]]
+
+    def __iter__(self):
+        return iter(self._codes)
+
+    def __len__(self):
+        return len(self._codes)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class StreakHistory:
+    """
+    The lengths of the latest streaks of a team, oldest first, in a fixed-size ring buffer (like
+    possession.PossessionHistory) so that long scenarios don't grow without bound
+    """
+    __slots__ = ('_lengths', '_total')
+
+    def __init__(self, capacity: int = 64):
+        """
+        :param capacity: The number of streaks kept. Older ones are dropped
+        """
+        # Starts with an empty streak
+        self._lengths = np.zeros(capacity, dtype=np.int32)
+        self._total = 1
+
+    @property
+    def total(self) -> int:
+        """
+        Accessor for the number of streaks ever started, including those dropped
+        """
+        return self._total
+
+    def start(self):
+        """
+        Start a new streak of length 0
+        """
+        self._lengths[self._total % len(self._lengths)] = 0
+        self._total += 1
+
+    def extend(self):
+        """
+        Add one to the length of the current streak
+        """
+        self._lengths[(self._total - 1) % len(self._lengths)] += 1
+
+    def tolist(self) -> list:
+        """
+        :return: The length of each kept streak, oldest first (a copy)
+        """
+        if self._total <= len(self._lengths):
+            return self._lengths[:self._total].tolist()
+        start = self._total % len(self._lengths)
+        return self._lengths[start:].tolist() + self._lengths[:start].tolist()
+
+
 class InfoAccumulator:
+    # Not pickled: the latest frame is set again before the next accumulate(), and the views are rebuilt
+    _UNPICKLED = ('wrapper', 'time_puck', 'pass_completions', 'steal_count', 'pass_attempts')
 
+    __slots__ = ('wrapper', '_time_puck', '_pass_completions', '_steal_count', '_pass_attempts',
+                 'time_puck', 'pass_completions', 'steal_count', 'pass_attempts',
+                 '_last_frame_possessor', '_last_possessor', '_possession_history',
+                 '_consecutive_passes', '_unique_passes', '_passing_team', '_unique_passers',
+                 '_max_puck_y', '_max_shooter_y', '_frame_counter', '_last_tick_frame', '_last_time')
 
     def __init__(self):
         """
@@ -78,38 +212,29 @@ class InfoAccumulator:
         """
 
         self.wrapper = InfoWrapper()
-        self.time_puck = {
-            'home': 0.0,
-            None: 0.0,
-            'away': 0.0,
-        }
 
-        self.pass_completions = {
-            'home': 0,
-            'away': 0,
-        }
+        # Counters indexed by team code, with views by team name
+        self._time_puck = [0.0, 0.0, 0.0]
+        self._pass_completions = [0, 0]
+        self._steal_count = [0, 0]
+        self._pass_attempts = [0, 0]
+        self._make_views()
 
-        self.steal_count = {
-            'home': 0,
-            'away': 0,
-        }
+        # Indicates who had the puck in the last frame (an index in possession.PLAYERS, or -1)
+        self._last_frame_possessor = -1
 
-        self.pass_attempts = {
-            'home': 0,
-            'away': 0,
-        }
-
-        # Indicates who had the puck in the last frame
-        self._last_frame_player_w_puck = {}
-
-        # Possessor is guaranteed to be the last player that held it. Will only be null at the start
-        self._last_possessor = {}
+        # Possessor is guaranteed to be the last player that held it. Will only be -1 at the start
+        self._last_possessor = -1
 
         # Chronological order, earliest at the start
-        self._possession_history = {
-            'team': [],
-            'pos': [],
-        }
+        self._possession_history = possession.PossessionHistory()
+
+        # Consecutive pass stats, updated with each possession (see consecutive_passes)
+        self._consecutive_passes = {'home': StreakHistory(), 'away': StreakHistory()}
+        self._unique_passes = {'home': StreakHistory(), 'away': StreakHistory()}
+        # The team of the latest possession, and the players of the current unique streak
+        self._passing_team = None
+        self._unique_passers = set()
 
         self._max_puck_y = 0
         self._max_shooter_y = 0
@@ -118,55 +243,117 @@ class InfoAccumulator:
         self._last_tick_frame = 0
         self._last_time = None
 
+    def _make_views(self):
+        self.time_puck = TeamValues(self._time_puck, ('home', None, 'away'))
+        self.pass_completions = TeamValues(self._pass_completions, ('home', 'away'))
+        self.steal_count = TeamValues(self._steal_count, ('home', 'away'))
+        self.pass_attempts = TeamValues(self._pass_attempts, ('home', 'away'))
+
+    def __getstate__(self):
+        """
+        Only the counters are pickled, so the size doesn't depend on the frame or episode length
+        """
+        return {name: getattr(self, name) for name in self.__slots__ if name not in self._UNPICKLED}
+
+    def __setstate__(self, state: dict):
+        for name, value in state.items():
+            setattr(self, name, value)
+        self.wrapper = InfoWrapper()
+        self._make_views()
+
     @property
     def info(self):
         return self.wrapper.info
 
     @info.setter
     def info(self, info):
-        self.wrapper.info = info
+        self.wrapper = FrameContext(info)
+
+    @property
+    def context(self) -> FrameContext:
+        """
+        Accessor for the derived info of the latest frame
+        """
+        return self.wrapper
+
+    @context.setter
+    def context(self, context: FrameContext):
+        self.wrapper = context
+
+    def _mark_received_puck(self, possessor: int):
+        team = POSSESSOR_TEAMS[possessor]
 
-    def _mark_received_puck(self, player_w_puck):
         # Make sure this isn't an initial possession
-        if self._last_possessor:
-            if player_w_puck['team'] == self._last_possessor['team']:
+        if self._last_possessor >= 0:
+            if team == POSSESSOR_TEAMS[self._last_possessor]:
                 # via pass
-                self.pass_completions[player_w_puck['team']] += 1
+                self._pass_completions[team] += 1
             else:
                 # via turnover
-                self.steal_count[player_w_puck['team']] += 1
+                self._steal_count[team] += 1
+
+        self._possession_history.append(possessor)
+        self._count_consecutive_pass(*possession.PLAYERS[possessor])
+
+    def _count_consecutive_pass(self, cur_team, cur_pos):
+        if self._passing_team is None:
+            # The first possession
+            self._unique_passers = {cur_pos}
+        elif cur_team == self._passing_team:
+            self._consecutive_passes[cur_team].extend()
+
+            # Track consecutive unique passes. As soon as the unique streak is broken, the entire set is reset
+            if cur_pos in self._unique_passers:
+                self._unique_passers = {cur_pos}
+                self._unique_passes[cur_team].start()
+            else:
+                self._unique_passers.add(cur_pos)
+                self._unique_passes[cur_team].extend()
 
-        self._possession_history['team'].append(player_w_puck['team'])
-        self._possession_history['pos'].append(player_w_puck['pos'])
+                # If everyone has touched the puck (all 6 players) then reset the unique set
+                if len(self._unique_passers) >= 6:
+                    self._unique_passers = set()
+        else:
+            self._consecutive_passes[cur_team].start()
+            self._unique_passes[cur_team].start()
+            self._unique_passers = set()
 
-    def _mark_caught_own_pass(self, player_w_puck):
-        self.pass_attempts[player_w_puck['team']] -= 1
+        self._passing_team = cur_team
+
+    def _mark_caught_own_pass(self, possessor: int):
+        self._pass_attempts[POSSESSOR_TEAMS[possessor]] -= 1
 
     def _mark_lost_puck(self):
         # Note: Very loose definition of pass
-        self.pass_attempts[self._last_frame_player_w_puck['team']] += 1
+        self._pass_attempts[POSSESSOR_TEAMS[self._last_frame_possessor]] += 1
 
-    def accumulate(self):
+    def accumulate(self, frames: int = 1):
+        """
+        Incorporate the latest info
+        :param frames: The number of frames the latest info stands for (more than 1 when
+        frames are skipped between calls)
+        """
 
-        player_w_puck = self.wrapper.player_w_puck
+        possessor = self.wrapper.possessor
+        team = POSSESSOR_TEAMS[possessor]
 
         # Accumulate time with the puck
-        self.time_puck[player_w_puck.get('team')] += TIME_PER_FRAME
+        self._time_puck[team] += TIME_PER_FRAME * frames
 
         # Someone just got the puck
-        if player_w_puck and not self._last_frame_player_w_puck:
-            if self._last_possessor and all([player_w_puck[key] == self._last_possessor[key] for key in player_w_puck.keys()]):
-                self._mark_caught_own_pass(player_w_puck)
+        if possessor >= 0 and self._last_frame_possessor < 0:
+            if possessor == self._last_possessor:
+                self._mark_caught_own_pass(possessor)
             else:
-                self._mark_received_puck(player_w_puck)
+                self._mark_received_puck(possessor)
 
         # Someone just lost the puck
-        elif not player_w_puck and self._last_frame_player_w_puck:
+        elif possessor < 0 and self._last_frame_possessor >= 0:
             self._mark_lost_puck()
 
         # Someone stole the puck directly
-        elif any([player_w_puck[key] != self._last_frame_player_w_puck[key] for key in player_w_puck.keys()]):
-            self._mark_received_puck(player_w_puck)
+        elif possessor != self._last_frame_possessor:
+            self._mark_received_puck(possessor)
             self._mark_lost_puck()
 
         # Puck hasn't changed possession (either same player has it or no player has it)
@@ -177,21 +364,22 @@ class InfoAccumulator:
         ## Cleanup
 
         # If a player possesses the puck, save that info for next frame
-        if player_w_puck:
-            self._last_possessor = player_w_puck
+        if possessor >= 0:
+            self._last_possessor = possessor
 
         # Save the player w/ puck for next frame
-        self._last_frame_player_w_puck = player_w_puck
+        self._last_frame_possessor = possessor
 
         # Keep track how deep the puck has gone
-        self._max_puck_y = max(self.info['puck-ice-y'], self._max_puck_y)
+        puck_y = self.info['puck-ice-y']
+        self._max_puck_y = max(puck_y, self._max_puck_y)
 
         # Keep track of how deep the puck has gone when it's possessed
-        if player_w_puck.get('team') == 'home':
-            self._max_shooter_y = max(self.info['puck-ice-y'], self._max_shooter_y)
+        if team == HOME:
+            self._max_shooter_y = max(puck_y, self._max_shooter_y)
 
         # Keep track of ticks
-        self._frame_counter += 1
+        self._frame_counter += frames
         if self._last_time != self.info['time']:
             self._last_tick_frame = self._frame_counter
             self._last_time = self.info['time']
@@ -200,40 +388,11 @@ class InfoAccumulator:
     def consecutive_passes(self):
         """
         Return stats per team showing the number of consecutive passes (in a list) and the number of
-        those passes that are unique (that is, up to 6 different players in a row)
+        those passes that are unique (that is, up to 6 different players in a row). Only the latest
+        streaks of each team are kept (see StreakHistory)
         """
-        consecutive = {'home': [0], 'away': [0]}
-        unique = {'home': [0], 'away': [0]}
-
-        if len(self._possession_history['team']):
-
-            pvs_team = self._possession_history['team'][0]
-            unique_local = [self._possession_history['pos'][0]]
-
-            for cur_team, cur_pos in zip(self._possession_history['team'][1:], self._possession_history['pos'][1:]):
-                if cur_team == pvs_team:
-                    consecutive[cur_team][-1] += 1
-
-                    # Track consecutive unique passes. As soon as the unique streak is broken, the entire set is reset
-                    if cur_pos in unique_local:
-                        unique_local = [cur_pos]
-                        unique[cur_team].append(0)
-                    else:
-                        unique_local.append(cur_pos)
-                        unique[cur_team][-1] += 1
-
-                        # If everyone has touched the puck (all 6 players) then reset the unique list
-                        if len(unique_local) >= 6:
-                            unique_local = []
-                else:
-                    consecutive[cur_team].append(0)
-                    unique[cur_team].append(0)
-                    unique_local = []
-
-
-                pvs_team = cur_team
-
-        return {'consecutive': consecutive, 'unique': unique}
+        return {'consecutive': {team: streaks.tolist() for team, streaks in self._consecutive_passes.items()},
+                'unique': {team: streaks.tolist() for team, streaks in self._unique_passes.items()}}
 
     @property
     def max_puck_y(self):
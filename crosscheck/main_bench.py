@@ -0,0 +1,127 @@
+import argparse
+import datetime
+import json
+import pathlib
+import platform
+import sys
+from typing import List
+from loguru import logger
+from crosscheck.bench import env_fps, suite
+from crosscheck.bench.trace_env import TraceEnvFactory, record_trace, save_traces
+from crosscheck.version import __version__
+
+# Slower than this fraction of the old result is flagged by --compare
+REGRESSION_THRESHOLD = 0.10
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Cross-check: Training throughput benchmarks')
+    parser.add_argument('--trace', help="Trace to replay (see --record). Defaults to a synthetic trace")
+    parser.add_argument('--record', nargs='+', metavar='SAVE_STATE',
+                        help="Record a trace of these save states to --trace with the game, then exit")
+    parser.add_argument('--frames', type=int, default=3660, help="The length of a recorded or synthetic trace")
+    parser.add_argument('--populations', type=int, nargs='+', default=[10, 50],
+                        help="Population sizes for the macro-benchmarks")
+    parser.add_argument('--nproc', type=int, nargs='+', default=[1, 4],
+                        help="Process counts for the macro-benchmarks")
+    parser.add_argument('--skip-macro', action='store_true', help="Only run the micro-benchmarks")
+    parser.add_argument('--env-fps', action='store_true', help="Also measure the emulator (needs the ROM)")
+    parser.add_argument('--output', '-o', help="File to save the results to, as JSON")
+    parser.add_argument('--compare', help="Results of an earlier run to compare against")
+
+    args = parser.parse_args(argv)
+
+    if args.record:
+        if not args.trace:
+            parser.error("--record needs --trace")
+        traces = {pathlib.Path(x).stem: record_trace(x, args.frames) for x in args.record}
+        save_traces(traces, args.trace)
+        logger.info("Saved {} traces to {}", len(traces), args.trace)
+        return
+
+    results = run(args)
+    for line in report(results):
+        print(line)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)
+        for line in compare(old, results):
+            print(line)
+
+
+def run(args) -> dict:
+    env_factory = TraceEnvFactory(args.trace, None if args.trace else args.frames)
+    trace = next(iter(env_factory().traces.values()))
+
+    results = {
+        'version': __version__,
+        'python': platform.python_version(),
+        'timestamp': datetime.datetime.now().isoformat(),
+        'trace': args.trace or 'synthetic-{}'.format(args.frames),
+        # Nanoseconds per call
+        'micro': {},
+        'macro': {},
+    }
+
+    config = suite.neat_config(suite.bench_trainer(env_factory))
+    for name, benchmark in suite.micro_benchmarks(trace, config).items():
+        logger.debug("Running {}", name)
+        results['micro'][name] = suite.time_per_item(benchmark)
+
+    if not args.skip_macro:
+        for nproc in args.nproc:
+            for pop_size in args.populations:
+                logger.debug("Evaluating {} genomes on {} processes", pop_size, nproc)
+                key = 'eval-pop{}-nproc{}'.format(pop_size, nproc)
+                results['macro'][key] = suite.macro_benchmark(env_factory, pop_size, nproc)
+        for pop_size in args.populations:
+            logger.debug("Evaluating {} genomes in lockstep", pop_size)
+            key = 'eval-pop{}-lockstep'.format(pop_size)
+            results['macro'][key] = suite.macro_benchmark(env_factory, pop_size, 1, lockstep=True)
+
+    if args.env_fps:
+        results['env_fps'] = env_fps.compare()
+
+    return results
+
+
+def report(results: dict) -> List[str]:
+    lines = ["Micro-benchmarks (per call):"]
+    for name, ns in results['micro'].items():
+        lines.append("  {:32} {:10,.2f} us".format(name, ns / 1e3))
+    if results['macro']:
+        lines.append("Macro-benchmarks:")
+        for name, values in results['macro'].items():
+            lines.append("  {:32} {:8.2f} s {:8,.1f} genomes/s {:10,.0f} frames/s".format(
+                name, values['seconds'], values['genomes_per_s'], values['frames_per_s']))
+    for label, fps in results.get('env_fps', {}).items():
+        lines.append("  env {:28} {:10,.0f} frames/s".format(label, fps))
+    return lines
+
+
+def compare(old: dict, new: dict) -> List[str]:
+    """
+    :return: A line per benchmark in both results, with how much faster or slower it got
+    """
+    lines = ["Compared to {} ({}):".format(old.get('version'), old.get('timestamp'))]
+
+    def line(name, speedup):
+        flag = "  REGRESSION" if speedup < 1 - REGRESSION_THRESHOLD else ""
+        lines.append("  {:32} {:6.2f}x{}".format(name, speedup, flag))
+
+    for name, ns in new['micro'].items():
+        if name in old.get('micro', {}):
+            line(name, old['micro'][name] / ns)
+    for name, values in new['macro'].items():
+        if name in old.get('macro', {}):
+            line(name, values['frames_per_s'] / old['macro'][name]['frames_per_s'])
+    return lines
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
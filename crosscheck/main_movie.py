@@ -8,6 +8,7 @@ from crosscheck import main_train
 from crosscheck.config import cc_config
 import imageio
 import crosscheck.config
+from crosscheck.metascorekeeper import EvaluationSummary
 from crosscheck.neat_.replayer import Replayer
 from crosscheck.version import __version__
 from PIL import Image, ImageDraw
@@ -78,7 +79,8 @@ def replay(folder: pathlib.Path):
             }
 
             replayer = Replayer(scenario, combiner, feature_vector,
-                                str(folder / "neat_config.ini"), discretizer)
+                                str(folder / "neat_config.ini"), discretizer,
+                                network=cc_config['network'].get(main_train.template['network']))
             replayer.listeners.append(functools.partial(add_frame, movie, metadata))
 
             with tqdm.tqdm(smoothing=0, unit='generation', total=len(generation_files)) as progress_bar:
@@ -86,10 +88,22 @@ def replay(folder: pathlib.Path):
                     metadata["generation"] = f"{generationi + 1}/{len(generation_files)}"
                     with genome_file.open(mode='rb') as f:
                         genome = pickle.load(f)
+                    metadata["trained score"] = trained_score(genome, scenario.name)
                     replayer.replay(genome)
                     progress_bar.update()
 
 
+def trained_score(genome, scenario_name: str):
+    """
+    The score of the scenario when the genome was evaluated in training, if it was saved with one
+    """
+    summary = getattr(genome, 'metascorekeeper', None)
+    if not isinstance(summary, EvaluationSummary):
+        return None
+    score = summary.scenario_scores.get(scenario_name)
+    return None if score is None else "{:,.0f}".format(score)
+
+
 def add_frame(movie, metadata, ob, _rew, _done, _info, stats):
     blank_frame = np.zeros(ob.shape, dtype=np.uint8)
     img = Image.fromarray(blank_frame)
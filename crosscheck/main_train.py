@@ -3,7 +3,7 @@ import argparse
 import multiprocessing
 import pathlib
 import shutil
-from typing import List, Callable, Type, Optional
+from typing import List, Type, Optional
 from loguru import logger
 from .config import cc_config
 import crosscheck.config
@@ -11,7 +11,7 @@ from . import definitions
 from . import scorekeeper
 from . import metascorekeeper
 from . import discretizers
-from .info_utils.feature_vector import string_to_class as feature_vector_string_to_class
+from .info_utils.feature_vector import FeatureVector, string_to_class as feature_vector_string_to_class
 from .neat_.trainer import Trainer
 from .scenario import Scenario
 from .log_folder import LogFolder
@@ -41,9 +41,13 @@ template = {
             'name': str,
             # The filename of a scenario (save state) from which to start play
             'save-state': str,
-            # How play in this scenario will be judged
+            # How play in this scenario will be judged (a name, or a reward spec .yml relative to yaml file)
             'scorekeeper': str,
+            # Overrides input/action-repeat for this scenario
+            'action-repeat': confuse.Integer(None),
         }),
+        # The number of frames each network decision is held for (1 to decide every frame)
+        'action-repeat': confuse.Integer(1),
         # The cost function to use when combining scenarios
         'metascorekeeper': str,
         # Custom configs that are applied directly to the neat.ini files
@@ -68,6 +72,68 @@ template = {
     'render-live': bool,
     # The number of processes to run
     'nproc': int,
+    # How genomes are handed to the processes
+    #  'pool': One task per genome on a multiprocessing pool
+    #  'persistent': Long-lived workers that receive the trainer once and genomes in chunks
+    #  'scenario': Like 'persistent', but each scenario of each genome is a separate task
+    #  'distributed': Workers on any machine (python -m crosscheck worker --connect host:port)
+    # (The trainer's 'lockstep' evaluator needs several environments per process, which retro doesn't
+    # allow, so it is only available to the benchmarks; see crosscheck bench)
+    'evaluator': confuse.Choice(['pool', 'persistent', 'scenario', 'distributed'], default='pool'),
+    # How genomes are turned into networks (see crosscheck.neat_.network). Time per activation measured
+    # on 29-input genomes, fresh (5 nodes) / grown (19 nodes) / grown (60 nodes):
+    #  'generated': Python code generated for each genome, with the same outputs as 'neat'. 9 / 11 / 23 us
+    #  'compiled': NumPy arrays. 17 / 25 / 29 us
+    #  'neat': neat-python's own RecurrentNetwork. 26 / 40 / 77 us
+    'network': confuse.Choice(['generated', 'compiled', 'neat'], default='generated'),
+    # Time each stage of the frame loop, logged every generation and saved to profile.csv in the log folder
+    'profile': confuse.TypeTemplate(bool, False),
+    # Write every frame of every episode to the log folder (see crosscheck.info_utils.recording)
+    'record-episodes': confuse.TypeTemplate(bool, False),
+    # Settings for the 'pool' evaluator
+    'pool': {
+        # Replace each worker process after this many genomes, to contain emulator memory growth. 0 to never
+        'max-tasks-per-child': confuse.Integer(0),
+        # Seconds a genome may take before its worker is killed. 0 for no limit
+        'genome-timeout': confuse.Number(0),
+        # How many more times to try a genome whose worker hung or died before giving it the lowest fitness
+        'retries': confuse.Integer(1),
+    },
+    # Most frames to simulate per genome over all scenarios (per scenario with the 'scenario' evaluator).
+    # 0 for no limit
+    'frame-budget': confuse.Integer(0),
+    # Settings for the 'distributed' evaluator
+    'distributed': {
+        # The host:port to listen on for workers. Everything sent over the connection is unpickled, so
+        # anyone who can reach it and knows the authkey can run code on the trainer (and a fake trainer
+        # on the workers). Binding a routable interface (e.g. 0.0.0.0) trusts the whole network
+        'listen': confuse.String(default='127.0.0.1:7594'),
+        # Shared secret that workers must present (--authkey). Empty to generate a random one, which is logged
+        'authkey': confuse.String(default=''),
+        # The number of genomes handed to a worker at a time
+        'batch-size': confuse.Integer(4),
+        # Seconds without a heartbeat before a worker's genomes are handed to another worker
+        'heartbeat-timeout': confuse.Number(30.0),
+    },
+    # True to train without rendering the screen (movies are still rendered)
+    'headless': confuse.TypeTemplate(bool, False),
+    # True to decode the game variables straight from RAM instead of through retro (requires headless)
+    'ram-decoder': confuse.TypeTemplate(bool, False),
+    # Stop evaluating a genome's remaining scenarios once it is unlikely to survive the generation (a
+    # heuristic: the upper bound of what it can still reach is below the last generation's selection cutoff).
+    # Genomes that stop early are ranked below all fully evaluated genomes
+    'early-termination': confuse.TypeTemplate(bool, False),
+    # The number of genome evaluations to remember across generations. 0 to disable
+    'eval-cache-size': confuse.Integer(0),
+    # Share the frames that genomes have in common by resuming from snapshots of earlier rollouts
+    'rollout-trie': {
+        # Approximate memory cap per process. 0 to disable
+        'memory-mb': confuse.Integer(0),
+        # How many frames from the start of a scenario to track
+        'max-depth': confuse.Integer(600),
+        # How often to snapshot the emulator along a rollout
+        'snapshot-interval': confuse.Integer(30),
+    },
 }
 
 
@@ -145,7 +211,19 @@ def train():
     combiner = load_metascorekeeper(cc_config['input']['metascorekeeper'].get())
     checkpoint_filename = load_checkpoint_filename(cc_config['input']['load-checkpoint'].get())
     trainer = Trainer(scenarios, combiner, feature_vector, cc_config['input']['neat-config'],
-                      discretizer, nproc=cc_config['nproc'].get(), checkpoint_filename=checkpoint_filename)
+                      discretizer, nproc=cc_config['nproc'].get(), checkpoint_filename=checkpoint_filename,
+                      early_termination=cc_config['early-termination'].get(confuse.TypeTemplate(bool, False)),
+                      rollout_trie_settings=cc_config['rollout-trie'].get(template['rollout-trie']),
+                      eval_cache_size=cc_config['eval-cache-size'].get(confuse.Integer(0)),
+                      headless=cc_config['headless'].get(confuse.TypeTemplate(bool, False)),
+                      ram_decoder=cc_config['ram-decoder'].get(confuse.TypeTemplate(bool, False)),
+                      evaluator=cc_config['evaluator'].get(template['evaluator']),
+                      distributed_settings=cc_config['distributed'].get(template['distributed']),
+                      pool_settings=cc_config['pool'].get(template['pool']),
+                      frame_budget=cc_config['frame-budget'].get(confuse.Integer(0)),
+                      profile=cc_config['profile'].get(confuse.TypeTemplate(bool, False)),
+                      record_episodes=cc_config['record-episodes'].get(confuse.TypeTemplate(bool, False)),
+                      network=cc_config['network'].get(template['network']))
     trainer.train()
 
 
@@ -178,22 +256,35 @@ def load_scenarios(specs: dict) -> List[Scenario]:
     :param specs: The config for a scenario
     :return: List of scenario objects
     """
+    default_action_repeat = cc_config['input']['action-repeat'].get(confuse.Integer(1))
     scenarios = [Scenario(
         name=spec['name'].get(),
         save_state=load_save_state(spec['save-state'].get()),
-        scorekeeper=load_scorekeeper(spec['scorekeeper'].get()))
+        scorekeeper=load_scorekeeper(spec['scorekeeper'].get()),
+        action_repeat=load_action_repeat(spec['action-repeat'].get(confuse.Integer(default_action_repeat))))
                  for spec in specs]
 
     return scenarios
 
 
+def load_action_repeat(action_repeat: int) -> int:
+    """
+    Verify the number of frames for which each action is held
+    :param action_repeat: The configured number of frames
+    :return: The number of frames
+    """
+    if action_repeat < 1:
+        raise CrossCheckError(f"Action repeat must be at least 1: {action_repeat}")
+    return action_repeat
+
+
 def load_discretizer(name: str) -> Type[discretizers.Independent]:
     if name not in discretizers.string_to_class:
         raise CrossCheckError(f"Discretizer not found: {name} ")
     return discretizers.string_to_class[name]
 
 
-def load_feature_vector(name: str) -> Callable[[dict], List[float]]:
+def load_feature_vector(name: str) -> FeatureVector:
     """
     Load the feature vector, and verify that the it exists
     :param name: The name of the feature vector
@@ -201,7 +292,7 @@ def load_feature_vector(name: str) -> Callable[[dict], List[float]]:
     """
     if name not in feature_vector_string_to_class:
         raise CrossCheckError(f"Feature vector not found: {name} ")
-    return feature_vector_string_to_class[name]
+    return feature_vector_string_to_class[name]()
 
 
 def load_save_state(name: str) -> pathlib.Path:
@@ -219,9 +310,14 @@ def load_save_state(name: str) -> pathlib.Path:
 def load_scorekeeper(name: str) -> Type[scorekeeper.Scorekeeper]:
     """
     Load the scorekeeper, and verify that the scorekeeper exists
-    :param name: The name of the scorekeeper
+    :param name: The name of the scorekeeper, or a reward spec file (relative to yaml file)
     :return: An instance of the scorekeeper
     """
+    if name.endswith(scorekeeper.reward_spec.SUFFIX):
+        filename = pathlib.Path(crosscheck.config.filename).parent / name
+        if not filename.is_file():
+            raise CrossCheckError(f"Reward spec not found: {filename} ")
+        return scorekeeper.reward_spec.load_reward_spec(filename)
     if name not in scorekeeper.string_to_class:
         raise CrossCheckError(f"Scorekeeper not found: {name} ")
     return scorekeeper.string_to_class[name]
@@ -0,0 +1,47 @@
+import argparse
+import multiprocessing
+import sys
+import time
+from loguru import logger
+from crosscheck.neat_.distributed import parse_address, run_worker
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Cross-check: Evaluate genomes for a trainer on another machine')
+    parser.add_argument('--connect', required=True,
+                        help="The host:port of the trainer (see 'distributed' in the training config)")
+    parser.add_argument('--authkey', required=True,
+                        help="Shared secret with the trainer (see 'distributed' in the training config, "
+                             "or the trainer's log if it generated one)")
+    parser.add_argument('--nproc', type=int, default=multiprocessing.cpu_count(),
+                        help="The number of processes to run")
+    parser.add_argument('--heartbeat-interval', type=float, default=5.0,
+                        help="Seconds between heartbeats to the trainer")
+
+    args = parser.parse_args(argv)
+    address = parse_address(args.connect)
+
+    logger.info("Running {} workers for {}", args.nproc, args.connect)
+    processes = [multiprocessing.Process(target=work, args=(address, args.authkey.encode(), args.heartbeat_interval))
+                 for _ in range(args.nproc)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+def work(address, authkey: bytes, heartbeat_interval: float, retry_interval: float = 5.0):
+    """
+    Work for the trainer until training is over, waiting for the trainer to start if need be
+    """
+    while True:
+        try:
+            run_worker(address, authkey, heartbeat_interval)
+            return
+        except ConnectionRefusedError:
+            logger.debug("Trainer not up yet, retrying in {}s", retry_interval)
+            time.sleep(retry_interval)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
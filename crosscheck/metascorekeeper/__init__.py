@@ -3,6 +3,7 @@ from . import mean
 from . import median
 from . import nudged_median
 from.base import Metascorekeeper
+from .summary import EvaluationSummary
 
 # Hash to convert a string to a class ctor
 string_to_class = {
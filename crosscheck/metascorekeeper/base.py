@@ -1,21 +1,41 @@
 import abc
-from typing import List, Dict
-from ..scorekeeper import Scorekeeper
+from typing import List, Dict, Type, Union
+from ..scorekeeper import Scorekeeper, ScorekeeperSummary
 
 class Metascorekeeper:
 
     def __init__(self):
-        self._scorekeepers: Dict[str, Scorekeeper] = {}
+        self._scorekeepers: Dict[str, Union[Scorekeeper, ScorekeeperSummary]] = {}
+        # Statistics on the evaluation itself (as opposed to the play), e.g. skipped scenarios
+        self.eval_stats: dict = {}
 
     @property
-    @abc.abstractmethod
     def score(self) -> float:
         """
         Calculate the score from all scorekeepers
         :return:
         """
+        return self._combine([x.score for x in self._scorekeepers.values()])
+
+    @classmethod
+    @abc.abstractmethod
+    def _combine(cls, scores: List[float]) -> float:
+        """
+        Combine scenario scores into a single score
+        """
         pass
 
+    def upper_bound(self, remaining: List[Type[Scorekeeper]]) -> float:
+        """
+        Optimistic score for when not all scenarios have been played yet, assuming each
+        remaining scenario reaches its scorekeeper's fitness threshold
+        :param remaining: The scorekeepers of the scenarios not played yet
+        :return: The best score that can still be reached
+        """
+        scores = [x.score for x in self._scorekeepers.values()]
+        scores.extend(x.fitness_threshold() for x in remaining)
+        return self._combine(scores)
+
     @classmethod
     @abc.abstractclassmethod
     def fitness_threshold(cls, scorekeepers: List[Scorekeeper]) -> float:
@@ -25,11 +45,11 @@ class Metascorekeeper:
         """
         pass
 
-    def add(self, name: str, scorekeeper: Scorekeeper):
+    def add(self, name: str, scorekeeper: Union[Scorekeeper, ScorekeeperSummary]):
         """
         Add a scorekeeper
         :param name: Name of the keeper
-        :param scorekeeper: The keeper
+        :param scorekeeper: The keeper, or the summary of a keeper that played elsewhere
         """
         self._scorekeepers[name] = scorekeeper
 
@@ -39,7 +59,7 @@ class Metascorekeeper:
         Statistics on this object so far
         :return: key/value on statistics
         """
-        return {key: value.stats() for key, value in self._scorekeepers.items()}
+        return {key: value.stats for key, value in self._scorekeepers.items()}
 
     def score_listing(self) -> List[float]:
         return [x.score for x in self._scorekeepers.values()]
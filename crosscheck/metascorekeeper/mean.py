@@ -8,9 +8,9 @@ class Mean(Metascorekeeper):
     def __init__(self):
         super().__init__()
 
-    @property
-    def score(self):
-        return sum([x.score for x in self._scorekeepers.values()]) / len(self._scorekeepers)
+    @classmethod
+    def _combine(cls, scores: List[float]) -> float:
+        return sum(scores) / len(scores)
 
     @classmethod
     def fitness_threshold(cls, scorekeepers: List[Scorekeeper]) -> float:
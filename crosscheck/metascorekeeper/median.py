@@ -9,9 +9,9 @@ class Median(Metascorekeeper):
     def __init__(self):
         super().__init__()
 
-    @property
-    def score(self):
-        return np.median(np.array([x.score for x in self._scorekeepers.values()]))
+    @classmethod
+    def _combine(cls, scores: List[float]) -> float:
+        return np.median(np.array(scores))
 
     @classmethod
     def fitness_threshold(cls, scorekeepers: List[Scorekeeper]) -> float:
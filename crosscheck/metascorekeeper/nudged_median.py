@@ -21,10 +21,10 @@ class NudgedMedian(Metascorekeeper):
         self._mean.add(name, scorekeeper)
         self._median.add(name, scorekeeper)
 
-    @property
-    def score(self):
-        lowest = min([x.score for x in self._scorekeepers.values()])
-        return self._median.score + self._mean.score * 0.01 + lowest
+    @classmethod
+    def _combine(cls, scores: List[float]) -> float:
+        lowest = min(scores)
+        return Median._combine(scores) + Mean._combine(scores) * 0.01 + lowest
 
     @classmethod
     def fitness_threshold(cls, scorekeepers: List[Scorekeeper]) -> float:
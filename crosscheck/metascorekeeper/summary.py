@@ -0,0 +1,65 @@
+from typing import Dict, List
+from .base import Metascorekeeper
+
+
+class EvaluationSummary:
+    """
+    The results of evaluating a genome, without the scorekeepers' state. This is what is sent
+    back from the workers, kept on genome.metascorekeeper and saved in checkpoints, so it is
+    kept small. Has the accessors of a Metascorekeeper that the reporters use
+    """
+    __slots__ = ('score', '_score_listing', 'scenario_scores', 'score_vectors', 'done_reasons', 'stats',
+                 'eval_stats')
+
+    def __init__(self, score: float, score_listing: List[float], scenario_scores: Dict[str, float],
+                 score_vectors: Dict[str, dict], done_reasons: Dict[str, dict], stats: Dict[str, dict],
+                 eval_stats: dict):
+        """
+        :param score: The fitness of the genome
+        :param score_listing: The scenario scores as the metascorekeeper lists them
+        :param scenario_scores: The score of each scenario played, by name
+        :param score_vectors: The score vector of each scenario played, by name
+        :param done_reasons: The done reasons of each scenario played, by name
+        :param stats: The scorekeeper stats of each scenario played, by name
+        :param eval_stats: Statistics on the evaluation itself (see Metascorekeeper.eval_stats)
+        """
+        self.score = score
+        self._score_listing = score_listing
+        self.scenario_scores = scenario_scores
+        self.score_vectors = score_vectors
+        self.done_reasons = done_reasons
+        self.stats = stats
+        self.eval_stats = eval_stats
+
+    @classmethod
+    def from_metascorekeeper(cls, metascorekeeper: Metascorekeeper, score: float = None) -> 'EvaluationSummary':
+        """
+        :param metascorekeeper: The metascorekeeper after the evaluation
+        :param score: The fitness, if not the metascorekeeper's score (e.g. after early termination)
+        """
+        scorekeepers = metascorekeeper._scorekeepers
+        return cls(score=metascorekeeper.score if score is None else score,
+                   score_listing=[float(x) for x in metascorekeeper.score_listing()],
+                   scenario_scores={name: x.score for name, x in scorekeepers.items()},
+                   score_vectors={name: dict(x.score_vector) for name, x in scorekeepers.items()},
+                   done_reasons={name: {k: v for k, v in x.done_reasons().items() if v}
+                                 for name, x in scorekeepers.items()},
+                   stats={name: _plain(x.stats) for name, x in scorekeepers.items()},
+                   eval_stats=dict(metascorekeeper.eval_stats))
+
+    def score_listing(self) -> List[float]:
+        return self._score_listing
+
+    def __getstate__(self):
+        return tuple(getattr(self, x) for x in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+
+def _plain(stats: dict) -> dict:
+    """
+    Copy of the stats that does not share (or pickle) the scorekeeper's containers
+    """
+    return {key: dict(value) if isinstance(value, dict) else value for key, value in stats.items()}
@@ -0,0 +1,266 @@
+import collections
+import copy
+import dataclasses
+import pickle
+import threading
+import traceback
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Callable, List, Optional, Tuple
+import neat
+from .. import definitions
+
+
+def parse_address(address: str) -> Tuple[str, int]:
+    """
+    Convert host:port to a (host, port) tuple
+    """
+    host, _, port = address.rpartition(':')
+    return host, int(port)
+
+
+class _Batch:
+    __slots__ = ('batch_id', 'tasks')
+
+    def __init__(self, batch_id: int, tasks: List[Tuple[int, neat.DefaultGenome]]):
+        self.batch_id = batch_id
+        self.tasks = tasks
+
+
+class DistributedEvaluator:
+
+    def __init__(self, trainer, address: Tuple[str, int], authkey: bytes, batch_size: int = 4,
+                 heartbeat_timeout: float = 30.0, stream: Callable[[str], None] = print):
+        """
+        Evaluator that hands batches of genomes to workers on other machines
+        (python -m crosscheck worker --connect host:port). Workers can join and leave at any time;
+        the batch of a worker that disconnects or stops sending heartbeats is handed to another one
+        :param trainer: The trainer, whose _eval_genome_parallel is called by the workers
+        :param address: The (host, port) to listen on. Port 0 picks a free port (see self.address)
+        :param authkey: Shared secret that workers must present. Required, since whatever the workers
+        send is unpickled
+        :param batch_size: The number of genomes handed to a worker at a time
+        :param heartbeat_timeout: Seconds without word from a busy worker before its batch is re-queued
+        :param stream: Where to report workers joining and leaving
+        """
+        if not authkey:
+            raise ValueError("The distributed evaluator needs an authkey")
+        self.trainer = trainer
+        self.authkey = authkey
+        self.batch_size = batch_size
+        self.heartbeat_timeout = heartbeat_timeout
+        self.stream = stream
+
+        self._listener = Listener(address, authkey=authkey)
+        self.address = self._listener.address
+
+        self._lock = threading.Condition()
+        self._pending = collections.deque()
+        self._results = {}
+        self._outstanding = 0
+        self._error = None
+        self._shutdown = False
+        self._version = 0
+        self._payload = None
+        self._workers = 0
+        self._next_worker_id = 0
+
+        self._accept_thread = threading.Thread(target=self._accept, daemon=True)
+        self._accept_thread.start()
+
+    @property
+    def workers(self) -> int:
+        """
+        The number of workers connected
+        """
+        with self._lock:
+            return self._workers
+
+    def evaluate(self, genomes: List[Tuple[int, neat.DefaultGenome]], config: neat.Config):
+        payload = pickle.dumps((_relative_save_states(self.trainer), config), pickle.HIGHEST_PROTOCOL)
+        batches = [_Batch(index, genomes[start:start + self.batch_size])
+                   for index, start in enumerate(range(0, len(genomes), self.batch_size))]
+
+        with self._lock:
+            if payload != self._payload:
+                self._payload = payload
+                self._version += 1
+            if not self._workers:
+                self.stream("Waiting for workers to connect to {0}:{1}".format(*self.address))
+            self._results = {}
+            self._outstanding = len(batches)
+            self._pending.extend(batches)
+            self._lock.notify_all()
+
+            while self._outstanding and self._error is None:
+                self._lock.wait()
+            if self._error is not None:
+                error, self._error = self._error, None
+                self._pending.clear()
+                raise RuntimeError(error)
+            results = self._results
+
+        for key, genome in genomes:
+            genome.fitness, genome.metascorekeeper = results[key]
+
+    def close(self):
+        with self._lock:
+            if self._shutdown:
+                return
+            self._shutdown = True
+            self._lock.notify_all()
+        # Wake the accept thread
+        try:
+            Client(self.address, authkey=self.authkey).close()
+        except OSError:
+            pass
+        self._accept_thread.join()
+        self._listener.close()
+
+    def _accept(self):
+        while True:
+            try:
+                conn = self._listener.accept()
+            except OSError:
+                if self._shutdown:
+                    return
+                continue
+            if self._shutdown:
+                conn.close()
+                return
+            with self._lock:
+                self._workers += 1
+                worker_id = self._next_worker_id
+                self._next_worker_id += 1
+            threading.Thread(target=self._serve, args=(worker_id, conn), daemon=True).start()
+
+    def _serve(self, worker_id: int, conn: Connection):
+        """
+        Feed batches to one worker until it leaves or the evaluator shuts down
+        """
+        self.stream("Worker {} joined ({} connected)".format(worker_id, self.workers))
+        version = None
+        batch = None
+        try:
+            while True:
+                with self._lock:
+                    while not self._pending and not self._shutdown:
+                        self._lock.wait()
+                    if self._shutdown:
+                        conn.send(('stop',))
+                        return
+                    batch = self._pending.popleft()
+                    batch_version, payload = self._version, self._payload
+
+                if version != batch_version:
+                    conn.send(('setup', batch_version, payload))
+                    version = batch_version
+                conn.send(('batch', batch.batch_id, batch.tasks))
+
+                results, error = self._wait_for_result(conn, batch.batch_id)
+                with self._lock:
+                    if error is not None:
+                        self._error = "Worker {} failed:\n{}".format(worker_id, error)
+                    else:
+                        self._results.update(results)
+                        self._outstanding -= 1
+                    batch = None
+                    self._lock.notify_all()
+        except (EOFError, OSError, TimeoutError) as ex:
+            self.stream("Worker {} left ({})".format(worker_id, type(ex).__name__))
+        finally:
+            with self._lock:
+                self._workers -= 1
+                if batch is not None:
+                    # Hand the lost work to somebody else
+                    self._pending.appendleft(batch)
+                    self._lock.notify_all()
+            conn.close()
+
+    def _wait_for_result(self, conn: Connection, batch_id: int) -> Tuple[Optional[list], Optional[str]]:
+        """
+        Wait for the results of a batch, accepting heartbeats in the meantime
+        """
+        while True:
+            if not conn.poll(self.heartbeat_timeout):
+                raise TimeoutError
+            message = conn.recv()
+            if message[0] == 'result' and message[1] == batch_id:
+                return message[2], None
+            if message[0] == 'error' and message[1] == batch_id:
+                return None, message[2]
+
+
+def run_worker(address: Tuple[str, int], authkey: bytes, heartbeat_interval: float = 5.0):
+    """
+    Evaluate batches of genomes for a DistributedEvaluator until it stops
+    :param address: The (host, port) of the trainer
+    :param authkey: Shared secret with the trainer
+    :param heartbeat_interval: Seconds between telling the trainer that the worker is still alive
+    """
+    if not authkey:
+        raise ValueError("A worker needs the trainer's authkey")
+    conn = Client(address, authkey=authkey)
+    send_lock = threading.Lock()
+    stopped = threading.Event()
+
+    def send(message):
+        with send_lock:
+            conn.send(message)
+
+    def heartbeat():
+        while not stopped.wait(heartbeat_interval):
+            try:
+                send(('heartbeat',))
+            except OSError:
+                return
+
+    heartbeat_thread = threading.Thread(target=heartbeat, daemon=True)
+    heartbeat_thread.start()
+
+    trainer = config = None
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                return
+
+            if message[0] == 'stop':
+                return
+
+            if message[0] == 'setup':
+                _, _, payload = message
+                trainer, config = pickle.loads(payload)
+                _rebase_save_states(trainer)
+
+            elif message[0] == 'batch':
+                _, batch_id, tasks = message
+                try:
+                    results = []
+                    for key, genome in tasks:
+                        results.append((key, trainer._eval_genome_parallel(genome, config)))
+                    send(('result', batch_id, results))
+                except Exception:
+                    send(('error', batch_id, traceback.format_exc()))
+    finally:
+        stopped.set()
+        conn.close()
+
+
+def _relative_save_states(trainer):
+    """
+    :return: A copy of the trainer whose save states are relative to the save state folder (see
+    _rebase_save_states), since the folder differs between machines
+    """
+    trainer = copy.copy(trainer)
+    trainer.scenarios = [dataclasses.replace(x, save_state=definitions.relative_save_state(x.save_state))
+                         for x in trainer.scenarios]
+    return trainer
+
+
+def _rebase_save_states(trainer):
+    """
+    The save state paths are relative to the trainer's save state folder, so find them in this machine's folder
+    """
+    folder = definitions.SAVE_STATE_FOLDER
+    trainer.scenarios = [dataclasses.replace(x, save_state=folder / x.save_state) for x in trainer.scenarios]
@@ -0,0 +1,72 @@
+import collections
+import copy
+import hashlib
+from typing import Callable, List, Tuple
+import neat
+from neat.six_util import itervalues
+
+
+class EvaluationCache:
+
+    def __init__(self, evaluate: Callable, identity: tuple, max_entries: int = 5000):
+        """
+        Memoize genome evaluations across generations. Emulation is deterministic from a save
+        state, so a genome with the same network as one already evaluated (e.g. an elite that
+        survived) gets the same fitness. Lives in the parent process and wraps the evaluate
+        function that is handed to neat.Population.run
+        :param evaluate: The evaluate function, taking a list of (genome_id, genome) and a config
+        :param identity: Everything besides the genome that determines a fitness (scenarios,
+        scorekeepers, feature vector, ...)
+        :param max_entries: The number of evaluations to remember. Least recently used are
+        dropped first
+        """
+        self.evaluate_function = evaluate
+        self.identity = repr(identity)
+        self.max_entries = max_entries
+        self._entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def evaluate(self, genomes: List[Tuple[int, neat.DefaultGenome]], config: neat.Config):
+        misses = []
+        keys = {}
+        for genome_id, genome in genomes:
+            key = self.genome_key(genome)
+            entry = self._entries.get(key)
+            if entry is None:
+                misses.append((genome_id, genome))
+                keys[genome_id] = key
+                continue
+
+            self._entries.move_to_end(key)
+            genome.fitness, metascorekeeper = entry
+            # Don't count the original evaluation's statistics again
+            genome.metascorekeeper = copy.copy(metascorekeeper)
+            genome.metascorekeeper.eval_stats = {'cache_hits': 1}
+
+        self.hits += len(genomes) - len(misses)
+        self.misses += len(misses)
+
+        if misses:
+            self.evaluate_function(misses, config)
+
+        for genome_id, genome in misses:
+            eval_stats = getattr(genome.metascorekeeper, 'eval_stats', {})
+            # A skipped evaluation depends on the cutoff at the time, and a failed one (e.g. a worker
+            # that timed out or crashed) may not fail again, so neither can be reused
+            if eval_stats.get('skipped_scenarios') or eval_stats.get('failed_evaluations'):
+                continue
+            self._entries[keys[genome_id]] = (genome.fitness, genome.metascorekeeper)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def genome_key(self, genome: neat.DefaultGenome) -> str:
+        """
+        Canonical hash of everything in a genome that affects its network
+        """
+        nodes = sorted((key, node.bias, node.response, node.activation, node.aggregation)
+                       for key, node in genome.nodes.items())
+        connections = sorted((cg.key, cg.weight) for cg in itervalues(genome.connections) if cg.enabled)
+        text = repr((self.identity, nodes, connections))
+        return hashlib.sha1(text.encode()).hexdigest()
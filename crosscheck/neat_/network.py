@@ -0,0 +1,495 @@
+import math
+import numpy as np
+import neat
+from neat.activations import sigmoid_activation, gauss_activation
+from neat.aggregations import sum_aggregation, product_aggregation, min_aggregation, max_aggregation, \
+    mean_aggregation, median_aggregation, maxabs_aggregation
+from neat.graphs import required_for_output
+from typing import List
+
+
+# The order the compiled nodes are kept in. Sums and means are both a dot product with the state,
+# and a min is the negated max of the negated inputs, so those pairs share a group.
+_GROUPS = {
+    sum_aggregation: 'linear',
+    mean_aggregation: 'linear',
+    max_aggregation: 'max',
+    min_aggregation: 'max',
+    product_aggregation: 'product',
+    median_aggregation: 'median',
+    maxabs_aggregation: 'maxabs',
+}
+_GROUP_ORDER = ['linear', 'max', 'product', 'median', 'maxabs']
+
+# Constants at the end of the state that pad each group's inputs to the same width. NaNs sort
+# last, which keeps them out of the median.
+_PADS = {'max': -np.inf, 'product': 1.0, 'median': np.nan, 'maxabs': 0.0}
+_CONSTANTS = list(_PADS.values())
+
+_ACTIVATIONS = (sigmoid_activation, gauss_activation)
+
+# Largest dense matrix (in elements) for the sum and mean nodes. Bigger networks, like a batch of
+# many genomes, multiply only their connections instead
+_DENSE_LIMIT = 1 << 16
+
+
+class CompiledRecurrentNetwork:
+    """
+    Drop-in replacement for neat.nn.recurrent.RecurrentNetwork that evaluates with NumPy.
+
+    The network's values live in one state vector: the inputs, then the nodes that are compiled
+    (in aggregation group order), then everything else. Each frame is then a dot product for the
+    sum and mean nodes, one gather and one reduction per remaining aggregation group, and one
+    vectorized pass per activation function. Nodes using functions that are not built into
+    neat-python fall back to being evaluated in Python.
+    """
+
+    def __init__(self, inputs: List[int], outputs: List[int], node_evals: list):
+        """
+        :param inputs: Input node keys
+        :param outputs: Output node keys
+        :param node_evals: (node, activation, aggregation, bias, response, [(node, weight)]) for
+        each node to evaluate, as with RecurrentNetwork
+        """
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.node_evals = node_evals
+        compiled = [x for x in node_evals if x[1] in _ACTIVATIONS and x[2] in _GROUPS]
+        compiled.sort(key=lambda x: _GROUP_ORDER.index(_GROUPS[x[2]]))
+        self.python_nodes = [x for x in node_evals if not (x[1] in _ACTIVATIONS and x[2] in _GROUPS)]
+
+        slots = {}
+        for key in list(inputs) + [x[0] for x in compiled] + list(outputs) + [x[0] for x in node_evals]:
+            slots.setdefault(key, len(slots))
+        for links in [x[5] for x in node_evals]:
+            for key, _ in links:
+                slots.setdefault(key, len(slots))
+        self.slots = slots
+        self.num_inputs = len(inputs)
+        self.num_slots = len(slots)
+        self.state = np.zeros(self.num_slots + len(_CONSTANTS))
+        pad_slots = {group: self.num_slots + i for i, group in enumerate(_PADS)}
+
+        self.output_slots = np.array([slots[x] for x in outputs], dtype=np.intp)
+        self.python_nodes = [(slots[node], activation, aggregation, bias, response,
+                              [(slots[i], w) for i, w in links])
+                             for node, activation, aggregation, bias, response, links in self.python_nodes]
+
+        # The compiled nodes' values, and the bias and response applied to their aggregations
+        first = self.num_inputs
+        self._values = self.state[first:first + len(compiled)]
+        self._variables = self.state[:self.num_slots]
+        self._aggregates = np.zeros(len(compiled))
+        self._biases = np.array([x[3] for x in compiled])
+        self._responses = np.array([x[4] if _GROUPS[x[2]] != 'max' or x[2] is max_aggregation else -x[4]
+                                    for x in compiled])
+        self._z = np.zeros(len(compiled))
+
+        groups = [_GROUPS[x[2]] for x in compiled]
+        linear = groups.count('linear')
+        self._linear = None
+        self._linear_sparse = None
+        if linear and linear * self.num_slots <= _DENSE_LIMIT:
+            self._linear = np.zeros((linear, self.num_slots))
+            for row, (_, _, aggregation, _, _, links) in enumerate(compiled[:linear]):
+                scale = 1.0 / len(links) if aggregation is mean_aggregation else 1.0
+                for key, w in links:
+                    self._linear[row, slots[key]] = w * scale
+        elif linear:
+            # Each node's connections are consecutive, and summed with reduceat
+            sources, weights, starts = [], [], []
+            for _, _, aggregation, _, _, links in compiled[:linear]:
+                scale = 1.0 / len(links) if aggregation is mean_aggregation else 1.0
+                starts.append(len(sources))
+                sources.extend(slots[key] for key, _ in links)
+                weights.extend(w * scale for _, w in links)
+            self._linear_sparse = (np.array(sources, dtype=np.intp), np.array(weights),
+                                   np.array(starts, dtype=np.intp), self._aggregates[:linear])
+
+        # The other nodes' inputs are gathered into one padded matrix
+        others = compiled[linear:]
+        width = max([len(x[5]) for x in others], default=0)
+        self._sources = np.zeros((len(others), width), dtype=np.intp)
+        self._weights = np.ones((len(others), width))
+        for row, (_, _, aggregation, _, _, links) in enumerate(others):
+            self._sources[row, :] = pad_slots[_GROUPS[aggregation]]
+            sign = -1.0 if aggregation is min_aggregation else 1.0
+            for column, (key, w) in enumerate(links):
+                self._sources[row, column] = slots[key]
+                self._weights[row, column] = sign * w
+
+        self._reductions = []
+        for group in _GROUP_ORDER[1:]:
+            if group not in groups:
+                continue
+            start, stop = groups.index(group), len(groups) - groups[::-1].index(group)
+            rows = np.arange(stop - start)
+            counts = np.array([len(x[5]) for x in compiled[start:stop]])
+            # Flat indices into the group's (sorted) inputs, for the medians
+            low = rows * width + (counts - 1) // 2
+            high = rows * width + counts // 2
+            self._reductions.append((group, start - linear, stop - linear, self._aggregates[start:stop],
+                                     rows * width, low, high))
+
+        gauss = [i for i, x in enumerate(compiled) if x[1] is gauss_activation]
+        self._gauss = np.array(gauss, dtype=np.intp) if gauss else None
+
+        self.reset()
+
+    @staticmethod
+    def create(genome: neat.DefaultGenome, config: neat.Config) -> 'CompiledRecurrentNetwork':
+        """
+        Receives a genome and returns its phenotype, with the same nodes and connections that
+        RecurrentNetwork.create would use
+        """
+        genome_config = config.genome_config
+        required = required_for_output(genome_config.input_keys, genome_config.output_keys, genome.connections)
+
+        node_inputs = {}
+        for cg in genome.connections.values():
+            if not cg.enabled:
+                continue
+            i, o = cg.key
+            if o not in required and i not in required:
+                continue
+            node_inputs.setdefault(o, []).append((i, cg.weight))
+
+        node_evals = []
+        for node_key, inputs in node_inputs.items():
+            node = genome.nodes[node_key]
+            activation_function = genome_config.activation_defs.get(node.activation)
+            aggregation_function = genome_config.aggregation_function_defs.get(node.aggregation)
+            node_evals.append((node_key, activation_function, aggregation_function, node.bias, node.response, inputs))
+
+        return CompiledRecurrentNetwork(genome_config.input_keys, genome_config.output_keys, node_evals)
+
+    def reset(self):
+        """
+        Zero the network's values, as if it was just created
+        """
+        self.state[:self.num_slots] = 0.0
+        self.state[self.num_slots:] = _CONSTANTS
+
+    def get_state(self) -> np.ndarray:
+        return self.state.copy()
+
+    def set_state(self, state: np.ndarray):
+        self.state[:] = state
+
+    def activate(self, inputs: List[float]) -> List[float]:
+        if len(inputs) != self.num_inputs:
+            raise RuntimeError("Expected {0:n} inputs, got {1:n}".format(self.num_inputs, len(inputs)))
+
+        self.state[:self.num_inputs] = inputs
+        self._step()
+        return self.state[self.output_slots].tolist()
+
+    def _step(self):
+        """
+        Advance the network by a frame, with the inputs already in the state
+        """
+        state = self.state
+
+        # Every node reads the previous frame's values, so nothing is written until all are evaluated
+        if self.python_nodes:
+            python_values = [(slot, activation(bias + response * aggregation([state[i] * w for i, w in links])))
+                             for slot, activation, aggregation, bias, response, links in self.python_nodes]
+
+        aggregates = self._aggregates
+        if self._linear is not None:
+            np.dot(self._linear, self._variables, aggregates[:len(self._linear)])
+        elif self._linear_sparse is not None:
+            sources, weights, starts, out = self._linear_sparse
+            np.add.reduceat(state[sources] * weights, starts, 0, None, out)
+        if self._reductions:
+            products = state[self._sources]
+            np.multiply(products, self._weights, products)
+            for group, start, stop, out, offsets, low, high in self._reductions:
+                node_inputs = products[start:stop]
+                if group == 'max':
+                    np.maximum.reduce(node_inputs, 1, None, out)
+                elif group == 'product':
+                    np.multiply.reduce(node_inputs, 1, None, out)
+                elif group == 'median':
+                    node_inputs.sort(1)
+                    np.add(node_inputs.take(low), node_inputs.take(high), out)
+                    np.multiply(out, 0.5, out)
+                else:
+                    out[:] = node_inputs.take(np.abs(node_inputs).argmax(1) + offsets)
+
+        z = self._z
+        values = self._values
+        np.multiply(aggregates, self._responses, z)
+        np.add(z, self._biases, z)
+        if self._gauss is not None:
+            gauss = np.maximum(np.minimum(z[self._gauss], 3.4), -3.4)
+
+        # sigmoid(5z) == (1 + tanh(2.5z)) / 2, which saturates rather than overflowing
+        np.multiply(z, 2.5, values)
+        np.tanh(values, values)
+        np.multiply(values, 0.5, values)
+        np.add(values, 0.5, values)
+        if self._gauss is not None:
+            values[self._gauss] = np.exp(-5.0 * gauss * gauss)
+
+        if self.python_nodes:
+            for slot, value in python_values:
+                state[slot] = value
+
+
+class BatchedRecurrentNetwork:
+    """
+    Several CompiledRecurrentNetworks (e.g. genomes playing the same scenario in lockstep)
+    merged into one, so a frame of all of them is a single set of NumPy operations.
+
+    Members are removed once they finish. Their nodes stay in the merged network, with stale
+    inputs, until enough members have finished to be worth recompiling the rest.
+    """
+
+    def __init__(self, nets: List[CompiledRecurrentNetwork], compact_fraction: float = 0.25):
+        """
+        :param nets: The members, by index. Each keeps playing from the state it is in
+        :param compact_fraction: Recompile once this fraction of the merged members has finished
+        """
+        self.nets = nets
+        self.compact_fraction = compact_fraction
+        self.remaining = set(range(len(nets)))
+        self.members = []
+        self.merged = None
+        self._compile()
+
+    def _compile(self):
+        """
+        Merge the remaining members, carrying over the state of the current merged network
+        """
+        if self.merged is not None:
+            for member in self.members:
+                net_slots, merged_slots = self._slots[member]
+                self.nets[member].state[net_slots] = self.merged.state[merged_slots]
+
+        self.members = sorted(self.remaining)
+        inputs, outputs, node_evals = [], [], []
+        for member in self.members:
+            net = self.nets[member]
+            inputs.extend((member, key) for key in net.inputs)
+            outputs.extend((member, key) for key in net.outputs)
+            node_evals.extend(((member, node), activation, aggregation, bias, response,
+                               [((member, i), w) for i, w in links])
+                              for node, activation, aggregation, bias, response, links in net.node_evals)
+        self.merged = CompiledRecurrentNetwork(inputs, outputs, node_evals)
+
+        self._slots = {}
+        for member in self.members:
+            net = self.nets[member]
+            net_slots = np.array(list(net.slots.values()), dtype=np.intp)
+            merged_slots = np.array([self.merged.slots[(member, key)] for key in net.slots], dtype=np.intp)
+            self.merged.state[merged_slots] = net.state[net_slots]
+            self._slots[member] = net_slots, merged_slots
+
+        self._rows = {member: row for row, member in enumerate(self.members)}
+        num_inputs = self.nets[self.members[0]].num_inputs if self.members else 0
+        self._inputs = self.merged.state[:len(self.members) * num_inputs].reshape(len(self.members), num_inputs)
+        self._outputs = self.merged.output_slots.reshape(len(self.members), -1)
+
+    def activate(self, members: List[int], inputs: List[List[float]]) -> List[List[float]]:
+        """
+        Advance every member by a frame
+        :param members: The remaining members, in order
+        :param inputs: The inputs of each of those members
+        :return: The outputs of each of those members
+        """
+        if not members:
+            return []
+        if len(members) == len(self.members):
+            self._inputs[:] = inputs
+            self.merged._step()
+            return self.merged.state[self._outputs].tolist()
+
+        rows = [self._rows[x] for x in members]
+        self._inputs[rows] = inputs
+        self.merged._step()
+        return self.merged.state[self._outputs[rows]].tolist()
+
+    def remove(self, member: int):
+        """
+        Take a member that has finished out of the batch
+        """
+        self.remaining.discard(member)
+        finished = len(self.members) - len(self.remaining)
+        if self.remaining and finished >= max(1.0, self.compact_fraction * len(self.members)):
+            self._compile()
+
+
+class SeparateRecurrentNetworks:
+    """
+    Same interface as BatchedRecurrentNetwork, for networks that can't be merged (anything but
+    CompiledRecurrentNetworks). Each member is activated on its own
+    """
+
+    def __init__(self, nets: list):
+        """
+        :param nets: The members, by index
+        """
+        self.nets = nets
+
+    def activate(self, members: List[int], inputs: List[List[float]]) -> List[List[float]]:
+        return [self.nets[member].activate(x) for member, x in zip(members, inputs)]
+
+    def remove(self, member: int):
+        pass
+
+
+def batch_networks(nets: list):
+    """
+    :param nets: The members of a batch (e.g. genomes playing the same scenario in lockstep)
+    :return: A BatchedRecurrentNetwork if they can be merged, SeparateRecurrentNetworks otherwise
+    """
+    if all(isinstance(x, CompiledRecurrentNetwork) for x in nets):
+        return BatchedRecurrentNetwork(nets)
+    return SeparateRecurrentNetworks(nets)
+
+
+# neat-python's built-in functions written out, with the same operations in the same order.
+# Aggregations are expressions of the weighted inputs. Activations are statements that turn z (the
+# biased and scaled aggregation) into the node's value; min(hi, z) is z if z < hi else hi, and
+# max(lo, z) is z if z > lo else lo, which saves the calls
+_GENERATED_AGGREGATIONS = {
+    # sum() adds to 0 from the left
+    sum_aggregation: '(0 + {sum})',
+    # reduce(mul, x, 1.0)
+    product_aggregation: '(1.0 * {product})',
+    max_aggregation: 'max({terms})',
+    min_aggregation: 'min({terms})',
+    maxabs_aggregation: 'max(({terms},), key=abs)',
+    mean_aggregation: '((0 + {sum}) / {count})',
+}
+_GENERATED_ACTIVATIONS = {
+    sigmoid_activation: ['z = 5.0 * z',
+                         'z = z if z < 60.0 else 60.0',
+                         'z = z if z > -60.0 else -60.0',
+                         '{value} = 1.0 / (1.0 + exp(-z))'],
+    gauss_activation: ['z = z if z < 3.4 else 3.4',
+                       'z = z if z > -3.4 else -3.4',
+                       '{value} = exp(-5.0 * z ** 2)'],
+}
+
+
+class GeneratedRecurrentNetwork:
+    """
+    Drop-in replacement for neat.nn.recurrent.RecurrentNetwork that is compiled into a Python
+    function of straight-line arithmetic, with the weights as constants and the values in local
+    variables. Does the same floating point operations in the same order as RecurrentNetwork, so
+    the outputs are identical. Faster than CompiledRecurrentNetwork for the small networks of a
+    single genome, where NumPy's per-call overhead dominates
+    """
+
+    def __init__(self, inputs: List[int], outputs: List[int], node_evals: list):
+        """
+        :param inputs: Input node keys
+        :param outputs: Output node keys
+        :param node_evals: (node, activation, aggregation, bias, response, [(node, weight)]) for
+        each node to evaluate, as with RecurrentNetwork
+        """
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.node_evals = node_evals
+        self.num_inputs = len(inputs)
+
+        # Inputs are x0.., the evaluated nodes' previous values n0.. and their new values v0..
+        # Anything else is never set, so stays 0
+        names = {key: 'x{}'.format(i) for i, key in enumerate(inputs)}
+        new_names = {}
+        for i, evaluation in enumerate(node_evals):
+            names.setdefault(evaluation[0], 'n{}'.format(i))
+            new_names.setdefault(evaluation[0], 'v{}'.format(i))
+        previous = ['n{}'.format(i) for i in range(len(node_evals))]
+        values = ['v{}'.format(i) for i in range(len(node_evals))]
+
+        functions = {}
+
+        def function(f) -> str:
+            return functions.setdefault(f, 'f{}'.format(len(functions)))
+
+        lines = []
+        if inputs:
+            lines.append('{}, = inputs'.format(', '.join(names[x] for x in inputs)))
+        if node_evals:
+            lines.append('{}, = state'.format(', '.join(previous)))
+        # Every node reads the previous frame's values, so the new ones are kept apart
+        for value, (_, activation, aggregation, bias, response, links) in zip(values, node_evals):
+            terms = ['{} * {!r}'.format(names.get(key, '0.0'), w) for key, w in links]
+            template = _GENERATED_AGGREGATIONS.get(aggregation)
+            if template is None:
+                aggregate = '{}([{}])'.format(function(aggregation), ', '.join(terms))
+            elif len(terms) == 1 and aggregation in (max_aggregation, min_aggregation):
+                aggregate = '({})'.format(terms[0])
+            else:
+                aggregate = template.format(terms=', '.join(terms), sum=' + '.join(terms),
+                                            product=' * '.join('({})'.format(x) for x in terms),
+                                            count=len(terms))
+            lines.append('z = {!r} + {!r} * {}'.format(bias, response, aggregate))
+            statements = _GENERATED_ACTIVATIONS.get(activation, ['{value} = %s(z)' % function(activation)])
+            lines.extend(x.format(value=value) for x in statements)
+        lines.append('return ({}), [{}]'.format(''.join(x + ', ' for x in values),
+                                              ', '.join(new_names.get(x, names.get(x, '0.0')) for x in outputs)))
+
+        source = 'def step(inputs, state):\n' + ''.join('    {}\n'.format(x) for x in lines)
+        namespace = {name: f for f, name in functions.items()}
+        namespace['exp'] = math.exp
+        exec(compile(source, '<network>', 'exec'), namespace)
+        self._step = namespace['step']
+        self.reset()
+
+    @staticmethod
+    def create(genome: neat.DefaultGenome, config: neat.Config) -> 'GeneratedRecurrentNetwork':
+        """
+        Receives a genome and returns its phenotype, with the same nodes and connections that
+        RecurrentNetwork.create would use
+        """
+        net = neat.nn.recurrent.RecurrentNetwork.create(genome, config)
+        return GeneratedRecurrentNetwork(net.input_nodes, net.output_nodes, net.node_evals)
+
+    def reset(self):
+        """
+        Zero the network's values, as if it was just created
+        """
+        self.state = (0.0,) * len(self.node_evals)
+
+    def get_state(self) -> tuple:
+        return self.state
+
+    def set_state(self, state: tuple):
+        self.state = state
+
+    def activate(self, inputs) -> List[float]:
+        if len(inputs) != self.num_inputs:
+            raise RuntimeError("Expected {0:n} inputs, got {1:n}".format(self.num_inputs, len(inputs)))
+        if isinstance(inputs, np.ndarray):
+            inputs = inputs.tolist()
+
+        self.state, outputs = self._step(inputs, self.state)
+        return outputs
+
+
+class RecurrentNetwork(neat.nn.recurrent.RecurrentNetwork):
+    """
+    neat's RecurrentNetwork, also taking arrays (e.g. the buffer of a FeatureVector) as inputs.
+    Their elements are converted to floats so the math is the same as with lists
+    """
+
+    @staticmethod
+    def create(genome: neat.DefaultGenome, config: neat.Config) -> 'RecurrentNetwork':
+        net = neat.nn.recurrent.RecurrentNetwork.create(genome, config)
+        return RecurrentNetwork(net.input_nodes, net.output_nodes, net.node_evals)
+
+    def activate(self, inputs) -> List[float]:
+        if isinstance(inputs, np.ndarray):
+            inputs = inputs.tolist()
+        return super().activate(inputs)
+
+
+string_to_class = {
+    'neat': RecurrentNetwork,
+    'compiled': CompiledRecurrentNetwork,
+    'generated': GeneratedRecurrentNetwork,
+}
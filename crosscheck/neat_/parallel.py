@@ -0,0 +1,243 @@
+import math
+import multiprocessing
+import pickle
+import queue
+import time
+import traceback
+from typing import Callable, List, Tuple
+import neat
+from ..metascorekeeper import EvaluationSummary
+
+
+def _worker_main(worker_id: int, setup_queue: multiprocessing.Queue, task_queue: multiprocessing.Queue,
+                 result_queue: multiprocessing.Queue, started_queue: multiprocessing.SimpleQueue):
+    """
+    Entry point of a worker process. Evaluates chunks of genomes until it receives None
+    """
+    version = None
+    trainer = config = None
+
+    while True:
+        task = task_queue.get()
+        if task is None:
+            return
+        task_version, method, chunk_id, items = task
+        # So that the chunk can be sent to another worker if this one dies
+        started_queue.put((worker_id, chunk_id))
+
+        # Catch up with the latest trainer and config
+        while version != task_version:
+            version, payload = setup_queue.get()
+            trainer, config = pickle.loads(payload)
+
+        start = time.perf_counter()
+        try:
+            evaluate = getattr(trainer, method)
+            results = [(key, evaluate(item, config)) for key, item in items]
+            error = None
+        except Exception:
+            results = []
+            error = traceback.format_exc()
+        result_queue.put((worker_id, chunk_id, results, time.perf_counter() - start, error))
+
+
+class PersistentParallelEvaluator:
+
+    def __init__(self, num_workers: int, trainer, stream: Callable[[str], None] = print):
+        """
+        Parallel evaluator with long-lived workers. The trainer and config are sent to each worker
+        once, and again only when they change (e.g. a new fitness cutoff), so only the genomes are
+        sent with each task. Genomes go out in chunks that shrink as the generation runs out of work
+        (guided scheduling) and results come back as soon as each chunk is done.
+        :param num_workers: The number of worker processes
+        :param trainer: The trainer, whose _eval_genome_parallel is called in the workers
+        A worker that dies (e.g. killed for running out of memory) is replaced, and its chunk is
+        tried again once before giving up on the generation.
+        :param stream: Where to report per-worker busy/idle time each generation, and lost workers
+        """
+        self.num_workers = num_workers
+        self.trainer = trainer
+        self.stream = stream
+        self.method = '_eval_genome_parallel'
+        # How long to wait for a result before checking that the workers are alive
+        self.poll_interval = 1.0
+        # How many more times to try a chunk whose worker died
+        self.retries = 1
+
+        self._version = 0
+        self._payload = None
+        self._next_chunk_id = 0
+        self._task_queue = multiprocessing.Queue()
+        self._result_queue = multiprocessing.Queue()
+        # Written to directly (no feeder thread), so the announcement isn't lost if the worker dies
+        self._started_queue = multiprocessing.SimpleQueue()
+        self._setup_queues = [None] * num_workers
+        self._workers = [None] * num_workers
+        for i in range(num_workers):
+            self._start_worker(i)
+
+        # Seconds each worker spent evaluating in the last generation
+        self.busy = [0.0] * num_workers
+        self.wall_time = 0.0
+
+    def __del__(self):
+        self.close()
+
+    def close(self):
+        if not self._workers:
+            return
+        for _ in self._workers:
+            self._task_queue.put(None)
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+
+    def _start_worker(self, worker_id: int):
+        """
+        Start (or replace) a worker, with the latest trainer and config
+        """
+        self._setup_queues[worker_id] = multiprocessing.Queue()
+        if self._payload is not None:
+            self._setup_queues[worker_id].put((self._version, self._payload))
+        self._workers[worker_id] = multiprocessing.Process(target=_worker_main,
+                                                           args=(worker_id, self._setup_queues[worker_id],
+                                                                 self._task_queue, self._result_queue,
+                                                                 self._started_queue),
+                                                           daemon=True)
+        self._workers[worker_id].start()
+
+    def evaluate(self, genomes: List[Tuple[int, neat.DefaultGenome]], config: neat.Config):
+        results = self._run(genomes, config)
+        for key, genome in genomes:
+            self._assign(genome, results[key])
+
+    def _run(self, tasks: list, config: neat.Config) -> dict:
+        """
+        Evaluate tasks on the workers
+        :param tasks: (key, task) pairs. Each task is passed to the trainer's method in a worker
+        :return: The result of each task, by key
+        """
+        start = time.perf_counter()
+        self._send_setup(config)
+
+        all_results = {}
+        # The chunks not done yet, by an id that is unique across generations
+        pending = {}
+        attempts = {}
+        for chunk in self._chunks(tasks):
+            chunk_id = self._next_chunk_id
+            self._next_chunk_id += 1
+            pending[chunk_id] = chunk
+            attempts[chunk_id] = 1
+            self._task_queue.put((self._version, self.method, chunk_id, chunk))
+
+        # The latest chunk each worker started
+        started = {}
+        self.busy = [0.0] * self.num_workers
+        while pending:
+            try:
+                worker_id, chunk_id, results, busy, error = self._result_queue.get(timeout=self.poll_interval)
+            except queue.Empty:
+                self._replace_dead_workers(pending, attempts, started)
+                continue
+            if error is not None:
+                raise RuntimeError(f"Worker {worker_id} failed:\n{error}")
+            self.busy[worker_id] += busy
+            # (a chunk tried again after its worker died may come back twice)
+            if pending.pop(chunk_id, None) is not None:
+                all_results.update(results)
+
+        self.wall_time = time.perf_counter() - start
+        self._report()
+        return all_results
+
+    def _replace_dead_workers(self, pending: dict, attempts: dict, started: dict):
+        """
+        Replace the workers that died, and send the chunks they were evaluating to the others
+        :param pending: The chunks not done yet, by id
+        :param attempts: The number of times each chunk was sent
+        :param started: The latest chunk id each worker started, updated here
+        """
+        while not self._started_queue.empty():
+            worker_id, chunk_id = self._started_queue.get()
+            started[worker_id] = chunk_id
+
+        for worker_id, worker in enumerate(self._workers):
+            if worker.is_alive():
+                continue
+            chunk_id = started.pop(worker_id, None)
+            self.stream("Worker {0} died (exit code {1}), replacing it".format(worker_id, worker.exitcode))
+            self._start_worker(worker_id)
+            if chunk_id not in pending:
+                continue
+            if attempts[chunk_id] > self.retries:
+                raise RuntimeError("Workers died {0} times evaluating genomes {1}".format(
+                    attempts[chunk_id], [key for key, _ in pending[chunk_id]]))
+            attempts[chunk_id] += 1
+            self._task_queue.put((self._version, self.method, chunk_id, pending[chunk_id]))
+
+    @staticmethod
+    def _assign(genome: neat.DefaultGenome, result):
+        genome.fitness, genome.metascorekeeper = result
+
+    def _send_setup(self, config: neat.Config):
+        """
+        Send the trainer and config to every worker, if they changed since last time
+        """
+        payload = pickle.dumps((self.trainer, config), pickle.HIGHEST_PROTOCOL)
+        if payload == self._payload:
+            return
+        self._payload = payload
+        self._version += 1
+        for setup_queue in self._setup_queues:
+            setup_queue.put((self._version, payload))
+
+    def _chunks(self, items: list) -> List[list]:
+        """
+        Guided self-scheduling: each chunk is a fraction of the work that is left, so that the
+        chunks are big (little overhead) at the start and small (good balance) at the end
+        """
+        chunks = []
+        index = 0
+        while index < len(items):
+            size = max(1, int(math.ceil((len(items) - index) / (2 * self.num_workers))))
+            chunks.append(items[index:index + size])
+            index += size
+        return chunks
+
+    def _report(self):
+        if not self.wall_time:
+            return
+        utilization = sum(self.busy) / (self.wall_time * self.num_workers) * 100
+        per_worker = ", ".join("{:.1f}/{:.1f}s".format(busy, max(self.wall_time - busy, 0)) for busy in self.busy)
+        self.stream("Workers: {0:.1f}% busy. Busy/idle per worker: {1}".format(utilization, per_worker))
+
+
+class ScenarioParallelEvaluator(PersistentParallelEvaluator):
+
+    def __init__(self, num_workers: int, trainer, stream: Callable[[str], None] = print):
+        """
+        Persistent evaluator that plays each (genome, scenario) pair as a separate task, so that a
+        genome that lasts long in every scenario is spread over several workers instead of holding
+        one for the whole set. The scorekeeper summaries are put back together in the parent.
+        Early termination needs the scenarios played in order, so it does not apply here
+        """
+        super().__init__(num_workers, trainer, stream)
+        self.method = '_eval_scenario_parallel'
+
+    def evaluate(self, genomes: List[Tuple[int, neat.DefaultGenome]], config: neat.Config):
+        # Scenario-major, so neighbouring tasks in a worker play the same scenario
+        tasks = [((key, index), (genome, index))
+                 for index in range(len(self.trainer.scenarios))
+                 for key, genome in genomes]
+        results = self._run(tasks, config)
+
+        for key, genome in genomes:
+            metascorekeeper = self.trainer.metascorekeeper()
+            for index, scenario in enumerate(self.trainer.scenarios):
+                summary, eval_stats = results[(key, index)]
+                metascorekeeper.add(scenario.name, summary)
+                for stat, value in eval_stats.items():
+                    metascorekeeper.eval_stats[stat] = metascorekeeper.eval_stats.get(stat, 0) + value
+            genome.fitness = metascorekeeper.score
+            genome.metascorekeeper = EvaluationSummary.from_metascorekeeper(metascorekeeper)
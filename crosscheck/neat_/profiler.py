@@ -0,0 +1,136 @@
+import math
+import time
+from typing import Callable, Dict, Iterable, List
+
+# The parts of a frame that are timed, in the order they happen
+STAGES = ('env.step', 'feature_vector', 'activate', 'action_labels', 'tick', 'listeners')
+
+# Histogram bins per doubling of the duration (about 9% wide)
+BINS_PER_OCTAVE = 8
+
+
+class StageHistogram:
+    """
+    Log-binned histogram of durations. Fixed resolution no matter how many samples, and two
+    histograms merge by adding their bins
+    """
+    __slots__ = ('bins', 'count', 'total_ns')
+
+    def __init__(self):
+        self.bins: Dict[int, int] = {}
+        self.count = 0
+        self.total_ns = 0
+
+    def add(self, ns: int):
+        index = int(math.log2(ns) * BINS_PER_OCTAVE) if ns > 0 else 0
+        self.bins[index] = self.bins.get(index, 0) + 1
+        self.count += 1
+        self.total_ns += ns
+
+    def merge(self, other: 'StageHistogram'):
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.count += other.count
+        self.total_ns += other.total_ns
+
+    @property
+    def mean_ns(self) -> float:
+        return self.total_ns / self.count if self.count else 0.
+
+    def percentile_ns(self, fraction: float) -> float:
+        """
+        :param fraction: e.g. 0.95 for the 95th percentile
+        :return: The upper edge of the bin that holds the percentile
+        """
+        if not self.count:
+            return 0.
+        target = fraction * self.count
+        seen = 0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen >= target:
+                return 2 ** ((index + 1) / BINS_PER_OCTAVE)
+        return 2 ** ((max(self.bins) + 1) / BINS_PER_OCTAVE)
+
+    def __getstate__(self):
+        return self.bins, self.count, self.total_ns
+
+    def __setstate__(self, state):
+        self.bins, self.count, self.total_ns = state
+
+
+class FrameProfiler:
+    """
+    Time spent in each stage of the frame loop (see STAGES). Only exists when profiling is
+    enabled; the trainer then wraps the calls it makes every frame with timed(). Kept in the
+    evaluation stats, where profilers are summed like any other statistic
+    """
+    __slots__ = ('stages', 'frames', 'wall_ns')
+
+    def __init__(self):
+        self.stages: Dict[str, StageHistogram] = {x: StageHistogram() for x in STAGES}
+        self.frames = 0
+        self.wall_ns = 0
+
+    def timed(self, stage: str, function: Callable) -> Callable:
+        """
+        :return: function, recording how long each call takes under stage
+        """
+        histogram = self.stages[stage]
+        clock = time.perf_counter_ns
+
+        def wrapper(*args):
+            start = clock()
+            result = function(*args)
+            histogram.add(clock() - start)
+            return result
+        return wrapper
+
+    def add_rollout(self, frames: int, wall_ns: int):
+        """
+        Record a whole rollout, for frames per second
+        """
+        self.frames += frames
+        self.wall_ns += wall_ns
+
+    def merge(self, other: 'FrameProfiler'):
+        for stage, histogram in other.stages.items():
+            self.stages.setdefault(stage, StageHistogram()).merge(histogram)
+        self.frames += other.frames
+        self.wall_ns += other.wall_ns
+
+    @property
+    def frames_per_second(self) -> float:
+        return self.frames / self.wall_ns * 1e9 if self.wall_ns else 0.
+
+    def rows(self) -> List[dict]:
+        """
+        :return: Mean and 95th percentile per stage, in microseconds
+        """
+        return [{'stage': stage, 'calls': x.count, 'mean_us': x.mean_ns / 1e3, 'p95_us': x.percentile_ns(0.95) / 1e3}
+                for stage, x in self.stages.items()]
+
+    def __add__(self, other: 'FrameProfiler') -> 'FrameProfiler':
+        total = FrameProfiler()
+        total.merge(self)
+        total.merge(other)
+        return total
+
+    def __radd__(self, other) -> 'FrameProfiler':
+        # For sum() and totals that start at 0
+        if other == 0:
+            return self + FrameProfiler()
+        return NotImplemented
+
+    def __getstate__(self):
+        return self.stages, self.frames, self.wall_ns
+
+    def __setstate__(self, state):
+        self.stages, self.frames, self.wall_ns = state
+
+
+def merge_all(profilers: Iterable[FrameProfiler]) -> FrameProfiler:
+    total = FrameProfiler()
+    for profiler in profilers:
+        total.merge(profiler)
+    return total
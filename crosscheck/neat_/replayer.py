@@ -1,12 +1,14 @@
 import neat
 import tqdm
 from typing import List, Type
-from ..game_env import get_genv
+from ..game_env import get_genv, load_state
 from ..metascorekeeper import Metascorekeeper
 from ..metascorekeeper.summer import Summer
 from ..scenario import Scenario
+from ..info_utils.feature_vector import FeatureVector
+from ..info_utils.recording import episode_metadata
 from .. import discretizers
-from typing import Callable
+from . import network
 
 
 
@@ -14,15 +16,17 @@ class Replayer:
 
     def __init__(self, scenario: Scenario,
                  metascorekeeper: Type[Metascorekeeper],
-                 feature_vector: Callable[[dict], List[float]],
+                 feature_vector: FeatureVector,
                  neat_settings_file: str,
-                 discretizer: Type[discretizers.Independent] = None):
+                 discretizer: Type[discretizers.Independent] = None,
+                 network: str = 'generated'):
         self.scenario = scenario
         self.listeners = []
         self.metascorekeeper = metascorekeeper
         self.feature_vector = feature_vector
         self.neat_settings_file = neat_settings_file
         self.discretizer = discretizer
+        self.network = network
 
     def replay(self, genome: neat.DefaultGenome):
         # Create neat config
@@ -49,9 +53,9 @@ class Replayer:
 
         scorekeeper = scenario.scorekeeper()
 
-        env.load_state(str(scenario.save_state))
+        load_state(env, scenario.save_state)
         _ = env.reset()
-        net = neat.nn.recurrent.RecurrentNetwork.create(genome, config)
+        net = network.string_to_class[self.network].create(genome, config)
 
         # No buttons pressed in first frame
         next_action = [0] * config.genome_config.num_outputs
@@ -61,6 +65,10 @@ class Replayer:
         total_frames = 0
         stoppage_frames = 60 * 5
 
+        # Match the decision frames used in training
+        action_repeat = scenario.action_repeat
+        last_tick_frame = 0
+
         while not scorekeeper.done or frames_since_done < stoppage_frames:
 
             if scorekeeper.done:
@@ -73,11 +81,20 @@ class Replayer:
             info = step[3]
             scorekeeper.info = info
 
-            # Determine the next action so it can be fed into the scorekeeper
-            next_action = net.activate(self.feature_vector(info))
-            scorekeeper.buttons_pressed = env.action_labels(next_action)
+            if total_frames % action_repeat == 0:
+                # Determine the next action so it can be fed into the scorekeeper
+                next_action = net.activate(self.feature_vector(info))
+                scorekeeper.buttons_pressed = env.action_labels(next_action)
+
+                scorekeeper.frames_per_tick = total_frames + 1 - last_tick_frame
+                last_tick_frame = total_frames + 1
+                scorekeeper.tick()
 
-            scorekeeper.tick()
+            elif not scorekeeper.done and scorekeeper.check_done():
+                # Account for the frames since the last decision
+                scorekeeper.frames_per_tick = total_frames + 1 - last_tick_frame
+                last_tick_frame = total_frames + 1
+                scorekeeper.tick()
 
             for listener in self.listeners:
                 listener(*step, {'scorekeeper': scorekeeper})
@@ -85,6 +102,11 @@ class Replayer:
 
         genome.fitness = scorekeeper.score
 
+        for listener in self.listeners:
+            end_episode = getattr(listener, 'end_episode', None)
+            if end_episode is not None:
+                end_episode(dict(episode_metadata(scenario, scorekeeper), genome=genome.key))
+
         msk = Summer()
         msk.add("Passthru", scorekeeper)
         return scorekeeper.stats, scorekeeper
@@ -0,0 +1,176 @@
+import collections
+import pickle
+import sys
+from typing import Dict, Optional
+
+
+class _Node:
+    __slots__ = ('children', 'info', 'done', 'snapshot')
+
+    def __init__(self, info: Optional[dict]):
+        # Discretized action -> next node
+        self.children: Dict[tuple, _Node] = {}
+        # The info returned by the step into this node
+        self.info = info
+        # True if the scorekeeper was done after this node's frame
+        self.done = False
+        # State just before the step into this node (see Snapshot)
+        self.snapshot: Optional[Snapshot] = None
+
+
+class Snapshot:
+    __slots__ = ('emulator', 'scorekeeper', 'last_tick_frame', 'nbytes')
+
+    def __init__(self, emulator: bytes, scorekeeper: bytes, last_tick_frame: int):
+        """
+        Everything needed to resume a rollout right before the step into a node. It is
+        stored on the node, rather than its parent, because the scorekeeper has already
+        seen the action that leads into the node
+        """
+        self.emulator = emulator
+        self.scorekeeper = scorekeeper
+        self.last_tick_frame = last_tick_frame
+        self.nbytes = len(emulator) + len(scorekeeper)
+
+
+class RolloutTrie:
+
+    def __init__(self, memory_mb: int, max_depth: int = 600, snapshot_interval: int = 30):
+        """
+        Snapshots of rollouts keyed by the discretized actions taken since the start of a
+        scenario. Genomes that take the same actions from the same save state see the same frames,
+        so a genome can skip ahead to the deepest snapshot on the path matching its own actions.
+        One trie is kept per process
+        :param memory_mb: Approximate cap on the memory used. When exceeded, the least recently used
+        snapshots are dropped first, and new frames stop being added once only frames are left
+        :param max_depth: The number of frames from the start of a scenario that are tracked
+        :param snapshot_interval: Frames between snapshots along a path
+        """
+        self.memory_cap = memory_mb * 1024 * 1024
+        self.max_depth = max_depth
+        self.snapshot_interval = snapshot_interval
+
+        self._roots: Dict[tuple, _Node] = {}
+        self._snapshots = collections.OrderedDict()  # type: collections.OrderedDict[_Node, int]
+        self._snapshot_bytes = 0
+        self._node_bytes = 0
+
+    @property
+    def nbytes(self) -> int:
+        return self._snapshot_bytes + self._node_bytes
+
+    def root(self, key: tuple) -> _Node:
+        """
+        Accessor for the root of a scenario
+        :param key: Identifies the save state and everything else that makes rollouts deterministic
+        """
+        node = self._roots.get(key)
+        if node is None:
+            node = _Node(None)
+            self._roots[key] = node
+        return node
+
+    def use(self, node: _Node) -> Snapshot:
+        """
+        Accessor for the snapshot of a node, marking it as recently used
+        """
+        self._snapshots.move_to_end(node)
+        return node.snapshot
+
+    def wants_snapshot(self, node: Optional[_Node], depth: int, key: tuple) -> bool:
+        """
+        :param node: The current node, at depth - 1
+        :param depth: The depth of the node about to be stepped into
+        :param key: The action about to be taken
+        :return: True if a snapshot should be taken before the step
+        """
+        if node is None or depth % self.snapshot_interval != 0 or depth > self.max_depth:
+            return False
+        child = node.children.get(key)
+        return child is None or child.snapshot is None
+
+    def extend(self, node: Optional[_Node], depth: int, key: tuple, info: dict,
+               snapshot: Optional[Snapshot]) -> Optional[_Node]:
+        """
+        Follow (or add) the child for a step that was just simulated
+        :param node: The node before the step, at depth - 1
+        :param depth: The depth of the child
+        :param key: The action taken
+        :param info: The info returned by the step
+        :param snapshot: The state right before the step, if taken
+        :return: The child, or None once the trie is no longer tracking this rollout
+        """
+        if node is None or depth > self.max_depth:
+            return None
+        child = node.children.get(key)
+        if child is None:
+            if self.nbytes > self.memory_cap:
+                return None
+            child = _Node(info)
+            node.children[key] = child
+            self._node_bytes += sys.getsizeof(child) + sys.getsizeof(info) + 64 * len(info)
+        if snapshot is not None and child.snapshot is None:
+            child.snapshot = snapshot
+            self._snapshots[child] = snapshot.nbytes
+            self._snapshot_bytes += snapshot.nbytes
+            self._evict()
+        return child
+
+    def _evict(self):
+        while self.nbytes > self.memory_cap and self._snapshots:
+            node, nbytes = self._snapshots.popitem(last=False)
+            node.snapshot = None
+            self._snapshot_bytes -= nbytes
+
+
+class _Singleton:
+    trie: Optional[RolloutTrie] = None
+
+
+def get_trie(memory_mb: int, max_depth: int, snapshot_interval: int) -> RolloutTrie:
+    """
+    Get or create the trie for this process
+    """
+    if _Singleton.trie is None:
+        _Singleton.trie = RolloutTrie(memory_mb, max_depth, snapshot_interval)
+    return _Singleton.trie
+
+
+def action_key(env, action) -> tuple:
+    """
+    The buttons that an action presses, which is all the emulator sees of it
+    """
+    if hasattr(env, 'action'):
+        return tuple(env.action(action))
+    return tuple(action)
+
+
+def take_snapshot(env, scorekeeper, last_tick_frame: int) -> Snapshot:
+    return Snapshot(env.unwrapped.em.get_state(), pickle.dumps(scorekeeper, pickle.HIGHEST_PROTOCOL),
+                    last_tick_frame)
+
+
+def restore_snapshot(env, snapshot: Snapshot):
+    """
+    Restore the emulator (after a reset) and return a copy of the scorekeeper
+    """
+    env.unwrapped.em.set_state(snapshot.emulator)
+    return pickle.loads(snapshot.scorekeeper)
+
+
+def network_state(net):
+    """
+    Copy of a network's values, for either a RecurrentNetwork or a CompiledRecurrentNetwork
+    """
+    if hasattr(net, 'get_state'):
+        return net.get_state()
+    return [dict(x) for x in net.values], net.active
+
+
+def restore_network_state(net, state):
+    if hasattr(net, 'set_state'):
+        net.set_state(state)
+        return
+    values, active = state
+    net.values = [dict(x) for x in values]
+    net.active = active
@@ -1,30 +1,56 @@
 import neat
+import time
+import numpy as np
 import tqdm
 import pickle
 import pathlib
+import secrets
 import configparser
-from typing import List, Type
+from typing import List, Optional, Tuple, Type
 from loguru import logger
 from crosscheck import definitions
 from crosscheck.log_folder import LogFolder
 from . import utils as custom_neat_utils
-from ..game_env import get_genv
-from ..metascorekeeper import Metascorekeeper
+from . import rollout_trie
+from . import network
+from .eval_cache import EvaluationCache
+from .profiler import FrameProfiler
+from .parallel import PersistentParallelEvaluator, ScenarioParallelEvaluator
+from .distributed import DistributedEvaluator, parse_address
+from ..game_env import get_genv, load_state, SaveStateCache
+from ..metascorekeeper import Metascorekeeper, EvaluationSummary
 from ..scenario import Scenario
+from ..info_utils.feature_vector import FeatureVector
+from ..info_utils.wrapper import FrameContext
+from ..info_utils.recording import EpisodeRecorder, episode_metadata
+from ..scorekeeper import Scorekeeper, ScorekeeperSummary
 from .. import discretizers
 from typing import Callable
-from collections import defaultdict
 
 
 class Trainer:
 
     def __init__(self, scenarios: List[Scenario],
                  metascorekeeper: Type[Metascorekeeper],
-                 feature_vector: Callable[[dict], List[float]],
+                 feature_vector: FeatureVector,
                  neat_settings: dict = None,
                  discretizer: Type[discretizers.Independent] = None,
                  nproc:int = 1,
-                 checkpoint_filename: str = None):
+                 checkpoint_filename: str = None,
+                 early_termination: bool = False,
+                 rollout_trie_settings: dict = None,
+                 eval_cache_size: int = 0,
+                 headless: bool = False,
+                 ram_decoder: bool = False,
+                 evaluator: str = 'pool',
+                 distributed_settings: dict = None,
+                 pool_settings: dict = None,
+                 frame_budget: int = 0,
+                 profile: bool = False,
+                 env_factory: Callable = None,
+                 record_episodes: bool = False,
+                 network: str = 'generated',
+                 lockstep_size: int = 64):
         self.scenarios = scenarios
         self.listeners = []
         self.metascorekeeper = metascorekeeper
@@ -35,13 +61,54 @@ class Trainer:
         self.discretizer = discretizer
         self.nproc = nproc
         self.checkpoint_filename = checkpoint_filename
-
-    def _setup_neat_config(self) -> pathlib.Path:
+        # When set, stop evaluating a genome once its metascorekeeper's upper bound falls below
+        # the fitness cutoff. The cutoff is updated by the parent after each generation and reaches
+        # the workers along with the trainer. A heuristic: such genomes are then ranked below every
+        # fully evaluated genome (see EarlyTerminationRanking)
+        self.early_termination = early_termination
+        self.fitness_cutoff = None
+        # Settings for sharing rollout prefixes between genomes (see RolloutTrie). Off if None
+        self.rollout_trie_settings = rollout_trie_settings
+        # The number of genome evaluations to memoize across generations. Off if 0
+        self.eval_cache_size = eval_cache_size
+        # True to train on an environment that doesn't render observations
+        self.headless = headless
+        # True to decode the info straight from RAM (requires headless)
+        self.ram_decoder = ram_decoder
+        # How genomes are spread over processes when nproc > 1
+        #  'pool': A task per genome on a multiprocessing pool
+        #  'persistent': Chunks of genomes on long-lived workers (see PersistentParallelEvaluator)
+        #  'scenario': Like 'persistent', but each scenario of a genome is a separate task
+        #  'distributed': Batches of genomes on workers on other machines (regardless of nproc)
+        #  'lockstep': Batches of genomes played side by side in this process (regardless of nproc).
+        #              Needs an env_factory, since retro only allows one emulator per process
+        self.evaluator = evaluator
+        # Where to listen for workers and how to feed them, for the 'distributed' evaluator
+        self.distributed_settings = distributed_settings
+        # Recycling, timeouts and retries for the 'pool' evaluator
+        self.pool_settings = pool_settings or {}
+        # Most frames to play per genome, over all its scenarios. 0 for no limit
+        self.frame_budget = frame_budget
+        # True to time the stages of each frame (see FrameProfiler)
+        self.profile = profile
+        # Creates the environment in each process instead of the game (e.g. a TraceEnvFactory for benchmarks).
+        # Called with the index of the environment, as 'lockstep' needs several per process
+        self.env_factory = env_factory
+        # True to write every frame of every episode to the log folder (see EpisodeRecorder)
+        self.record_episodes = record_episodes
+        # How genomes become networks (see network.string_to_class)
+        self.network = network
+        # The number of genomes the 'lockstep' evaluator plays side by side
+        self.lockstep_size = lockstep_size
+
+    def _setup_neat_config(self, log_folder: pathlib.Path = None) -> pathlib.Path:
         """
         Dynamically create config from a template, and store it in the log folder
+        :param log_folder: Where to store the config, if not the log folder
         :return: Path to new config
         """
-        log_folder = LogFolder.folder
+        if log_folder is None:
+            log_folder = LogFolder.folder
 
         # Read template
         parser = configparser.ConfigParser()
@@ -54,9 +121,8 @@ class Trainer:
         fitness_threshold = self.metascorekeeper.fitness_threshold(scorekeepers)
         parser["NEAT"]["fitness_threshold"] = str(fitness_threshold)
 
-        # Calculate and set length of feature vector
-        sample_vector = self.feature_vector(defaultdict(lambda: 0))
-        parser["DefaultGenome"]["num_inputs"] = str(len(sample_vector))
+        # Set length of feature vector
+        parser["DefaultGenome"]["num_inputs"] = str(len(self.feature_vector))
 
         # Calculate and set length of discretizer
         parser["DefaultGenome"]["num_outputs"] = str(self.discretizer.button_count())
@@ -88,6 +154,10 @@ class Trainer:
                                   neat.DefaultSpeciesSet, neat.DefaultStagnation,
                                   config_filename)
 
+        # Decompress the save states once, before any workers are created
+        SaveStateCache.preload(x.save_state for x in self.scenarios)
+        logger.info("Save state cache: {}", SaveStateCache.counters())
+
         # Run tqdm and do training
         with tqdm.tqdm(smoothing=0, unit='gen') as progress_bar:
             if not self.checkpoint_filename:
@@ -101,7 +171,8 @@ class Trainer:
 
             log_folder = LogFolder.folder
 
-            population.add_reporter(custom_neat_utils.GenerationReporter(True, logger.info))
+            profile_filename = log_folder / "profile.csv" if self.profile else None
+            population.add_reporter(custom_neat_utils.GenerationReporter(True, logger.info, profile_filename))
             population.add_reporter(neat.StatisticsReporter())
             population.add_reporter(custom_neat_utils.TqdmReporter(progress_bar))
             checkpoint_folder = log_folder / "checkpoints"
@@ -111,20 +182,78 @@ class Trainer:
             generations_folder = (log_folder / "generations")
             generations_folder.mkdir(parents=False, exist_ok=False)
             population.add_reporter(custom_neat_utils.SaveBestOfGeneration(generations_folder / "generation-"))
-
+            if self.early_termination:
+                population.add_reporter(custom_neat_utils.SurvivalCutoffReporter(self))
+            if self.record_episodes:
+                self.listeners.append(EpisodeRecorder(log_folder / "episodes"))
+
+            if self.evaluator == 'distributed':
+                # Workers on other machines
+                settings = self.distributed_settings
+                authkey = settings['authkey']
+                if not authkey:
+                    authkey = secrets.token_hex(16)
+                    logger.warning("Generated authkey for the distributed workers: --authkey {}", authkey)
+                parallelizer = DistributedEvaluator(self, parse_address(settings['listen']),
+                                                    authkey.encode(),
+                                                    batch_size=settings['batch-size'],
+                                                    heartbeat_timeout=settings['heartbeat-timeout'],
+                                                    stream=logger.info)
+                evaluate = parallelizer.evaluate
+            elif self.evaluator == 'lockstep':
+                # Retro can only have one emulator per process
+                if self.env_factory is None:
+                    raise ValueError("The lockstep evaluator needs an env_factory that can create several environments")
+                parallelizer = None
+                evaluate = self._eval_genomes_lockstep
             # Run single-threaded. Kept in for easier debugging
-            if self.nproc <= 1:
-                fittest = population.run(self._eval_genomes)
+            elif self.nproc <= 1:
+                parallelizer = None
+                evaluate = self._eval_genomes
+            elif self.evaluator == 'persistent':
+                # Long-lived workers that only receive genomes
+                parallelizer = PersistentParallelEvaluator(self.nproc, self, stream=logger.info)
+                evaluate = parallelizer.evaluate
+            elif self.evaluator == 'scenario':
+                # Long-lived workers that play one scenario of one genome at a time
+                parallelizer = ScenarioParallelEvaluator(self.nproc, self, stream=logger.info)
+                evaluate = parallelizer.evaluate
             else:
                 # Multi-threaded execution
+                settings = self.pool_settings
                 parallelizer = custom_neat_utils.CustomParallelEvaluator(
-                    self.nproc, self._eval_genome_parallel)
-                fittest = population.run(parallelizer.evaluate)
+                    self.nproc, self._eval_genome_parallel,
+                    timeout=settings.get('genome-timeout') or None,
+                    maxtasksperchild=settings.get('max-tasks-per-child') or None,
+                    retries=settings.get('retries', 1),
+                    stream=logger.info)
+                evaluate = parallelizer.evaluate
+
+            # Don't re-simulate genomes that have already been evaluated
+            if self.eval_cache_size:
+                evaluate = EvaluationCache(evaluate, self._eval_identity(), self.eval_cache_size).evaluate
+            # Genomes that stopped early must not outrank the ones that played every scenario
+            if self.early_termination:
+                evaluate = custom_neat_utils.EarlyTerminationRanking(evaluate).evaluate
+
+            fittest = population.run(evaluate)
+            if parallelizer is not None:
+                parallelizer.close()
 
             # Dump the result
             with open(log_folder / "fittest.pkl", 'wb') as f:
                 pickle.dump(fittest, f, 1)
 
+    def _eval_identity(self) -> tuple:
+        """
+        Everything besides the genome that determines its fitness
+        """
+        scenarios = tuple((x.name, definitions.relative_save_state(x.save_state), x.scorekeeper.__name__,
+                           x.action_repeat) for x in self.scenarios)
+        feature_vector = getattr(self.feature_vector, '__qualname__', type(self.feature_vector).__qualname__)
+        discretizer = None if self.discretizer is None else self.discretizer.__qualname__
+        return scenarios, self.metascorekeeper.__qualname__, feature_vector, discretizer, self.network
+
     def _eval_genomes(self, genomes: List[neat.DefaultGenome], config: neat.Config):
         """
         Evaluate many genomes serially in a for-loop
@@ -136,6 +265,138 @@ class Trainer:
             logger.debug("{gid:5} {score:+5} Stats:{stats}",
                          gid=genome_id, score=genome.fitness, stats=stats)
 
+        # Only this process's cache can be checked. The hits and misses of every process are
+        # reported by GenerationReporter
+        stale = SaveStateCache.validate()
+        if stale:
+            logger.warning("Save states changed on disk, reloading: {}", stale)
+
+    def _eval_genomes_lockstep(self, genomes: List[Tuple[int, neat.DefaultGenome]], config: neat.Config):
+        """
+        Evaluate many genomes in batches, each batch playing every scenario in lockstep so that
+        their networks are evaluated together (see batch_networks; only 'compiled' networks are
+        merged, others are activated one by one). Falls back to
+        _eval_genomes when listeners need to see whole episodes one at a time
+        """
+        if self.listeners:
+            self._eval_genomes(genomes, config)
+            return
+
+        size = max(self.lockstep_size, 1)
+        envs = [self._env(index) for index in range(min(size, len(genomes)))]
+        for start in range(0, len(genomes), size):
+            batch = [genome for _, genome in genomes[start:start + size]]
+            nets = [network.string_to_class[self.network].create(genome, config) for genome in batch]
+            metascorekeepers = [self.metascorekeeper() for _ in batch]
+            playing = list(range(len(batch)))
+
+            for index, scenario in enumerate(self.scenarios):
+                max_frames = []
+                for member in playing:
+                    nets[member].reset()
+                    eval_stats = metascorekeepers[member].eval_stats
+                    used = eval_stats.get('frames', 0)
+                    max_frames.append(max(self.frame_budget - used, 0) if self.frame_budget else None)
+
+                scorekeepers = self._eval_scenario_lockstep([envs[x] for x in playing], [nets[x] for x in playing],
+                                                            scenario, config,
+                                                            [metascorekeepers[x].eval_stats for x in playing],
+                                                            max_frames)
+
+                # Bail on the genomes that are unlikely to survive to the next generation
+                remaining = [x.scorekeeper for x in self.scenarios[index + 1:]]
+                for member, scorekeeper in zip(list(playing), scorekeepers):
+                    metascorekeeper = metascorekeepers[member]
+                    metascorekeeper.add(scenario.name, scorekeeper)
+                    if self.early_termination and self.fitness_cutoff is not None and remaining:
+                        upper_bound = metascorekeeper.upper_bound(remaining)
+                        if upper_bound < self.fitness_cutoff:
+                            metascorekeeper.eval_stats['skipped_scenarios'] = len(remaining)
+                            batch[member].fitness = upper_bound
+                            playing.remove(member)
+
+            for member, genome in enumerate(batch):
+                metascorekeeper = metascorekeepers[member]
+                if member in playing:
+                    genome.fitness = metascorekeeper.score
+                genome.metascorekeeper = EvaluationSummary.from_metascorekeeper(metascorekeeper, genome.fitness)
+
+    def _eval_scenario_lockstep(self, envs: list, nets: list,
+                                scenario: Scenario, config: neat.Config, eval_stats: List[dict],
+                                max_frames: List[Optional[int]]) -> List[Scorekeeper]:
+        """
+        Play a scenario to completion with several networks, each on its own environment, one
+        frame of all of them at a time. Follows _eval_scenario for each of them
+        :param eval_stats: Statistics on each evaluation, updated in place
+        :param max_frames: For each network, stop after this many frames even if not complete
+        :return: The scorekeeper for each network
+        """
+        batch = network.batch_networks(nets)
+        scorekeepers = [scenario.scorekeeper() for _ in nets]
+        for env, member_stats in zip(envs, eval_stats):
+            load_state(env, scenario.save_state, member_stats)
+            _ = env.reset()
+
+        # No buttons pressed in first frame
+        next_actions = [[0] * config.genome_config.num_outputs for _ in nets]
+        last_tick_frames = [0] * len(nets)
+        action_repeat = scenario.action_repeat
+        feature_vector = self.feature_vector
+        frame = 0
+        playing = list(range(len(nets)))
+
+        def finish(member: int):
+            eval_stats[member]['frames'] = eval_stats[member].get('frames', 0) + frame
+            self._end_episode(scenario, scorekeepers[member])
+            playing.remove(member)
+            batch.remove(member)
+
+        for member in playing[:]:
+            if scorekeepers[member].done:
+                finish(member)
+
+        while playing:
+
+            for member in playing[:]:
+                if max_frames[member] is not None and frame >= max_frames[member]:
+                    eval_stats[member]['over_frame_budget'] = 1
+                    finish(member)
+
+            # Run the next step in every simulation
+            frame += 1
+            deciding = (frame - 1) % action_repeat == 0
+            features = np.empty((len(playing) if deciding else 0, len(feature_vector)))
+            for row, member in enumerate(playing):
+                scorekeeper = scorekeepers[member]
+                info = envs[member].step(next_actions[member])[3]
+                scorekeeper.info = info
+                if deciding:
+                    # Derived info is shared between the feature vector and the scorekeeper
+                    context = FrameContext(info)
+                    scorekeeper.context = context
+                    features[row] = feature_vector(info, context)
+                elif scorekeeper.check_done():
+                    # Account for the frames since the last decision
+                    scorekeeper.frames_per_tick = frame - last_tick_frames[member]
+                    last_tick_frames[member] = frame
+                    scorekeeper.tick()
+
+            if deciding:
+                # Determine the next actions so they can be fed into the scorekeepers
+                for member, next_action in zip(playing, batch.activate(playing, features)):
+                    scorekeeper = scorekeepers[member]
+                    next_actions[member] = next_action
+                    scorekeeper.buttons_pressed = envs[member].action_labels(next_action)
+                    scorekeeper.frames_per_tick = frame - last_tick_frames[member]
+                    last_tick_frames[member] = frame
+                    scorekeeper.tick()
+
+            for member in playing[:]:
+                if scorekeepers[member].done:
+                    finish(member)
+
+        return scorekeepers
+
     def _eval_genome_parallel(self, genome: neat.DefaultGenome, config: neat.Config):
         """
         Parallel version of eval_genome (has a slightly different API)
@@ -145,52 +406,234 @@ class Trainer:
     def _eval_genome(self, genome: neat.DefaultGenome, config: neat.Config):
         """
         Evaluate a single genome
-        :return: The trainer's stats, as a dictionary
+        :return: The fitness, and a summary of the evaluation
         """
 
-        env = get_genv()
-        if self.discretizer is not None:
-            env = self.discretizer(env)
+        env = self._env()
         metascorekeeper = self.metascorekeeper()
+        if self.profile:
+            metascorekeeper.eval_stats['profile'] = FrameProfiler()
+
+        # One network for all the scenarios, starting each from a clean state
+        net = network.string_to_class[self.network].create(genome, config)
+        for index, scenario in enumerate(self.scenarios):
+            net.reset()
+            max_frames = None
+            if self.frame_budget:
+                eval_stats = metascorekeeper.eval_stats
+                used = eval_stats.get('frames', 0) + eval_stats.get('prefix_frames_saved', 0)
+                max_frames = max(self.frame_budget - used, 0)
+            scorekeeper = self._eval_scenario(env, net, scenario, config, metascorekeeper.eval_stats, max_frames)
+            metascorekeeper.add(scenario.name, scorekeeper)
+            self._render()
 
-        for scenario in self.scenarios:
+            # Bail when the genome is unlikely to survive to the next generation
+            remaining = [x.scorekeeper for x in self.scenarios[index + 1:]]
+            if self.early_termination and self.fitness_cutoff is not None and remaining:
+                upper_bound = metascorekeeper.upper_bound(remaining)
+                if upper_bound < self.fitness_cutoff:
+                    metascorekeeper.eval_stats['skipped_scenarios'] = len(remaining)
+                    genome.fitness = upper_bound
+                    return genome.fitness, EvaluationSummary.from_metascorekeeper(metascorekeeper, genome.fitness)
 
-            scorekeeper = scenario.scorekeeper()
+        genome.fitness = metascorekeeper.score
 
-            env.load_state(str(scenario.save_state))
-            _ = env.reset()
-            net = neat.nn.recurrent.RecurrentNetwork.create(genome, config)
+        return genome.fitness, EvaluationSummary.from_metascorekeeper(metascorekeeper)
 
-            # No buttons pressed in first frame
-            next_action = [0] * config.genome_config.num_outputs
-            scenario.scorekeeper.env = env
+    def _eval_scenario_parallel(self, task: Tuple[neat.DefaultGenome, int], config: neat.Config) \
+            -> Tuple[ScorekeeperSummary, dict]:
+        """
+        Play one scenario of a genome, for when scenarios are scheduled as separate tasks
+        :param task: The genome and the index of the scenario to play
+        :return: The summary of the scenario's scorekeeper, and the evaluation stats
+        """
+        genome, index = task
+        eval_stats = {'profile': FrameProfiler()} if self.profile else {}
+        net = network.string_to_class[self.network].create(genome, config)
+        # The genome's frame budget applies to each scenario on its own
+        scorekeeper = self._eval_scenario(self._env(), net, self.scenarios[index], config, eval_stats,
+                                          self.frame_budget or None)
+        return scorekeeper.summary(), eval_stats
+
+    def _env(self, index: int = 0):
+        """
+        Accessor for this process's environment, with the discretizer applied
+        :param index: Which of the process's environments, for more than one (only with env_factory)
+        """
+        if self.env_factory is not None:
+            env = self.env_factory(index)
+        else:
+            env = get_genv(self.headless, self.ram_decoder)
+        if self.discretizer is not None:
+            env = self.discretizer(env)
+        return env
+
+    def _eval_scenario(self, env, net, scenario: Scenario, config: neat.Config,
+                       eval_stats: dict = None, max_frames: int = None) -> Scorekeeper:
+        """
+        Play a single scenario to completion
+        :param eval_stats: Statistics on the evaluation, updated in place
+        :param max_frames: Stop after this many frames, even if the scenario is not complete
+        :return: The scorekeeper for the scenario
+        """
+        if eval_stats is None:
+            eval_stats = {}
+
+        scorekeeper = scenario.scorekeeper()
+
+        load_state(env, scenario.save_state, eval_stats)
+        _ = env.reset()
+
+        # No buttons pressed in first frame
+        next_action = [0] * config.genome_config.num_outputs
+        scenario.scorekeeper.env = env
+
+        # The network only decides (and the scorekeeper only scores) on every Nth frame. The
+        # first frame is always a decision frame
+        action_repeat = scenario.action_repeat
+        frame = 0
+        last_tick_frame = 0
+
+        # Skip over the frames this genome shares with earlier rollouts
+        trie = self._rollout_trie()
+        node = None
+        if trie is not None:
+            node = trie.root(self._rollout_trie_key(scenario))
+            resumed = self._resume_rollout(trie, node, env, net, scenario, next_action, max_frames)
+            if resumed is not None:
+                node, snapshot, next_action, frame = resumed
+                scorekeeper = rollout_trie.restore_snapshot(env, snapshot)
+                last_tick_frame = snapshot.last_tick_frame
+                eval_stats['prefix_frames_saved'] = eval_stats.get('prefix_frames_saved', 0) + frame
+        start_frame = frame
+
+        # The calls made every frame, each timed when profiling
+        env_step, feature_vector, activate = env.step, self.feature_vector, net.activate
+        action_labels, tick, notify = env.action_labels, scorekeeper.tick, self._notify_listeners
+        profiler = eval_stats.get('profile')
+        if profiler is not None:
+            env_step = profiler.timed('env.step', env_step)
+            feature_vector = profiler.timed('feature_vector', feature_vector)
+            activate = profiler.timed('activate', activate)
+            action_labels = profiler.timed('action_labels', action_labels)
+            tick = profiler.timed('tick', tick)
+            notify = profiler.timed('listeners', notify)
+        started = time.perf_counter_ns()
+
+        while not scorekeeper.done:
+
+            if max_frames is not None and frame >= max_frames:
+                eval_stats['over_frame_budget'] = 1
+                break
 
-            while not scorekeeper.done:
+            self._render()
 
-                self._render()
+            snapshot = None
+            if node is not None:
+                key = rollout_trie.action_key(env, next_action)
+                if trie.wants_snapshot(node, frame + 1, key):
+                    snapshot = rollout_trie.take_snapshot(env, scorekeeper, last_tick_frame)
 
-                # Run the next step in the simulation
-                step = env.step(next_action)
+            # Run the next step in the simulation
+            step = env_step(next_action)
+            frame += 1
 
-                # Save the latest state
-                info = step[3]
-                scorekeeper.info = info
+            # Save the latest state
+            info = step[3]
+            scorekeeper.info = info
+
+            if (frame - 1) % action_repeat == 0:
+                # Derived info is shared between the feature vector and the scorekeeper
+                context = FrameContext(info)
+                scorekeeper.context = context
 
                 # Determine the next action so it can be fed into the scorekeeper
-                next_action = net.activate(self.feature_vector(info))
-                scorekeeper.buttons_pressed = env.action_labels(next_action)
+                next_action = activate(feature_vector(info, context))
+                scorekeeper.buttons_pressed = action_labels(next_action)
 
-                scorekeeper.tick()
+                scorekeeper.frames_per_tick = frame - last_tick_frame
+                last_tick_frame = frame
+                tick()
 
-                for listener in self.listeners:
-                    listener(*step, {'scorekeeper': scorekeeper})
+            elif scorekeeper.check_done():
+                # Account for the frames since the last decision
+                scorekeeper.frames_per_tick = frame - last_tick_frame
+                last_tick_frame = frame
+                tick()
 
-            metascorekeeper.add(scenario.name, scorekeeper)
-            self._render()
+            if node is not None:
+                node = trie.extend(node, frame, key, info, snapshot)
+                if node is not None and scorekeeper.done:
+                    node.done = True
 
-        genome.fitness = metascorekeeper.score
+            if self.listeners:
+                notify(step, scorekeeper)
 
-        return genome.fitness, metascorekeeper
+        eval_stats['frames'] = eval_stats.get('frames', 0) + frame - start_frame
+        self._end_episode(scenario, scorekeeper)
+        if profiler is not None:
+            profiler.add_rollout(frame - start_frame, time.perf_counter_ns() - started)
+
+        return scorekeeper
+
+    def _notify_listeners(self, step: tuple, scorekeeper: Scorekeeper):
+        for listener in self.listeners:
+            listener(*step, {'scorekeeper': scorekeeper})
+
+    def _end_episode(self, scenario: Scenario, scorekeeper: Scorekeeper):
+        """
+        Let listeners that keep whole episodes (e.g. EpisodeRecorder) know that the scenario is over
+        """
+        for listener in self.listeners:
+            end_episode = getattr(listener, 'end_episode', None)
+            if end_episode is not None:
+                end_episode(episode_metadata(scenario, scorekeeper))
+
+    def _rollout_trie(self) -> Optional[rollout_trie.RolloutTrie]:
+        """
+        Accessor for this process's rollout trie, if enabled. Listeners need to see every
+        frame, so the trie is not used when there are any
+        """
+        settings = self.rollout_trie_settings
+        if not settings or not settings.get('memory-mb') or self.listeners:
+            return None
+        return rollout_trie.get_trie(settings['memory-mb'], settings['max-depth'], settings['snapshot-interval'])
+
+    @staticmethod
+    def _rollout_trie_key(scenario: Scenario) -> tuple:
+        return scenario.name, str(scenario.save_state), scenario.scorekeeper.__name__, scenario.action_repeat
+
+    def _resume_rollout(self, trie: rollout_trie.RolloutTrie, node, env, net, scenario: Scenario,
+                        next_action: List[float], max_frames: int = None):
+        """
+        Walk down the trie for as long as the genome picks the same actions as an earlier rollout.
+        The network is run on the recorded frames along the way, so it ends up in the same state
+        as if the frames had been simulated
+        :param max_frames: Don't resume past this frame
+        :return: (node, snapshot, next action, frame) to resume from, or None to start from scratch
+        """
+        action_repeat = scenario.action_repeat
+        frame = 0
+        best = None
+
+        while not node.done and (max_frames is None or frame < max_frames):
+            child = node.children.get(rollout_trie.action_key(env, next_action))
+            if child is None:
+                break
+            if child.snapshot is not None:
+                best = (node, trie.use(child), next_action, frame, rollout_trie.network_state(net))
+            node = child
+            frame += 1
+            if (frame - 1) % action_repeat == 0:
+                next_action = net.activate(self.feature_vector(node.info))
+
+        if best is None:
+            net.reset()
+            return None
+
+        node, snapshot, next_action, frame, net_state = best
+        rollout_trie.restore_network_state(net, net_state)
+        return node, snapshot, next_action, frame
 
     def _render(self):
         # TODO
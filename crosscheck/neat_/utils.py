@@ -1,11 +1,29 @@
 import neat
+import math
 import time
+import numpy as np
 from neat.math_util import mean, stdev
 from neat.six_util import itervalues, iterkeys
 
 import gzip
+import csv
+import pathlib
 import random
 import datetime
+import multiprocessing
+import os
+import signal
+import traceback
+from multiprocessing import Pool
+from typing import Callable, List, Tuple
+from .profiler import FrameProfiler, merge_all
+from ..metascorekeeper import EvaluationSummary
+
+try:
+    # For the peak memory of the pool workers. Unix only
+    import resource
+except ImportError:
+    resource = None
 
 try:
     import cPickle as pickle # pylint: disable=import-error
@@ -88,8 +106,12 @@ class TqdmReporter(neat.reporting.BaseReporter):
 class GenerationReporter(neat.reporting.BaseReporter):
     """See StdOutReporter
     Same as StdOutReporter except it takes in a custom stream for printing"""
-    def __init__(self, show_species_detail, stream=print):
+    def __init__(self, show_species_detail, stream=print, profile_filename=None):
+        """
+        :param profile_filename: CSV to append the frame profile of each generation to, if profiling
+        """
         self.show_species_detail = show_species_detail
+        self.profile_filename = profile_filename
         self.generation = None
         self.generation_start_time = None
         self.generation_times = []
@@ -147,6 +169,65 @@ class GenerationReporter(neat.reporting.BaseReporter):
         msk = "[" + ", ".join([f"{x:,.0f}" for x in best_genome.metascorekeeper.score_listing()]) + "]"
         self.stream(f"Metascorekeeper summary: {msk}")
 
+        # Statistics on the evaluations themselves
+        totals = {}
+        skipping = 0
+        profiles = []
+        for c in itervalues(population):
+            eval_stats = getattr(c.metascorekeeper, 'eval_stats', {})
+            for key, value in eval_stats.items():
+                if key == 'profile':
+                    # Only needed for this generation's report
+                    profiles.append(value)
+                    continue
+                totals[key] = totals.get(key, 0) + value
+            if eval_stats.get('skipped_scenarios'):
+                skipping += 1
+        if skipping:
+            self.stream('Early termination: {0} genomes skipped {1} scenarios'.format(
+                skipping, totals['skipped_scenarios']))
+        if totals.get('over_frame_budget'):
+            self.stream('Frame budget: {0} genomes stopped before their scenarios were complete'.format(
+                totals['over_frame_budget']))
+        if totals.get('failed_evaluations'):
+            self.stream('Failed evaluations: {0} genomes given the lowest fitness'.format(
+                totals['failed_evaluations']))
+        if totals.get('cache_hits'):
+            self.stream('Evaluation cache: {0} of {1} genomes ({2:.1f}% hit rate)'.format(
+                totals['cache_hits'], len(population), totals['cache_hits'] / len(population) * 100))
+        loads = totals.get('save_state_hits', 0) + totals.get('save_state_misses', 0)
+        if loads:
+            self.stream('Save state cache: {0:,} hits, {1:,} misses ({2:.1f}% hit rate)'.format(
+                totals.get('save_state_hits', 0), totals.get('save_state_misses', 0),
+                totals.get('save_state_hits', 0) / loads * 100))
+        if totals.get('prefix_frames_saved'):
+            saved = totals['prefix_frames_saved']
+            simulated = totals.get('frames', 0)
+            self.stream('Rollout trie: {0:,} frames skipped, {1:,} simulated ({2:.1f}% saved)'.format(
+                saved, simulated, saved / (saved + simulated) * 100))
+        if profiles:
+            self.report_profile(merge_all(profiles))
+            for c in itervalues(population):
+                c.metascorekeeper.eval_stats.pop('profile', None)
+
+    def report_profile(self, profile: FrameProfiler):
+        """
+        Log the time per stage of a frame, and append it to the CSV
+        """
+        rows = profile.rows()
+        self.stream('Frame profile: {0:,.0f} frames/s'.format(profile.frames_per_second))
+        for row in rows:
+            self.stream('  {stage:>15}: mean {mean_us:8.1f}us  p95 {p95_us:8.1f}us  ({calls:,} calls)'.format(**row))
+
+        if self.profile_filename is not None:
+            new_file = not pathlib.Path(self.profile_filename).exists()
+            with open(self.profile_filename, 'a', newline='') as f:
+                writer = csv.DictWriter(f, ['generation', 'stage', 'calls', 'mean_us', 'p95_us', 'frames_per_s'])
+                if new_file:
+                    writer.writeheader()
+                for row in rows:
+                    writer.writerow(dict(row, generation=self.generation, frames_per_s=profile.frames_per_second))
+
     def complete_extinction(self):
         self.num_extinctions += 1
         self.stream('All species extinct.')
@@ -163,6 +244,73 @@ class GenerationReporter(neat.reporting.BaseReporter):
         self.stream(msg)
 
 
+class SurvivalCutoffReporter(neat.reporting.BaseReporter):
+    def __init__(self, trainer):
+        """
+        Share the lowest fitness that DefaultReproduction kept in any species with the trainer, so
+        that genomes in the next generation that are unlikely to reach it can stop early. This is a
+        heuristic: the next generation is selected per species after re-speciation, so a genome
+        below the cutoff might still have been kept (see EarlyTerminationRanking)
+        :param trainer: The trainer; its fitness_cutoff is set after each evaluation
+        """
+        self.trainer = trainer
+
+    def post_evaluate(self, config, population, species, best_genome):
+        self.trainer.fitness_cutoff = self.survival_cutoff(config, species)
+
+    @staticmethod
+    def survival_cutoff(config, species) -> float:
+        """
+        Same selection as DefaultReproduction.reproduce(): each species keeps its elites plus its
+        top survival_threshold fraction (and at least 2)
+        :return: The lowest fitness of any genome that was kept
+        """
+        reproduction_config = config.reproduction_config
+        cutoff = None
+        for s in itervalues(species.species):
+            fitnesses = sorted((m.fitness for m in itervalues(s.members)), reverse=True)
+            kept = int(math.ceil(reproduction_config.survival_threshold * len(fitnesses)))
+            kept = max(kept, 2, reproduction_config.elitism)
+            lowest_kept = fitnesses[min(kept, len(fitnesses)) - 1]
+            cutoff = lowest_kept if cutoff is None else min(cutoff, lowest_kept)
+        return cutoff
+
+
+class EarlyTerminationRanking:
+
+    def __init__(self, evaluate: Callable):
+        """
+        Rank the genomes whose evaluation stopped early below every genome that played all its
+        scenarios. Until then their fitness is the optimistic upper bound of what they could still
+        reach, which would let them beat fully evaluated genomes for elitism and parenthood. Wraps
+        the evaluate function that is handed to neat.Population.run
+        :param evaluate: The evaluate function, taking a list of (genome_id, genome) and a config
+        """
+        self.evaluate_function = evaluate
+
+    def evaluate(self, genomes: List[Tuple[int, neat.DefaultGenome]], config: neat.Config):
+        self.evaluate_function(genomes, config)
+        self.rank_skipped_last(genomes)
+
+    @staticmethod
+    def rank_skipped_last(genomes: List[Tuple[int, neat.DefaultGenome]]):
+        """
+        Lower the fitness of the genomes that skipped scenarios to just below the lowest fitness
+        of a fully evaluated genome (if it isn't lower already)
+        """
+        skipped = [genome for _, genome in genomes
+                   if getattr(genome.metascorekeeper, 'eval_stats', {}).get('skipped_scenarios')]
+        evaluated = [genome.fitness for _, genome in genomes
+                     if not getattr(genome.metascorekeeper, 'eval_stats', {}).get('skipped_scenarios')]
+        if not skipped or not evaluated:
+            return
+        ceiling = float(np.nextafter(min(evaluated), -np.inf))
+        for genome in skipped:
+            if genome.fitness > ceiling:
+                genome.fitness = ceiling
+                genome.metascorekeeper.score = ceiling
+
+
 class SaveBestOfGeneration(neat.reporting.BaseReporter):
     def __init__(self, prefix: str):
         """
@@ -250,30 +398,172 @@ class Checkpointer(neat.checkpoint.Checkpointer):
             species_set.reporters = reporters
 
 
-from multiprocessing import Pool
+# Set in the pool workers: where to announce that a job started (see CustomParallelEvaluator)
+_started_queue = None
+
+
+def _init_worker(started_queue):
+    global _started_queue
+    _started_queue = started_queue
+
+
+def _run_job(eval_function, task_key, genome, config):
+    """
+    Wrapper around the evaluation in a pool worker that reports when and where it runs
+    """
+    _started_queue.put((task_key, os.getpid(), time.time()))
+    start = time.perf_counter()
+    result = eval_function(genome, config)
+    elapsed = time.perf_counter() - start
+    # Peak resident memory of this worker, in kilobytes (None where it can't be measured)
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource is not None else None
+    return os.getpid(), result, elapsed, rss
+
+
 class CustomParallelEvaluator(object):
-    def __init__(self, num_workers, eval_function, timeout=None):
+    def __init__(self, num_workers, eval_function, timeout=None, maxtasksperchild=None, retries=1,
+                 stream=print):
         """
         Ripoff of neat.parallel.ParallelEvaluator
         Adds ability to stash extra values about the genome
         eval_function should take one argument, a tuple of
         (genome object, config object), and return
         a single float (the genome's fitness).
+
+        Survives workers that hang, crash or raise: the genome is tried again up to retries times,
+        after which it gets the lowest fitness of the generation.
+        :param timeout: Wall-clock seconds a genome may take before its worker is killed. None for no limit
+        :param maxtasksperchild: Replace each worker after this many genomes, to contain emulator memory
+        growth. None to keep workers for the whole run
+        :param retries: How many more times to try a genome whose evaluation failed
+        :param stream: Where to report failures and per-worker throughput
         """
         self.num_workers = num_workers
         self.eval_function = eval_function
         self.timeout = timeout
-        self.pool = Pool(num_workers)
+        self.retries = retries
+        self.stream = stream
+        # How often to check on the jobs
+        self.poll_interval = 0.1
+        # How long a job may stay unfinished once its worker is gone, before it is considered lost
+        self.lost_grace = 1.0
+
+        # Written to directly (no feeder thread), so the announcement isn't lost if the worker dies
+        self._started_queue = multiprocessing.SimpleQueue()
+        self.pool = Pool(num_workers, initializer=_init_worker, initargs=(self._started_queue,),
+                         maxtasksperchild=maxtasksperchild)
 
     def __del__(self):
-        self.pool.close() # should this be terminate?
-        self.pool.join()
+        self.close()
 
-    def evaluate(self, genomes, config):
-        jobs = []
-        for ignored_genome_id, genome in genomes:
-            jobs.append(self.pool.apply_async(self.eval_function, (genome, config)))
+    def close(self):
+        if self.pool is not None:
+            # Jobs of killed workers never finish, so close() would wait for them forever. All
+            # the jobs that matter are done by now, so terminate
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
 
-        # assign the fitness back to each genome
-        for job, (ignored_genome_id, genome) in zip(jobs, genomes):
-            genome.fitness, genome.metascorekeeper = job.get(timeout=self.timeout)
+    def evaluate(self, genomes, config):
+        jobs = {}
+        attempts = {}
+        started = {}
+        lost_since = {}
+        failed = []
+        worker_stats = {}
+
+        def submit(index):
+            attempts[index] = attempts.get(index, 0) + 1
+            task_key = (index, attempts[index])
+            jobs[index] = (task_key, self.pool.apply_async(_run_job, (self.eval_function, task_key,
+                                                                      genomes[index][1], config)))
+
+        def fail(index, reason):
+            del jobs[index]
+            lost_since.pop(index, None)
+            genome_id = genomes[index][0]
+            if attempts[index] <= self.retries:
+                self.stream("Genome {0} failed ({1}), retrying".format(genome_id, reason))
+                submit(index)
+            else:
+                self.stream("Genome {0} failed ({1}), giving up".format(genome_id, reason))
+                failed.append(index)
+
+        for index in range(len(genomes)):
+            submit(index)
+
+        while jobs:
+            self._drain_started(started)
+            now = time.time()
+            live = {x.pid for x in multiprocessing.active_children()}
+
+            for index, (task_key, job) in list(jobs.items()):
+                if job.ready():
+                    try:
+                        pid, result, elapsed, rss = job.get()
+                    except Exception:
+                        fail(index, traceback.format_exc(limit=-1).strip().splitlines()[-1])
+                        continue
+                    del jobs[index]
+                    lost_since.pop(index, None)
+                    genome = genomes[index][1]
+                    genome.fitness, genome.metascorekeeper = result
+                    stats = worker_stats.setdefault(pid, [0, 0.0, 0, 0])
+                    stats[0] += 1
+                    stats[1] += elapsed
+                    stats[2] += getattr(genome.metascorekeeper, 'eval_stats', {}).get('frames', 0)
+                    if rss is not None:
+                        stats[3] = max(stats[3], rss)
+                    continue
+
+                if task_key not in started:
+                    continue
+                pid, start = started[task_key]
+                if self.timeout and now - start > self.timeout:
+                    self._kill(pid)
+                    fail(index, "timed out after {:.0f}s".format(now - start))
+                elif pid not in live:
+                    # The result may still be on its way from a worker that was recycled
+                    lost_since.setdefault(index, now)
+                    if now - lost_since[index] > self.lost_grace:
+                        fail(index, "worker {} died".format(pid))
+
+            if jobs:
+                time.sleep(self.poll_interval)
+
+        self._penalise(genomes, failed)
+        self._report(worker_stats)
+
+    def _drain_started(self, started: dict):
+        while not self._started_queue.empty():
+            task_key, pid, start = self._started_queue.get()
+            started[task_key] = (pid, start)
+
+    @staticmethod
+    def _kill(pid: int):
+        try:
+            # (no SIGKILL on Windows, where SIGTERM terminates the process outright)
+            os.kill(pid, getattr(signal, 'SIGKILL', signal.SIGTERM))
+        except ProcessLookupError:
+            pass
+
+    @staticmethod
+    def _penalise(genomes, failed):
+        """
+        Give genomes that could not be evaluated the lowest fitness of the generation
+        """
+        if not failed:
+            return
+        fitnesses = [genome.fitness for index, (_, genome) in enumerate(genomes) if index not in failed]
+        penalty = min((x for x in fitnesses if x is not None), default=0)
+        for index in failed:
+            genome = genomes[index][1]
+            genome.fitness = penalty
+            genome.metascorekeeper = EvaluationSummary(score=penalty, score_listing=[], scenario_scores={},
+                                                       score_vectors={}, done_reasons={}, stats={},
+                                                       eval_stats={'failed_evaluations': 1})
+
+    def _report(self, worker_stats: dict):
+        for pid, (genomes, elapsed, frames, rss) in sorted(worker_stats.items()):
+            self.stream("Worker {0}: {1} genomes, {2:,.0f} frames/s, peak RSS {3:,.0f} MB".format(
+                pid, genomes, frames / elapsed if elapsed else 0, rss / 1024))
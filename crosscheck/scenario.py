@@ -9,3 +9,6 @@ class Scenario:
     name: str
     save_state: retro.State
     scorekeeper: Type[Scorekeeper]
+    # Number of frames each network decision is held for. Inference and scoring only run on
+    # decision frames; termination is checked on every frame
+    action_repeat: int = 1
@@ -1,9 +1,12 @@
 from . import point_per_frame
 from . import game_scoring_1
-from .base import Scorekeeper
+from . import reward_spec
+from .base import Scorekeeper, ScorekeeperSummary
 
 # Hash to convert a string to a class ctor
 string_to_class = {
     'point-per-frame': point_per_frame.PointPerFrame,
     'game-scoring-1': game_scoring_1.GameScoring1
-}
\ No newline at end of file
+}
+# Scorekeepers defined by the reward specs in specs/
+string_to_class.update(reward_spec.builtin_specs())
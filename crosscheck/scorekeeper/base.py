@@ -1,27 +1,115 @@
 import abc
+from typing import Optional
+from ..info_utils.wrapper import FrameContext
+
+
+class ScorekeeperSummary:
+    """
+    The results of a scorekeeper once its scenario is complete. Small and picklable, so that
+    scenarios can be played in other processes. Has the same accessors as the scorekeeper
+    """
+    __slots__ = ('score', 'score_vector', 'stats', '_done_reasons')
+
+    def __init__(self, score: float, score_vector: dict, stats: dict, done_reasons: dict):
+        self.score = score
+        self.score_vector = score_vector
+        self.stats = stats
+        self._done_reasons = done_reasons
+
+    def __getstate__(self):
+        return self.score, self.score_vector, self.stats, self._done_reasons
+
+    def __setstate__(self, state):
+        self.score, self.score_vector, self.stats, self._done_reasons = state
+
+    @property
+    def done(self) -> bool:
+        return any(self._done_reasons.values())
+
+    def done_reasons(self) -> dict:
+        return self._done_reasons
+
 
 class Scorekeeper:
 
     def __init__(self):
         self._done_reasons = {}
         self.info: dict = {}
+        self._context: Optional[FrameContext] = None
         self._score = 0
         self._score_vector = {}
         self._stats = {}
+        # True if a frame was ticked since the score was last computed (see _finalize)
+        self._score_stale = False
         self.buttons_pressed: dict = {}
+        # The number of emulated frames covered by the next tick (more than 1 with action repeat)
+        self.frames_per_tick: int = 1
 
         # For compatibility with genome stats puller
         self._scorekeepers = []
 
-    def tick(self) -> float:
-        self._score = self._tick()
+    @property
+    def context(self) -> FrameContext:
+        """
+        Accessor for the derived info of the latest frame. The one given by the trainer (and
+        shared with the feature vector) if it is for the latest info
+        """
+        if self._context is None or self._context.info is not self.info:
+            self._context = FrameContext(self.info)
+        return self._context
+
+    @context.setter
+    def context(self, context: FrameContext):
+        self._context = context
+
+    def tick(self):
+        """
+        Incorporate the latest frame. Scoring is deferred until the score, score vector or stats
+        are read, so ticking is cheap when only done is needed (e.g. while training)
+        """
+        self._update()
+        self._score_stale = True
+
+    @abc.abstractmethod
+    def _update(self):
+        """
+        Incorporate the latest frame into the state the score is computed from (see _finalize)
+        """
+        pass
+
+    def _finalize(self) -> float:
+        """
+        Compute the score vector and stats from the state left by the latest _update()
+        :return: The total score as of the latest tick
+        """
         return self._score
 
+    def _score_if_stale(self):
+        if self._score_stale:
+            self._score_stale = False
+            self._score = self._finalize()
+
+    def check_done(self) -> bool:
+        """
+        Cheap termination check for frames on which tick() is skipped
+        :return: True if the scorekeeper considers the scenario complete
+        """
+        self._check_done()
+        return self.done
+
+    def _check_done(self):
+        """
+        Update the done reasons that can be determined from the latest info alone.
+        By default nothing is updated, so termination is only detected in tick()
+        """
+        pass
+
     @property
     def score(self) -> float:
         """
-        Accessor for the score calculated in tick
+        Accessor for the score as of the latest tick
         """
+        self._score_if_stale()
         return self._score
 
     @property
@@ -39,22 +127,22 @@ class Scorekeeper:
         """
         return self._done_reasons
 
+    def summary(self) -> ScorekeeperSummary:
+        """
+        :return: The results so far, without the state needed to keep scoring
+        """
+        return ScorekeeperSummary(self.score, dict(self.score_vector), dict(self.stats), dict(self.done_reasons()))
+
     @property
     def score_vector(self) -> dict:
+        self._score_if_stale()
         return self._score_vector
 
     @property
     def stats(self) -> dict:
+        self._score_if_stale()
         return self._stats
 
-    @abc.abstractmethod
-    def _tick(self) -> float:
-        """
-        Incorporate the latest frame into the total score
-        :return: The total score as of this frame
-        """
-        pass
-
     @classmethod
     @abc.abstractclassmethod
     def fitness_threshold(cls) -> float:
@@ -13,42 +13,80 @@ class GameScoring1(Scorekeeper):
 
         self._juke_accumulator = 0
 
-    def _tick(self) -> float:
+        # The info of the latest tick
+        self._scored_info = {}
+
+    def _update(self):
         """
-        Incorporate the latest frame into the total score
-        :return: The total score as of this frame
+        Incorporate the latest frame into the stats and done reasons. The score is computed from
+        them in _finalize()
         """
         # Update stats
-        self._accumulator.info = self.info
-        self._accumulator.accumulate()
+        context = self.context
+        self._accumulator.context = context
+        self._accumulator.accumulate(self.frames_per_tick)
 
         att = self._accumulator.pass_attempts['home']
         cmp = self._accumulator.pass_completions['home']
 
-        cmp_pct = 0.0
-
         if att > 1:
             cmp_pct = cmp / (att - 1)  # The latest one can't be counted since it might still be happening
             threshold = 0.75  # 3/4 must be completed
 
             # End if passing is a mess
             self._done_reasons['cmp_pct'] = cmp_pct < threshold
-        elif self._accumulator.wrapper.player_w_puck.get('team') == 'away':
+        elif context.player_w_puck.get('team') == 'away':
             # End if the other team gets the puck very early
             self._done_reasons['lost_faceoff'] = True
 
-
-        # End if a minute has passed,
-        self._done_reasons['timeout'] = self.info['time'] <= 540
-        # away scores a goal (fail)--which is most likely an own goal,
-        self._done_reasons['away_score'] = self.info['away-goals'] > 0
-        # home scores a goal (success!),
-        self._done_reasons['home_score'] = self.info['home-goals'] > 0
+        self._check_done()
         # when the away team has the puck for  too long
         self._done_reasons['away_has_puck'] = self._accumulator.time_puck['away'] > 1
         # when play stops
         self._done_reasons['play_stopped'] = self._accumulator.has_play_stopped_after_game_start
 
+        # (E) If behind the net, give the same reward as the away side of center ice,
+        # to avoid behind-the-net grinding
+        delta_puck_net_y = context.delta_puck_away_net_y
+        if delta_puck_net_y <= 2:
+            delta_puck_net_y = 225
+        # No reward past the red line
+        distance_multiplier = max(InfoWrapper.AWAY_GOAL_Y - delta_puck_net_y, 0)
+
+        if context.player_w_puck.get('team') == 'home':
+            juke_this_frame = context.delta_puck_away_goalie_x * distance_multiplier
+        else:
+            juke_this_frame = 0
+        # Theoretical max of accumulator is 60s * 60frames * 50 x-pixels * 250 y-pixels == 45M
+        # Realistic (human) max of accumulator is a 1Hz sine wave towards the goalie,
+        # average y-distance of 100, average x-distance of 1 * 60fps, 60s == 3,600,000
+        self._juke_accumulator += juke_this_frame * self.frames_per_tick
+
+        # Calculate commands based on features
+        if 'A' in self.buttons_pressed:
+            self._pressed['A'] += self.frames_per_tick
+        if 'B' in self.buttons_pressed:
+            self._pressed['B'] += self.frames_per_tick
+        if 'C' in self.buttons_pressed:
+            self._pressed['C'] += self.frames_per_tick
+
+        # The info may be replaced before the score is read (e.g. frames played after done)
+        self._scored_info = self.info
+
+    def _finalize(self) -> float:
+        """
+        Compute the score vector and stats as of the latest tick
+        :return: The total score
+        """
+        info = self._scored_info
+
+        att = self._accumulator.pass_attempts['home']
+        cmp = self._accumulator.pass_completions['home']
+
+        cmp_pct = 0.0
+
+        if att > 1:
+            cmp_pct = cmp / (att - 1)  # The latest one can't be counted since it might still be happening
 
         # Rewards structure
         # The intent it to reward gradually in the following order:
@@ -61,8 +99,7 @@ class GameScoring1(Scorekeeper):
         #  * G) shooting the puck fast
         #  * H) scoring
 
-        self._score_vector = {}
-        score_vector = self._score_vector
+        score_vector = {}
         # (A) Total Max: 360
         # (A) Some points for every second with the puck.
         # Max given 60x accumulation (300)
@@ -94,55 +131,30 @@ class GameScoring1(Scorekeeper):
 
         # (D) Total max: ~50k (assuming 5 shots is a realistic max)
         # Reward shots on goal. Allow grinding
-        score_vector['home-shots'] = self.info['home-shots'] * 1e4
+        score_vector['home-shots'] = info['home-shots'] * 1e4
 
         # (D.2) Give 100k points for the first shot. This to make sure they shoot at least once
-        score_vector['any-shot'] = 1e5 if self.info['home-shots'] > 0 else 0
+        score_vector['any-shot'] = 1e5 if info['home-shots'] > 0 else 0
 
         # (E) Total max: ~50k (with multiplier of 0.01)
-        # If behind the net, give the same reward as the away side of center ice,
-        # to avoid behind-the-net grinding
-        delta_puck_net_y = self._accumulator.wrapper.delta_puck_away_net_y
-        if delta_puck_net_y <= 2:
-            delta_puck_net_y = 225
-        # No reward past the red line
-        distance_multiplier = max(InfoWrapper.AWAY_GOAL_Y - delta_puck_net_y, 0)
-
-        if self._accumulator.wrapper.player_w_puck.get('team') == 'home':
-            juke_this_frame = self._accumulator.wrapper.delta_puck_away_goalie_x * distance_multiplier
-        else:
-            juke_this_frame = 0
-        # Theoretical max of accumulator is 60s * 60frames * 50 x-pixels * 250 y-pixels == 45M
-        # Realistic (human) max of accumulator is a 1Hz sine wave towards the goalie,
-        # average y-distance of 100, average x-distance of 1 * 60fps, 60s == 3,600,000
-        self._juke_accumulator += juke_this_frame
-
-        # Reward all jukes
+        # Reward all jukes (accumulated with each tick)
         score_vector['juke'] = self._juke_accumulator * 0.05
 
         # TODO (F and G) both required a shot detector
 
         # (H) Total max: 500k (to leave room for F and G)
-        score_vector['home-goals'] = self.info['home-goals'] * 5e5
+        score_vector['home-goals'] = info['home-goals'] * 5e5
 
 
         # Fix when the opponent wins the faceoff but gets points for taking
         # the puck up ice
         # If the faceoff was lost, then don't count any points
         if self._done_reasons.get('lost_faceoff'):
-            for key in self._score_vector:
+            for key in score_vector:
                 score_vector[key] = 0
 
         score = sum(score_vector.values())
 
-        # Calculate commands based on features
-        if 'A' in self.buttons_pressed:
-            self._pressed['A'] += 1
-        if 'B' in self.buttons_pressed:
-            self._pressed['B'] += 1
-        if 'C' in self.buttons_pressed:
-            self._pressed['C'] += 1
-
         # Save the score vector
         self._score_vector = score_vector
 
@@ -151,12 +163,23 @@ class GameScoring1(Scorekeeper):
             'time_w_puck': ", ".join(["{} {:.1f}s".format(team, time) for team, time in self._accumulator.time_puck.items()]),
             'pass cmp/att': "{}/{} ({:.0f}%) shots={}".format(self._accumulator.pass_completions['home'],
                                            self._accumulator.pass_attempts['home'],
-                                                   cmp_pct * 100, self.info['home-shots']),
+                                                   cmp_pct * 100, info['home-shots']),
             'buttons': self._pressed,
         }
 
         return score
 
+    def _check_done(self):
+        """
+        Done reasons that only depend on the latest info
+        """
+        # End if a minute has passed,
+        self._done_reasons['timeout'] = self.info['time'] <= 540
+        # away scores a goal (fail)--which is most likely an own goal,
+        self._done_reasons['away_score'] = self.info['away-goals'] > 0
+        # home scores a goal (success!),
+        self._done_reasons['home_score'] = self.info['home-goals'] > 0
+
     @classmethod
     def fitness_threshold(cls) -> float:
         """
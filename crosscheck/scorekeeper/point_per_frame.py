@@ -7,11 +7,12 @@ class PointPerFrame(Scorekeeper):
         super().__init__()
         self._total = 0
 
-    def _tick(self):
-        self._total += 1
+    def _update(self):
+        self._total += self.frames_per_tick
 
         self._done_reasons['long'] = self._total > 300
 
+    def _finalize(self) -> float:
         return self._total
 
     @classmethod
@@ -22,8 +23,10 @@ class PointPerFrame(Scorekeeper):
         """
         return 400
 
+    @property
     def stats(self) -> dict:
         return {}
 
+    @property
     def score_vector(self) -> dict:
         return {}
@@ -0,0 +1,358 @@
+import collections
+import math
+import pathlib
+from typing import Callable, Dict, List, Optional, Union
+import yaml
+from .base import Scorekeeper
+from ..info_utils.wrapper import FrameContext, HOME, AWAY, InfoAccumulator, InfoWrapper, POSSESSOR_TEAMS, TEAM_CODES
+
+# The folder of the specs that come with crosscheck (registered in string_to_class)
+SPEC_FOLDER = pathlib.Path(__file__).parent / 'specs'
+SUFFIX = '.yml'
+
+def _juke(context: FrameContext) -> int:
+    # If behind the net, give the same reward as the away side of center ice, to avoid
+    # behind-the-net grinding. No reward past the red line
+    delta_puck_net_y = context.delta_puck_away_net_y
+    if delta_puck_net_y <= 2:
+        delta_puck_net_y = 225
+    return context.delta_puck_away_goalie_x * max(InfoWrapper.AWAY_GOAL_Y - delta_puck_net_y, 0)
+
+
+# The expression of each source, in terms of the latest info, its derived info (context) and the
+# accumulator. Sources that need what the accumulator has accumulated:
+ACCUMULATOR_SOURCES = {
+    'max_puck_y': 'accumulator.max_puck_y',
+    'max_shooter_y': 'accumulator.max_shooter_y',
+    'play_stopped': 'accumulator.has_play_stopped_after_game_start',
+    # Home passes completed over those attempted, not counting the latest attempt (which might still
+    # be happening)
+    'pass_completion_rate': '(accumulator._pass_completions[{0}] / (accumulator._pass_attempts[{0}] - 1) '
+                            'if accumulator._pass_attempts[{0}] > 1 else 0.0)'.format(HOME),
+}
+# The counters behind the accumulator's views by team name, indexed by team code instead (the views
+# are slower, and these are read on every tick)
+for _quantity, _teams in [('time_puck', ('home', None, 'away')), ('pass_completions', ('home', 'away')),
+                          ('steal_count', ('home', 'away')), ('pass_attempts', ('home', 'away'))]:
+    for _team in _teams:
+        ACCUMULATOR_SOURCES['{}.{}'.format(_quantity, _team)] = 'accumulator._{}[{}]'.format(_quantity,
+                                                                                         TEAM_CODES[_team])
+
+# Sources derived from the latest frame alone. Any other name is an info variable
+FRAME_SOURCES = {
+    'constant': '1',
+    'home_has_puck': '(POSSESSOR_TEAMS[context.possessor] == HOME)',
+    'away_has_puck': '(POSSESSOR_TEAMS[context.possessor] == AWAY)',
+    'delta_puck_away_goalie_x': 'context.delta_puck_away_goalie_x',
+    'delta_puck_away_net_y': 'context.delta_puck_away_net_y',
+    # How far the puck is moved from the goalie, weighted by how close it is to the net
+    'juke': '_juke(context)',
+}
+
+# How a condition compares its source to its value (no comparison means the source is a flag)
+COMPARISONS = {
+    'above': '>',
+    'below': '<',
+    'at-least': '>=',
+    'at-most': '<=',
+    'equals': '==',
+}
+
+# Sources that can only be stats: the frames each of the spec's buttons was pressed
+STATS_SOURCES = {
+    'buttons': 'dict(pressed)',
+}
+
+# What the expressions can use
+_NAMESPACE = {
+    '_juke': _juke,
+    'POSSESSOR_TEAMS': POSSESSOR_TEAMS,
+    'HOME': HOME,
+    'AWAY': AWAY,
+}
+
+
+def _expression(name: str) -> str:
+    """
+    :return: The expression of a source (see ACCUMULATOR_SOURCES and FRAME_SOURCES)
+    """
+    if not isinstance(name, str):
+        raise ValueError(f"A source is a name: {name!r}")
+    if name in ACCUMULATOR_SOURCES:
+        return ACCUMULATOR_SOURCES[name]
+    if name in FRAME_SOURCES:
+        return FRAME_SOURCES[name]
+    return 'info[{!r}]'.format(name)
+
+
+def _is_info_only(spec: Optional[dict]) -> bool:
+    """
+    :return: True if a condition only depends on info variables, so it can be checked on any frame
+    """
+    return spec is None or (spec['source'] not in ACCUMULATOR_SOURCES and spec['source'] not in FRAME_SOURCES and
+                            _is_info_only(spec.get('only-if')))
+
+
+def _stats_expression(name: str) -> str:
+    """
+    :return: The expression of a source of a stat (see also STATS_SOURCES)
+    """
+    return STATS_SOURCES[name] if name in STATS_SOURCES else _expression(name)
+
+
+def _number(value, where: str) -> str:
+    """
+    :return: The expression of a number of the spec
+    """
+    # nan and inf have no literal, so they would only fail once scoring
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError(f"Expected a finite number, not {value!r}: {where}")
+    return repr(value)
+
+
+def _condition(spec: dict, where: str, expression: Callable[[str], str] = _expression) -> str:
+    """
+    :param spec: 'source', and at most one comparison (see COMPARISONS) with the number to compare it to
+    :param expression: Gives the expression of a source
+    :return: The expression of the condition
+    """
+    if not isinstance(spec, dict) or 'source' not in spec:
+        raise ValueError(f"A condition needs a source: {where}")
+    comparisons = [x for x in spec if x in COMPARISONS]
+    unknown = set(spec) - set(COMPARISONS) - {'source', 'only-if', 'name', 'sticky'}
+    if len(comparisons) > 1 or unknown:
+        raise ValueError(f"A condition has a source and at most one comparison: {where}")
+    if not comparisons:
+        return 'bool({})'.format(expression(spec['source']))
+    value = _number(spec[comparisons[0]], where)
+    return '({} {} {})'.format(expression(spec['source']), COMPARISONS[comparisons[0]], value)
+
+
+def _compile(name: str, arguments: str, lines: List[str]) -> Callable:
+    """
+    :return: A function of the arguments made of the lines
+    """
+    source = 'def compiled({}):\n'.format(arguments) + ''.join('    {}\n'.format(x) for x in lines or ['pass'])
+    namespace = dict(_NAMESPACE)
+    exec(compile(source, '<reward spec {}>'.format(name), 'exec'), namespace)
+    return namespace['compiled']
+
+
+class RewardSpec:
+    """
+    A scorekeeper defined by a spec (see specs/game-scoring-1.yml) rather than a subclass. The spec
+    is compiled once into plain functions, and stands in for a scorekeeper class: calling it makes
+    a scorekeeper
+    """
+
+    def __init__(self, spec: dict):
+        """
+        :param spec: 'name', 'fitness-threshold', 'terms', 'done', 'void-if', 'stats' and 'buttons', as
+        loaded from YAML
+        """
+        self.spec = spec
+        self.__name__: str = spec['name']
+        self._fitness_threshold = float(spec['fitness-threshold'])
+
+        terms = spec['terms']
+        for term in terms:
+            unknown = set(term) - {'name', 'source', 'weight', 'cap', 'scale', 'sum', 'when'}
+            if unknown:
+                raise ValueError(f"Unknown settings for term {term.get('name')}: {sorted(unknown)}")
+        self.term_names: List[str] = [x['name'] for x in terms]
+        done = spec.get('done', [])
+        stats = [{'name': x, 'sources': [x]} if isinstance(x, str) else x for x in spec.get('stats', [])]
+        for stat in stats:
+            if not isinstance(stat, dict) or set(stat) - {'name', 'sources', 'format'} or \
+                    not isinstance(stat.get('sources'), list) or not isinstance(stat.get('format', ''), str):
+                raise ValueError(f"A stat is a source, or a name, sources and a format: {stat!r}")
+        # The buttons counted for the 'buttons' stat
+        self.buttons: List[str] = spec.get('buttons', [])
+
+        # Each tick updates the done reasons and the terms summed over the ticks (times the frames
+        # each tick covers)
+        sum_blocks = []
+        for i, term in enumerate(terms):
+            if term.get('sum', False):
+                line = 'sums[{}] += {} * frames'.format(i, _expression(term['source']))
+                if 'when' in term:
+                    sum_blocks.append(['if {}:'.format(_condition(term['when'], term['name'])), '    ' + line])
+                else:
+                    sum_blocks.append([line])
+        self.update = _compile(self.__name__, 'info, context, accumulator, done_reasons, sums, frames',
+                               self._done_lines(done) + sum(sum_blocks, []))
+        # Frames without a tick only update the done reasons that depend on the info alone
+        self.check_done = _compile(self.__name__, 'info, done_reasons',
+                                   self._done_lines([x for x in done if _is_info_only(x)]))
+
+        # The value of each term as of the latest tick: its source (or sum) capped, times its scale and
+        # weight, or 0 unless it counts. In plain Python, since it's only a handful of terms
+        values = []
+        for i, term in enumerate(terms):
+            where = term['name']
+            value = 'sums[{}]'.format(i) if term.get('sum', False) else _expression(term['source'])
+            if 'cap' in term:
+                value = 'min({}, {})'.format(value, _number(term['cap'], where))
+            if 'scale' in term:
+                value = '{} * {}'.format(value, _expression(term['scale']))
+            # (as a float, so that the score vector doesn't depend on how the weight was written)
+            value = '{} * {!r}'.format(value, float(_number(term.get('weight', 1), where)))
+            # (summed terms are gated on each tick instead)
+            if 'when' in term and not term.get('sum', False):
+                value = '({} if {} else 0.0)'.format(value, _condition(term['when'], where))
+            values.append(value)
+        self.void_if: List[str] = spec.get('void-if', [])
+        void = ' or '.join('done_reasons.get({!r})'.format(x) for x in self.void_if) or 'False'
+        self.terms = _compile(self.__name__, 'info, context, accumulator, sums, done_reasons', [
+            'if {}:'.format(void),
+            '    return [{}]'.format(', '.join(['0.0'] * len(terms))),
+            'return [{}]'.format(', '.join(values))])
+
+        self.stats = _compile(self.__name__, 'info, context, accumulator, pressed', [
+            'return {{{}}}'.format(', '.join('{!r}: {}'.format(x['name'], self._stat(x)) for x in stats))])
+
+        names = [x['source'] for x in terms] + [x['scale'] for x in terms if 'scale' in x] + \
+                [x['when']['source'] for x in terms if 'when' in x] + [x['source'] for x in done] + \
+                [x['only-if']['source'] for x in done if 'only-if' in x] + sum([x['sources'] for x in stats], [])
+        self.uses_accumulator = any(x in ACCUMULATOR_SOURCES for x in names)
+
+    @staticmethod
+    def _stat(stat: dict) -> str:
+        """
+        :param stat: 'name', 'sources', and 'format' (a str.format() of the sources) unless it's one source
+        :return: The expression of the stat
+        """
+        sources = [_stats_expression(x) for x in stat['sources']]
+        if 'format' in stat:
+            return '{!r}.format({})'.format(stat['format'], ', '.join(sources))
+        if len(sources) != 1:
+            raise ValueError(f"A stat without a format has one source: {stat['name']}")
+        return sources[0]
+
+    @staticmethod
+    def _done_lines(done: List[dict]) -> List[str]:
+        """
+        :param done: The done reasons: 'name', the condition, 'only-if' (otherwise the reason keeps
+        its last value) and 'sticky' (once set, never cleared)
+        :return: The lines that update the done reasons. Sources read by several conditions are read once,
+        the others only when their condition is checked
+        """
+        uses = collections.Counter()
+
+        def count(name: str) -> str:
+            uses[name] += 1
+            return ''
+
+        for spec in done:
+            _condition(spec, spec['name'], count)
+            if 'only-if' in spec:
+                _condition(spec['only-if'], spec['name'], count)
+
+        sources = {}
+
+        def local(name: str) -> str:
+            if uses[name] < 2:
+                return _expression(name)
+            return sources.setdefault(name, 'source{}'.format(len(sources)))
+
+        lines = []
+        for spec in done:
+            name = spec['name']
+            condition = _condition(spec, name, local)
+            if spec.get('sticky', False):
+                block = ['if {}:'.format(condition), '    done_reasons[{!r}] = True'.format(name)]
+            else:
+                block = ['done_reasons[{!r}] = {}'.format(name, condition)]
+            if 'only-if' in spec:
+                block = ['if {}:'.format(_condition(spec['only-if'], name, local))] + ['    ' + x for x in block]
+            lines.extend(block)
+        return ['{} = {}'.format(variable, _expression(x)) for x, variable in sources.items()] + lines
+
+    def __getstate__(self):
+        # The compiled spec is made of functions, so compile it anew instead
+        return self.spec
+
+    def __setstate__(self, state):
+        self.__init__(state)
+
+    def __call__(self) -> 'SpecScorekeeper':
+        return SpecScorekeeper(self)
+
+    def fitness_threshold(self) -> float:
+        """
+        Accessor fitness threshold (the score over which to stop training)
+        """
+        return self._fitness_threshold
+
+    def __repr__(self):
+        return f"RewardSpec({self.__name__})"
+
+
+def load_reward_spec(filename: Union[str, pathlib.Path]) -> RewardSpec:
+    """
+    :param filename: A YAML reward spec
+    """
+    with open(filename) as f:
+        return RewardSpec(yaml.safe_load(f))
+
+
+class SpecScorekeeper(Scorekeeper):
+    """
+    Scorekeeper that scores as its RewardSpec says. Each tick only updates the accumulator, the done
+    reasons, the summed terms and the pressed buttons; the terms are computed once the score is read,
+    and the stats once they are read
+    """
+
+    def __init__(self, spec: RewardSpec):
+        super().__init__()
+        self._spec = spec
+        self._accumulator = InfoAccumulator()
+        self._sums = [0] * len(spec.term_names)
+        self._pressed = {x: 0 for x in spec.buttons}
+        # The info and derived info of the latest tick
+        self._scored_info = {}
+        self._scored_context: Optional[FrameContext] = None
+
+    def _update(self):
+        spec = self._spec
+        context = self.context
+        if spec.uses_accumulator:
+            self._accumulator.context = context
+            self._accumulator.accumulate(self.frames_per_tick)
+        spec.update(self.info, context, self._accumulator, self._done_reasons, self._sums, self.frames_per_tick)
+        for button in spec.buttons:
+            if button in self.buttons_pressed:
+                self._pressed[button] += self.frames_per_tick
+
+        # The info may be replaced before the score is read (e.g. frames played after done)
+        self._scored_info = self.info
+        self._scored_context = context
+
+    def _check_done(self):
+        self._spec.check_done(self.info, self._done_reasons)
+
+    def _finalize(self) -> float:
+        terms = self._spec.terms(self._scored_info, self._scored_context, self._accumulator, self._sums,
+                                 self._done_reasons)
+        self._score_vector = dict(zip(self._spec.term_names, terms))
+        # Summed in order, so the rounding is the same as summing the score vector
+        return sum(terms)
+
+    @property
+    def stats(self) -> dict:
+        """
+        Accessor for the stats as of the latest tick. Only formatted when read, rather than whenever
+        the score is
+        """
+        return self._spec.stats(self._scored_info, self._scored_context, self._accumulator, self._pressed)
+
+    def fitness_threshold(self) -> float:
+        return self._spec.fitness_threshold()
+
+
+def builtin_specs() -> Dict[str, RewardSpec]:
+    """
+    :return: The specs that come with crosscheck, by name
+    """
+    specs = [load_reward_spec(x) for x in sorted(SPEC_FOLDER.glob('*' + SUFFIX))]
+    return {x.__name__: x for x in specs}
@@ -0,0 +1,142 @@
+import dataclasses
+import pickle
+import threading
+from multiprocessing.connection import Client
+import pytest
+from crosscheck import definitions
+from crosscheck.metascorekeeper import EvaluationSummary
+from crosscheck.metascorekeeper.summer import Summer
+from crosscheck.neat_ import distributed
+from crosscheck.neat_.distributed import DistributedEvaluator, run_worker
+from crosscheck.scorekeeper.point_per_frame import PointPerFrame
+
+AUTHKEY = b'test'
+
+
+class _Genome:
+    def __init__(self, key):
+        self.key = key
+        self.fitness = None
+
+
+class _Trainer:
+    """
+    Stand-in for the trainer that scores a genome by its key, without an emulator
+    """
+    scenarios = []
+
+    def _eval_genome_parallel(self, genome, config):
+        scorekeeper = PointPerFrame()
+        for _ in range(genome.key + config):
+            scorekeeper.tick()
+        metascorekeeper = Summer()
+        metascorekeeper.add('only', scorekeeper)
+        return metascorekeeper.score, EvaluationSummary.from_metascorekeeper(metascorekeeper)
+
+
+@dataclasses.dataclass
+class _Scenario:
+    name: str
+    save_state: object
+
+
+@pytest.fixture(name='_evaluator')
+def _evaluator_fixture():
+    evaluator = DistributedEvaluator(_Trainer(), ('localhost', 0), AUTHKEY, batch_size=3, heartbeat_timeout=0.5,
+                                     stream=lambda x: None)
+    yield evaluator
+    evaluator.close()
+
+
+def _start_worker(evaluator) -> threading.Thread:
+    thread = threading.Thread(target=run_worker, args=(evaluator.address, AUTHKEY, 0.1), daemon=True)
+    thread.start()
+    return thread
+
+
+def test_several_workers(_evaluator):
+    """
+    Every genome is evaluated once per generation
+    """
+    # Arrange
+    workers = [_start_worker(_evaluator) for _ in range(3)]
+    genomes = [(key, _Genome(key)) for key in range(1, 20)]
+
+    # Act
+    _evaluator.evaluate(genomes, 0)
+    first = [genome.fitness for _, genome in genomes]
+    _evaluator.evaluate(genomes, 100)
+    second = [genome.fitness for _, genome in genomes]
+    _evaluator.close()
+
+    # Assert
+    assert first == [key for key, _ in genomes]
+    assert second == [key + 100 for key, _ in genomes]
+    assert [genome.metascorekeeper.scenario_scores['only'] for _, genome in genomes] == second
+    for worker in workers:
+        worker.join(timeout=5)
+        assert not worker.is_alive()
+
+
+def test_lost_work_is_requeued(_evaluator):
+    """
+    Batches of workers that disconnect or go silent mid-generation are handed to workers that join later
+    """
+    # Arrange
+    genomes = [(key, _Genome(key)) for key in range(1, 10)]
+    generation = threading.Thread(target=_evaluator.evaluate, args=(genomes, 0))
+    generation.start()
+
+    # A worker that disconnects with its batch
+    disconnects = Client(_evaluator.address, authkey=AUTHKEY)
+    assert disconnects.recv()[0] == 'setup'
+    assert disconnects.recv()[0] == 'batch'
+    disconnects.close()
+
+    # A worker that keeps its batch but stops responding
+    silent = Client(_evaluator.address, authkey=AUTHKEY)
+    assert silent.recv()[0] == 'setup'
+    assert silent.recv()[0] == 'batch'
+
+    # Act
+    _start_worker(_evaluator)
+    generation.join(timeout=10)
+    silent.close()
+
+    # Assert
+    assert not generation.is_alive()
+    assert [genome.fitness for _, genome in genomes] == [key for key, _ in genomes]
+
+
+def test_authkey_is_required():
+    """
+    Without an authkey, anyone who can connect could have the other side unpickle anything
+    """
+    # Act / Assert
+    with pytest.raises(ValueError):
+        DistributedEvaluator(_Trainer(), ('localhost', 0), b'', stream=lambda x: None)
+    with pytest.raises(ValueError):
+        run_worker(('localhost', 0), b'')
+
+
+def test_save_states_are_found_in_the_worker_folder(monkeypatch, tmp_path):
+    """
+    Save states keep their subfolders on a worker whose save state folder is elsewhere, so those with
+    the same file name stay apart
+    """
+    # Arrange
+    folder = definitions.SAVE_STATE_FOLDER
+    trainer = _Trainer()
+    trainer.scenarios = [_Scenario('one', folder / '01' / '01-faceoff.state'),
+                         _Scenario('two', folder / '02-2p' / '01-faceoff.state')]
+    payload = pickle.dumps(distributed._relative_save_states(trainer))
+    monkeypatch.setattr(definitions, 'SAVE_STATE_FOLDER', tmp_path)
+
+    # Act
+    object_under_test = pickle.loads(payload)
+    distributed._rebase_save_states(object_under_test)
+
+    # Assert
+    assert [x.save_state for x in object_under_test.scenarios] == [tmp_path / '01' / '01-faceoff.state',
+                                                                    tmp_path / '02-2p' / '01-faceoff.state']
+    assert trainer.scenarios[0].save_state == folder / '01' / '01-faceoff.state'
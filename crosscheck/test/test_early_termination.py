@@ -0,0 +1,56 @@
+from crosscheck.metascorekeeper import EvaluationSummary
+from crosscheck.neat_.utils import EarlyTerminationRanking
+
+
+class _Genome:
+    def __init__(self, key):
+        self.key = key
+        self.fitness = None
+        self.metascorekeeper = None
+
+
+def _evaluate(genomes, config):
+    """
+    Stand-in for the trainer: genomes with an odd key stop early with an upper bound of 1000 + key
+    """
+    for key, genome in genomes:
+        skipped = key % 2 == 1
+        genome.fitness = 1000 + key if skipped else key * 10
+        genome.metascorekeeper = EvaluationSummary(score=genome.fitness, score_listing=[], scenario_scores={},
+                                                   score_vectors={}, done_reasons={}, stats={},
+                                                   eval_stats={'skipped_scenarios': 2} if skipped else {})
+
+
+def test_skipped_genome_does_not_beat_evaluated():
+    """
+    A genome that stopped early ranks below every genome that played all its scenarios, even
+    though its upper bound is higher
+    """
+    # Arrange
+    object_under_test = EarlyTerminationRanking(_evaluate)
+    genomes = [(key, _Genome(key)) for key in range(2, 8)]
+
+    # Act
+    object_under_test.evaluate(genomes, None)
+
+    # Assert
+    evaluated = [genome.fitness for key, genome in genomes if key % 2 == 0]
+    skipped = [genome.fitness for key, genome in genomes if key % 2 == 1]
+    assert evaluated == [20, 40, 60]
+    assert max(skipped) < min(evaluated)
+    assert all(genome.metascorekeeper.score == genome.fitness for _, genome in genomes)
+
+
+def test_low_skipped_fitness_is_kept():
+    """
+    A genome whose upper bound is already below the evaluated genomes keeps it
+    """
+    # Arrange
+    object_under_test = EarlyTerminationRanking(_evaluate)
+    genomes = [(key, _Genome(key)) for key in (200, 201)]
+
+    # Act
+    object_under_test.evaluate(genomes, None)
+
+    # Assert
+    assert [genome.fitness for _, genome in genomes] == [2000, 1201]
@@ -0,0 +1,104 @@
+import copy
+import neat
+import pytest
+from crosscheck import definitions
+from crosscheck.neat_.eval_cache import EvaluationCache
+
+
+class _Metascorekeeper:
+    def __init__(self, eval_stats: dict = None):
+        self.eval_stats = eval_stats or {}
+
+
+@pytest.fixture(name='config')
+def _config():
+    filename = definitions.ROOT_FOLDER / "crosscheck" / "neat_" / "config_templates" / "config-game-scoring-1"
+    return neat.Config(neat.DefaultGenome, neat.DefaultReproduction,
+                       neat.DefaultSpeciesSet, neat.DefaultStagnation, str(filename))
+
+
+@pytest.fixture(name='genome')
+def _genome(config):
+    genome = neat.DefaultGenome(1)
+    genome.configure_new(config.genome_config)
+    return genome
+
+
+def test_clone_hits(config, genome):
+    """
+    A genome with a different key but the same network is not evaluated again
+    """
+    # Arrange
+    evaluated = []
+
+    def evaluate(genomes, _config):
+        for genome_id, g in genomes:
+            evaluated.append(genome_id)
+            g.fitness = 10.0 * genome_id
+            g.metascorekeeper = _Metascorekeeper()
+
+    object_under_test = EvaluationCache(evaluate, ('identity',))
+    clone = copy.deepcopy(genome)
+    clone.key = 2
+
+    # Act
+    object_under_test.evaluate([(1, genome)], config)
+    object_under_test.evaluate([(2, clone)], config)
+
+    # Assert
+    assert evaluated == [1]
+    assert clone.fitness == 10.0
+    assert clone.metascorekeeper.eval_stats == {'cache_hits': 1}
+    assert object_under_test.hits == 1
+    assert object_under_test.misses == 1
+
+
+def test_failed_evaluation_is_retried(config, genome):
+    """
+    A genome whose evaluation failed (e.g. its worker crashed) is evaluated again the next time
+    """
+    # Arrange
+    evaluated = []
+
+    def evaluate(genomes, _config):
+        for genome_id, g in genomes:
+            failed = not evaluated
+            evaluated.append(genome_id)
+            g.fitness = -1e9 if failed else 10.0
+            g.metascorekeeper = _Metascorekeeper({'failed_evaluations': 1} if failed else {})
+
+    object_under_test = EvaluationCache(evaluate, ('identity',))
+
+    # Act
+    object_under_test.evaluate([(1, genome)], config)
+    object_under_test.evaluate([(1, genome)], config)
+    object_under_test.evaluate([(1, genome)], config)
+
+    # Assert
+    assert evaluated == [1, 1]
+    assert genome.fitness == 10.0
+    assert object_under_test.hits == 1
+
+
+def test_key_covers_network(genome):
+    """
+    Anything that changes the network changes the key
+    """
+    # Arrange
+    object_under_test = EvaluationCache(None, ('identity',))
+    original = object_under_test.genome_key(genome)
+
+    weight_changed = copy.deepcopy(genome)
+    next(iter(weight_changed.connections.values())).weight += 1e-9
+    bias_changed = copy.deepcopy(genome)
+    next(iter(bias_changed.nodes.values())).bias += 1e-9
+    activation_changed = copy.deepcopy(genome)
+    next(iter(activation_changed.nodes.values())).activation = 'unused'
+
+    # Act
+    keys = [object_under_test.genome_key(x) for x in [weight_changed, bias_changed, activation_changed]]
+
+    # Assert
+    assert original not in keys
+    assert len(set(keys)) == len(keys)
+    assert EvaluationCache(None, ('other',)).genome_key(genome) != original
@@ -0,0 +1,80 @@
+import pickle
+import random
+import numpy as np
+import pytest
+from crosscheck.info_utils.feature_vector import PlayersAndPuck, players_and_puck
+from crosscheck.info_utils.ram_decoder import DecodedInfo
+
+
+@pytest.fixture(name='infos')
+def _infos():
+    rng = random.Random(0)
+    names = list(PlayersAndPuck.KEYS) + ['time', 'home-goals', 'away-goals']
+    rng.shuffle(names)
+    return [{name: rng.randint(-300, 300) for name in names} for _ in range(50)]
+
+
+def test_same_as_function(infos):
+    """
+    The features are exactly those of players_and_puck(), including its constant last element
+    """
+    # Arrange
+    object_under_test = PlayersAndPuck()
+
+    for info in infos:
+        # Act
+        actual = object_under_test(info)
+
+        # Assert
+        assert actual.tolist() == players_and_puck(info)
+        assert actual[-1] == 1
+
+
+def test_decoded_info_same_as_dict(infos):
+    """
+    Infos decoded from RAM give the same features as info dicts
+    """
+    # Arrange
+    index = {name: i for i, name in enumerate(infos[0])}
+    object_under_test = PlayersAndPuck()
+
+    for info in infos:
+        decoded = DecodedInfo(np.array([info[x] for x in index], dtype=np.int32), index)
+
+        # Act
+        actual = object_under_test(decoded)
+
+        # Assert
+        assert actual.tolist() == players_and_puck(info)
+
+
+def test_describes_features(infos):
+    """
+    The length and names describe the buffer, which is reused from call to call
+    """
+    # Arrange
+    object_under_test = PlayersAndPuck()
+
+    # Act
+    first = object_under_test(infos[0])
+    second = object_under_test(infos[1])
+
+    # Assert
+    assert len(object_under_test) == len(object_under_test.names) == len(first) == 29
+    assert object_under_test.names[24:26] == ('player-w-puck-ice-x', 'player-w-puck-ice-y')
+    assert first.dtype == object_under_test.dtype
+    assert first is second
+
+
+def test_pickled_copy_fills_its_buffer(infos):
+    """
+    A copy sent to another process (e.g. with the trainer) still fills the buffer it returns
+    """
+    # Arrange
+    object_under_test = pickle.loads(pickle.dumps(PlayersAndPuck()))
+
+    # Act
+    actual = object_under_test(infos[0])
+
+    # Assert
+    assert actual.tolist() == players_and_puck(infos[0])
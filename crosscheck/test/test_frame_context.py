@@ -0,0 +1,71 @@
+import pytest
+from crosscheck.info_utils.wrapper import TEAMS, POSITIONS, DIMS, FrameContext, InfoWrapper
+from crosscheck.scorekeeper.game_scoring_1 import GameScoring1
+
+
+class _CountingInfo(dict):
+    """
+    Info that counts how many times each key is read
+    """
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.reads = 0
+
+    def __getitem__(self, key):
+        self.reads += 1
+        return super().__getitem__(key)
+
+
+@pytest.fixture(name='info')
+def _info():
+    info = {}
+    for teami, team in enumerate(TEAMS):
+        for positioni, position in enumerate(POSITIONS):
+            for dimi, dim in enumerate(DIMS):
+                info['player-{}-{}-{}'.format(team, position, dim)] = (teami + 1) * 100 + (positioni + 1) * 10 + dimi
+    # The home center has the puck
+    info.update({'player-w-puck-ice-x': 120, 'player-w-puck-ice-y': 121, 'puck-ice-x': 120, 'puck-ice-y': 140,
+                 'time': 580, 'home-shots': 0, 'home-goals': 0, 'away-goals': 0})
+    return info
+
+
+def test_same_as_info_wrapper(info):
+    """
+    The derived info is the same as InfoWrapper's, and is only computed once
+    """
+    # Arrange
+    counting_info = _CountingInfo(info)
+    object_under_test = FrameContext(counting_info)
+
+    # Act
+    actual = object_under_test.player_w_puck
+    reads = counting_info.reads
+    again = object_under_test.player_w_puck
+
+    # Assert
+    assert actual == InfoWrapper(info).player_w_puck == {'team': 'home', 'pos': 'C'}
+    assert again is actual
+    assert counting_info.reads == reads
+    assert object_under_test.delta_puck_away_net_y == InfoWrapper(info).delta_puck_away_net_y
+    assert object_under_test.delta_puck_away_goalie_x == InfoWrapper(info).delta_puck_away_goalie_x
+
+
+def test_scorekeeper_uses_given_context(info):
+    """
+    A scorekeeper uses the context the trainer shares with it, and makes its own when it has none
+    """
+    # Arrange
+    object_under_test = GameScoring1()
+    object_under_test.info = info
+    context = FrameContext(info)
+
+    # Act
+    object_under_test.context = context
+    shared = object_under_test.context
+    object_under_test.info = dict(info)
+    own = object_under_test.context
+
+    # Assert
+    assert shared is context
+    assert own is not context
+    assert own.info is object_under_test.info
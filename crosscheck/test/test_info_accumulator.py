@@ -0,0 +1,189 @@
+import pickle
+import random
+import pytest
+from crosscheck.info_utils import possession
+from crosscheck.info_utils.wrapper import InfoAccumulator, StreakHistory
+
+
+def _consecutive_passes(history, capacity: int = 64) -> dict:
+    """
+    The stats as computed from the whole history, before they were kept up to date
+    :param capacity: The number of latest streaks of each team that are kept
+    """
+    consecutive = {'home': [0], 'away': [0]}
+    unique = {'home': [0], 'away': [0]}
+    history = list(history)
+    if history:
+        pvs_team = history[0][0]
+        unique_local = [history[0][1]]
+        for cur_team, cur_pos in history[1:]:
+            if cur_team == pvs_team:
+                consecutive[cur_team][-1] += 1
+                if cur_pos in unique_local:
+                    unique_local = [cur_pos]
+                    unique[cur_team].append(0)
+                else:
+                    unique_local.append(cur_pos)
+                    unique[cur_team][-1] += 1
+                    if len(unique_local) >= 6:
+                        unique_local = []
+            else:
+                consecutive[cur_team].append(0)
+                unique[cur_team].append(0)
+                unique_local = []
+            pvs_team = cur_team
+    return {'consecutive': {team: streaks[-capacity:] for team, streaks in consecutive.items()},
+            'unique': {team: streaks[-capacity:] for team, streaks in unique.items()}}
+
+
+@pytest.fixture(name='infos')
+def _infos():
+    """
+    Infos where the puck goes loose, gets passed around and stolen, mostly within the home team
+    """
+    rng = random.Random(0)
+    infos = []
+    for frame in range(3000):
+        info = {name: 200 for name in possession.PLAYER_KEYS}
+        info.update({'player-w-puck-ice-x': 0, 'player-w-puck-ice-y': 0, 'puck-ice-y': 0, 'time': 600 - frame // 60})
+        if rng.random() < 0.8:
+            team = 'home' if rng.random() < 0.8 else 'away'
+            position = rng.choice(possession.POSITIONS)
+            info['player-{}-{}-x'.format(team, position)] = 0
+            info['player-{}-{}-y'.format(team, position)] = 0
+        infos.extend([info] * rng.randint(1, 4))
+    return infos
+
+
+def test_consecutive_passes_same_as_from_history(infos):
+    """
+    The consecutive pass stats kept with each possession are the same as those from the whole history
+    """
+    # Arrange
+    object_under_test = InfoAccumulator()
+    # Keep every possession for the reference
+    object_under_test._possession_history = possession.PossessionHistory(capacity=len(infos))
+
+    for info in infos:
+        # Act
+        object_under_test.info = info
+        object_under_test.accumulate()
+
+        # Assert
+        assert object_under_test.consecutive_passes == _consecutive_passes(object_under_test._possession_history)
+
+    assert len(object_under_test._possession_history) > 1024
+    assert object_under_test._consecutive_passes['home'].total > 64
+
+
+def test_consecutive_passes_are_copies(infos):
+    """
+    Modifying the returned stats doesn't change those kept by the accumulator
+    """
+    # Arrange
+    object_under_test = InfoAccumulator()
+    for info in infos:
+        object_under_test.info = info
+        object_under_test.accumulate()
+    expected = object_under_test.consecutive_passes
+
+    # Act
+    object_under_test.consecutive_passes['consecutive']['home'].append(100)
+    object_under_test.consecutive_passes['unique']['away'].clear()
+
+    # Assert
+    assert object_under_test.consecutive_passes == expected
+
+
+def test_pickled_copy_keeps_accumulating(infos):
+    """
+    A copy (e.g. of a scorekeeper sent to another process) picks up where the original left off
+    """
+    # Arrange
+    expected = InfoAccumulator()
+    for info in infos:
+        expected.info = info
+        expected.accumulate()
+    object_under_test = InfoAccumulator()
+    for info in infos[:len(infos) // 2]:
+        object_under_test.info = info
+        object_under_test.accumulate()
+
+    # Act
+    object_under_test = pickle.loads(pickle.dumps(object_under_test))
+    for info in infos[len(infos) // 2:]:
+        object_under_test.info = info
+        object_under_test.accumulate()
+
+    # Assert
+    assert dict(object_under_test.time_puck) == dict(expected.time_puck)
+    assert list(object_under_test.time_puck) == ['home', None, 'away']
+    assert dict(object_under_test.pass_attempts) == dict(expected.pass_attempts)
+    assert dict(object_under_test.pass_completions) == dict(expected.pass_completions)
+    assert dict(object_under_test.steal_count) == dict(expected.steal_count)
+    assert object_under_test.consecutive_passes == expected.consecutive_passes
+    assert object_under_test.max_shooter_y == expected.max_shooter_y
+
+
+def test_pickled_size_is_fixed(infos):
+    """
+    The pickled accumulator (e.g. in a scorekeeper sent to another process) doesn't grow over an
+    episode. Only the widths of the integer counters and the set of unique passers vary
+    """
+    # Arrange
+    object_under_test = InfoAccumulator()
+    expected = len(pickle.dumps(object_under_test))
+    sizes = []
+
+    # Act
+    for info in infos * 3:
+        object_under_test.info = info
+        object_under_test.accumulate()
+        sizes.append(len(pickle.dumps(object_under_test)))
+
+    # Assert
+    assert expected - 64 <= min(sizes) <= max(sizes) <= expected + 64
+    assert expected < 4096
+
+
+def test_possession_history_is_bounded():
+    """
+    The history keeps only the latest possessions, oldest first
+    """
+    # Arrange
+    object_under_test = possession.PossessionHistory(capacity=4)
+    indices = [x % len(possession.PLAYERS) for x in range(10)]
+    players = [possession.PLAYERS[x] for x in indices]
+
+    for count, index in enumerate(indices, start=1):
+        # Act
+        object_under_test.append(index)
+
+        # Assert
+        assert len(object_under_test) == min(count, 4)
+        assert list(object_under_test) == players[max(0, count - 4):count]
+
+    assert object_under_test.total == 10
+
+
+def test_streak_history_is_bounded():
+    """
+    The streak history keeps only the latest streaks, oldest first, and extends the current one
+    """
+    # Arrange
+    object_under_test = StreakHistory(capacity=3)
+    expected = [0]
+
+    for count in range(10):
+        # Act
+        if count % 3:
+            object_under_test.extend()
+            expected[-1] += 1
+        else:
+            object_under_test.start()
+            expected.append(0)
+
+        # Assert
+        assert object_under_test.tolist() == expected[-3:]
+
+    assert object_under_test.total == len(expected)
@@ -0,0 +1,106 @@
+import pytest
+import pickle
+from crosscheck.metascorekeeper import string_to_class, EvaluationSummary
+from crosscheck.scorekeeper.point_per_frame import PointPerFrame
+
+
+class _Played:
+    def __init__(self, score):
+        self.score = score
+
+
+class _Unplayed:
+    @classmethod
+    def fitness_threshold(cls):
+        return 100
+
+
+@pytest.mark.parametrize('name', list(string_to_class.keys()))
+def test_upper_bound_all_played(name):
+    """
+    With no scenarios remaining the bound is the score itself
+    """
+    # Arrange
+    object_under_test = string_to_class[name]()
+    for index, score in enumerate([10, 50, 30]):
+        object_under_test.add(str(index), _Played(score))
+
+    # Act
+    actual = object_under_test.upper_bound([])
+
+    # Assert
+    assert actual == pytest.approx(object_under_test.score)
+
+
+@pytest.mark.parametrize('name', list(string_to_class.keys()))
+def test_upper_bound_is_optimistic(name):
+    """
+    The bound cannot be beaten by any remaining score up to the fitness threshold
+    """
+    # Arrange
+    object_under_test = string_to_class[name]()
+    object_under_test.add('0', _Played(10))
+    object_under_test.add('1', _Played(50))
+
+    # Act
+    actual = object_under_test.upper_bound([_Unplayed, _Unplayed])
+
+    # Assert
+    for remaining in ([0, 0], [100, 0], [100, 100], [37, 12]):
+        finished = string_to_class[name]()
+        finished.add('0', _Played(10))
+        finished.add('1', _Played(50))
+        for index, score in enumerate(remaining):
+            finished.add(str(index + 2), _Played(score))
+        assert finished.score <= actual + 1e-9
+
+
+@pytest.mark.parametrize('name', list(string_to_class.keys()))
+def test_summaries_score_like_scorekeepers(name):
+    """
+    Scorekeeper summaries sent back from other processes score the same as the scorekeepers
+    """
+    # Arrange
+    keepers = []
+    for ticks in (3, 7, 5):
+        keeper = PointPerFrame()
+        for _ in range(ticks):
+            keeper.tick()
+        keepers.append(keeper)
+    expected = string_to_class[name]()
+    object_under_test = string_to_class[name]()
+
+    # Act
+    for index, keeper in enumerate(keepers):
+        expected.add(str(index), keeper)
+        object_under_test.add(str(index), pickle.loads(pickle.dumps(keeper.summary())))
+
+    # Assert
+    assert object_under_test.score == expected.score
+    assert object_under_test.stats == expected.stats
+
+
+def test_evaluation_summary_is_small():
+    """
+    The evaluation summary keeps the results but none of the scorekeepers' state
+    """
+    # Arrange
+    metascorekeeper = string_to_class['median']()
+    for index, ticks in enumerate((3, 7, 5)):
+        keeper = PointPerFrame()
+        keeper.info = {'filler': list(range(10000))}
+        for _ in range(ticks):
+            keeper.tick()
+        metascorekeeper.add(str(index), keeper)
+    metascorekeeper.eval_stats['frames'] = 15
+
+    # Act
+    actual = pickle.loads(pickle.dumps(EvaluationSummary.from_metascorekeeper(metascorekeeper)))
+
+    # Assert
+    assert actual.score == metascorekeeper.score
+    assert actual.score_listing() == metascorekeeper.score_listing()
+    assert actual.scenario_scores == {'0': 3, '1': 7, '2': 5}
+    assert actual.stats == metascorekeeper.stats
+    assert actual.eval_stats == {'frames': 15}
+    assert len(pickle.dumps(actual)) < len(pickle.dumps(metascorekeeper)) / 10
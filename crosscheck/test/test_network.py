@@ -0,0 +1,232 @@
+import random
+import neat
+import pytest
+from crosscheck import definitions
+from crosscheck.neat_ import network, rollout_trie
+from crosscheck.neat_.network import BatchedRecurrentNetwork, CompiledRecurrentNetwork, GeneratedRecurrentNetwork
+
+
+@pytest.fixture(name='config')
+def _config():
+    filename = definitions.ROOT_FOLDER / "crosscheck" / "neat_" / "config_templates" / "config-game-scoring-1"
+    return neat.Config(neat.DefaultGenome, neat.DefaultReproduction,
+                       neat.DefaultSpeciesSet, neat.DefaultStagnation, str(filename))
+
+
+@pytest.fixture(name='genomes')
+def _genomes(config):
+    """
+    Genomes with hidden nodes, recurrent connections and every activation and aggregation
+    """
+    rng_state = random.getstate()
+    random.seed(1)
+    genomes = []
+    for key in range(40):
+        genome = neat.DefaultGenome(key)
+        genome.configure_new(config.genome_config)
+        for _ in range(random.randint(0, 80)):
+            genome.mutate(config.genome_config)
+        genomes.append(genome)
+    random.setstate(rng_state)
+    return genomes
+
+
+def _frames(count: int, seed: int):
+    rng = random.Random(seed)
+    return [[rng.uniform(-2, 2) for _ in range(29)] for _ in range(count)]
+
+
+def test_matches_recurrent_network(config, genomes):
+    """
+    The compiled network gives the same outputs as neat's, frame after frame
+    """
+    # Arrange
+    frames = _frames(10, seed=0)
+
+    for genome in genomes:
+        expected_net = neat.nn.recurrent.RecurrentNetwork.create(genome, config)
+        object_under_test = CompiledRecurrentNetwork.create(genome, config)
+
+        # Act
+        expected = [expected_net.activate(x) for x in frames]
+        actual = [object_under_test.activate(x) for x in frames]
+
+        # Assert
+        for expected_outputs, actual_outputs in zip(expected, actual):
+            assert actual_outputs == pytest.approx(expected_outputs, abs=1e-12)
+
+
+def test_reset_matches_new_network(config, genomes):
+    """
+    After a reset, the network plays the same as a newly created one
+    """
+    # Arrange
+    frames = _frames(5, seed=1)
+    for genome in genomes:
+        fresh = CompiledRecurrentNetwork.create(genome, config)
+        object_under_test = CompiledRecurrentNetwork.create(genome, config)
+        for x in _frames(5, seed=2):
+            object_under_test.activate(x)
+
+        # Act
+        object_under_test.reset()
+
+        # Assert
+        assert [object_under_test.activate(x) for x in frames] == [fresh.activate(x) for x in frames]
+
+
+def test_state_round_trip(config, genomes):
+    """
+    Restoring a snapshot of the state (as the rollout trie does) resumes play from that point
+    """
+    # Arrange
+    object_under_test = CompiledRecurrentNetwork.create(genomes[-1], config)
+    frames = _frames(6, seed=3)
+    for x in frames[:3]:
+        object_under_test.activate(x)
+    state = rollout_trie.network_state(object_under_test)
+    expected = [object_under_test.activate(x) for x in frames[3:]]
+
+    # Act
+    object_under_test.reset()
+    rollout_trie.restore_network_state(object_under_test, state)
+
+    # Assert
+    assert [object_under_test.activate(x) for x in frames[3:]] == expected
+
+
+def test_custom_functions_fall_back(config, genomes):
+    """
+    Nodes using functions that aren't built into neat-python are still evaluated, in Python
+    """
+    # Arrange
+    config.genome_config.add_activation('cube', lambda z: z ** 3)
+    genome = genomes[-1]
+    for node in genome.nodes.values():
+        if node.key % 2:
+            node.activation = 'cube'
+    expected_net = neat.nn.recurrent.RecurrentNetwork.create(genome, config)
+    object_under_test = CompiledRecurrentNetwork.create(genome, config)
+
+    # Act
+    frames = _frames(5, seed=4)
+    expected = [expected_net.activate(x) for x in frames]
+    actual = [object_under_test.activate(x) for x in frames]
+
+    # Assert
+    assert object_under_test.python_nodes
+    for expected_outputs, actual_outputs in zip(expected, actual):
+        assert actual_outputs == pytest.approx(expected_outputs, abs=1e-12)
+
+
+def test_batch_matches_separate_networks(config, genomes):
+    """
+    Networks evaluated as a batch, with members finishing along the way, give the same outputs
+    as when evaluated on their own
+    """
+    # Arrange
+    expected_nets = [neat.nn.recurrent.RecurrentNetwork.create(x, config) for x in genomes]
+    object_under_test = BatchedRecurrentNetwork([CompiledRecurrentNetwork.create(x, config) for x in genomes])
+    playing = list(range(len(genomes)))
+    rng = random.Random(5)
+
+    while playing:
+        frames = _frames(len(playing), seed=len(playing))
+
+        # Act
+        actual = object_under_test.activate(playing, frames)
+
+        # Assert
+        for member, x, actual_outputs in zip(playing, frames, actual):
+            assert actual_outputs == pytest.approx(expected_nets[member].activate(x), abs=1e-12)
+
+        for member in rng.sample(playing, min(len(playing), 3)):
+            playing.remove(member)
+            object_under_test.remove(member)
+
+
+def test_generated_matches_recurrent_network(config, genomes):
+    """
+    The generated network gives exactly the same outputs as neat's, including for functions that
+    aren't built into neat-python
+    """
+    # Arrange
+    config.genome_config.add_activation('softsign', lambda z: z / (1 + abs(z)))
+    for node in genomes[-1].nodes.values():
+        if node.key % 2:
+            node.activation = 'softsign'
+    frames = _frames(10, seed=6)
+
+    for genome in genomes:
+        expected_net = neat.nn.recurrent.RecurrentNetwork.create(genome, config)
+        object_under_test = GeneratedRecurrentNetwork.create(genome, config)
+
+        # Act
+        expected = [expected_net.activate(x) for x in frames]
+        actual = [object_under_test.activate(x) for x in frames]
+
+        # Assert
+        assert actual == expected
+
+
+@pytest.mark.parametrize('aggregation', ['max', 'min'])
+@pytest.mark.parametrize('activation', ['identity', 'sigmoid'])
+def test_generated_single_input_matches_recurrent_network(aggregation, activation):
+    """
+    A max or min node with a single input multiplies in the same order as neat's
+    """
+    # Arrange
+    rng = random.Random(9)
+    activation_function = neat.activations.ActivationFunctionSet().get(activation)
+    aggregation_function = neat.aggregations.AggregationFunctionSet().get(aggregation)
+    node_evals = [(i, activation_function, aggregation_function, rng.uniform(-30, 30), rng.uniform(-30, 30),
+                   [(-1, rng.uniform(-30, 30))]) for i in range(200)]
+    expected_net = neat.nn.recurrent.RecurrentNetwork([-1], list(range(200)), node_evals)
+    object_under_test = GeneratedRecurrentNetwork([-1], list(range(200)), node_evals)
+    frames = [[rng.uniform(-2, 2)] for _ in range(5)]
+
+    # Act
+    actual = [object_under_test.activate(x) for x in frames]
+
+    # Assert
+    assert actual == [expected_net.activate(x) for x in frames]
+
+
+def test_generated_state_round_trip(config, genomes):
+    """
+    Restoring a snapshot of the generated network's state resumes play from that point
+    """
+    # Arrange
+    object_under_test = GeneratedRecurrentNetwork.create(genomes[-1], config)
+    frames = _frames(6, seed=7)
+    for x in frames[:3]:
+        object_under_test.activate(x)
+    state = rollout_trie.network_state(object_under_test)
+    expected = [object_under_test.activate(x) for x in frames[3:]]
+
+    # Act
+    object_under_test.reset()
+    rollout_trie.restore_network_state(object_under_test, state)
+
+    # Assert
+    assert [object_under_test.activate(x) for x in frames[3:]] == expected
+
+
+def test_unbatchable_networks_are_activated_separately(config, genomes):
+    """
+    Networks that can't be merged are still evaluated together, one by one
+    """
+    # Arrange
+    nets = [GeneratedRecurrentNetwork.create(x, config) for x in genomes[:3]]
+    expected_nets = [neat.nn.recurrent.RecurrentNetwork.create(x, config) for x in genomes[:3]]
+    object_under_test = network.batch_networks(nets)
+    frames = _frames(3, seed=8)
+
+    # Act
+    object_under_test.remove(1)
+    actual = object_under_test.activate([0, 2], [frames[0], frames[2]])
+
+    # Assert
+    assert isinstance(network.batch_networks([CompiledRecurrentNetwork.create(genomes[0], config)]),
+                      BatchedRecurrentNetwork)
+    assert actual == [expected_nets[0].activate(frames[0]), expected_nets[2].activate(frames[2])]
@@ -0,0 +1,60 @@
+import random
+import numpy as np
+import pytest
+from crosscheck.info_utils import offline, possession
+from crosscheck.info_utils.wrapper import InfoAccumulator
+
+
+@pytest.fixture(name='infos')
+def _infos():
+    """
+    Infos where the puck goes loose, gets passed around and stolen, and the clock stops now and then
+    """
+    rng = random.Random(0)
+    infos = []
+    time = 600
+    while len(infos) < 5000:
+        info = {name: rng.randint(-100, 100) for name in possession.PLAYER_KEYS}
+        info.update({'player-w-puck-ice-x': 0, 'player-w-puck-ice-y': 0, 'puck-ice-y': rng.randint(-250, 250)})
+        if rng.random() < 0.7:
+            team = 'home' if rng.random() < 0.7 else 'away'
+            position = rng.choice(possession.POSITIONS[:3])
+            info['player-{}-{}-x'.format(team, position)] = 1
+            info['player-{}-{}-y'.format(team, position)] = -1
+        # The clock runs, or is stopped for a while
+        infos.extend([dict(info, time=time)] * rng.choice([1, 1, 1, 5, 150]))
+        if rng.random() < 0.3:
+            time -= 1
+    return infos
+
+
+@pytest.mark.parametrize('frames', [1, 3])
+def test_same_as_accumulator(infos, frames):
+    """
+    A whole trace at once gives exactly what the accumulator gives frame by frame
+    """
+    # Arrange
+    columns = {name: np.array([info[name] for info in infos], dtype=np.int16) for name in infos[0]}
+    accumulator = InfoAccumulator()
+    accumulator._possession_history = possession.PossessionHistory(capacity=len(infos))
+    play_stopped = []
+    for info in infos:
+        accumulator.info = info
+        accumulator.accumulate(frames)
+        play_stopped.append(accumulator.has_play_stopped_after_game_start)
+
+    # Act
+    actual = offline.accumulate_trace(columns, frames)
+
+    # Assert
+    assert actual.time_puck == dict(accumulator.time_puck)
+    assert actual.pass_completions == dict(accumulator.pass_completions)
+    assert actual.steal_count == dict(accumulator.steal_count)
+    assert actual.pass_attempts == dict(accumulator.pass_attempts)
+    assert actual.max_puck_y == accumulator.max_puck_y
+    assert actual.max_shooter_y == accumulator.max_shooter_y
+    assert actual.play_stopped.tolist() == play_stopped
+    assert any(play_stopped)
+    assert actual.possessions.tolist() == accumulator._possession_history.indices().tolist()
+    assert min(actual.steal_count.values()) > 0
+    assert min(actual.pass_attempts.values()) > 0
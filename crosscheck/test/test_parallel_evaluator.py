@@ -0,0 +1,113 @@
+import os
+import time
+import pytest
+from crosscheck.neat_.parallel import PersistentParallelEvaluator
+from crosscheck.neat_.utils import CustomParallelEvaluator
+
+
+class _Genome:
+    def __init__(self, key):
+        self.key = key
+        self.fitness = None
+        self.metascorekeeper = None
+
+
+def _evaluate(genome, config):
+    """
+    Stand-in for the trainer: hangs, crashes or raises for some genomes
+    """
+    if genome.key == config['hang']:
+        time.sleep(60)
+    if genome.key == config['crash']:
+        os._exit(1)
+    if genome.key == config['raise']:
+        raise RuntimeError("emulator fell over")
+    return genome.key * 10, None
+
+
+def test_failures_are_penalised():
+    """
+    Genomes that hang, crash their worker or raise get the lowest fitness, and the rest are unaffected
+    """
+    # Arrange
+    object_under_test = CustomParallelEvaluator(3, _evaluate, timeout=1, maxtasksperchild=2, retries=1,
+                                                stream=lambda x: None)
+    genomes = [(key, _Genome(key)) for key in range(1, 10)]
+
+    # Act
+    start = time.time()
+    object_under_test.evaluate(genomes, {'hang': 2, 'crash': 4, 'raise': 6})
+    elapsed = time.time() - start
+    object_under_test.close()
+
+    # Assert
+    expected = [10, 10, 30, 10, 50, 10, 70, 80, 90]
+    assert [genome.fitness for _, genome in genomes] == expected
+    assert genomes[1][1].metascorekeeper.eval_stats == {'failed_evaluations': 1}
+    assert elapsed < 30
+
+
+def test_pool_survives_across_generations():
+    """
+    The pool keeps working after workers were killed in an earlier generation
+    """
+    # Arrange
+    object_under_test = CustomParallelEvaluator(2, _evaluate, timeout=1, stream=lambda x: None)
+    genomes = [(key, _Genome(key)) for key in range(1, 6)]
+    object_under_test.evaluate(genomes, {'hang': 1, 'crash': 2, 'raise': None})
+
+    # Act
+    object_under_test.evaluate(genomes, {'hang': None, 'crash': None, 'raise': None})
+    object_under_test.close()
+
+    # Assert
+    assert [genome.fitness for _, genome in genomes] == [10, 20, 30, 40, 50]
+
+
+class _Trainer:
+    """
+    Stand-in for the trainer whose worker dies the first time (or every time) it gets a genome
+    """
+    def _eval_genome_parallel(self, genome, config):
+        if genome.key == config['crash']:
+            if config['always']:
+                os._exit(1)
+            marker = config['folder'] / 'crashed'
+            if not marker.exists():
+                marker.touch()
+                os._exit(1)
+        return genome.key * 10, None
+
+
+def test_dead_worker_is_replaced(tmp_path):
+    """
+    A genome whose worker died is evaluated again on another one, and the replacement keeps working
+    """
+    # Arrange
+    object_under_test = PersistentParallelEvaluator(2, _Trainer(), stream=lambda x: None)
+    object_under_test.poll_interval = 0.1
+    genomes = [(key, _Genome(key)) for key in range(1, 10)]
+
+    # Act
+    object_under_test.evaluate(genomes, {'crash': 4, 'always': False, 'folder': tmp_path})
+    object_under_test.evaluate(genomes[:4], {'crash': None, 'always': False, 'folder': tmp_path})
+    object_under_test.close()
+
+    # Assert
+    assert [genome.fitness for _, genome in genomes] == [key * 10 for key, _ in genomes]
+    assert (tmp_path / 'crashed').exists()
+
+
+def test_genome_that_always_kills_its_worker_fails():
+    """
+    Rather than hanging, the generation fails once a genome has killed its worker more than once
+    """
+    # Arrange
+    object_under_test = PersistentParallelEvaluator(2, _Trainer(), stream=lambda x: None)
+    object_under_test.poll_interval = 0.1
+    genomes = [(key, _Genome(key)) for key in range(1, 4)]
+
+    # Act / Assert
+    with pytest.raises(RuntimeError, match='died'):
+        object_under_test.evaluate(genomes, {'crash': 2, 'always': True, 'folder': None})
+    object_under_test.close()
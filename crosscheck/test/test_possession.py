@@ -0,0 +1,56 @@
+import random
+import numpy as np
+import pytest
+from crosscheck.info_utils import possession
+from crosscheck.info_utils.wrapper import InfoWrapper
+
+
+@pytest.fixture(name='infos')
+def _infos():
+    """
+    Infos where no one, one player, or several players (i.e. a tie) are close to the puck
+    """
+    rng = random.Random(0)
+    infos = []
+    for _ in range(300):
+        info = {name: rng.randint(0, 255) for name in possession.PLAYER_KEYS}
+        puck_x, puck_y = rng.randint(2, 253), rng.randint(2, 253)
+        info.update({'player-w-puck-ice-x': puck_x, 'player-w-puck-ice-y': puck_y})
+        for player_x_key in rng.sample(possession.PLAYER_KEYS[::2], rng.randint(0, 3)):
+            player_y_key = player_x_key[:-1] + 'y'
+            info[player_x_key] = puck_x + rng.randint(-2, 2)
+            info[player_y_key] = puck_y + rng.randint(-2, 2)
+        infos.append(info)
+    return infos
+
+
+def test_same_as_info_wrapper(infos):
+    """
+    The player with the puck is the same as InfoWrapper's, including who wins a tie
+    """
+    for info in infos:
+        # Act
+        actual = possession.player_w_puck(info)
+        index = possession.possessor(info)
+        vectorized = possession.possessors(info)
+
+        # Assert
+        assert actual == InfoWrapper(info).player_w_puck
+        assert possession.as_player_w_puck(index) == actual
+        assert possession.as_player_w_puck(int(vectorized)) == actual
+
+
+def test_trace_same_as_info_wrapper(infos):
+    """
+    A whole trace, as columns of unsigned bytes, is done at once with the same result as frame by frame
+    """
+    # Arrange
+    columns = {name: np.array([info[name] for info in infos], dtype=np.uint8) for name in infos[0]}
+
+    # Act
+    positions = possession.player_positions(columns)
+    actual = possession.possessors(columns)
+
+    # Assert
+    assert positions.shape == (len(infos), 2, 6, 2)
+    assert [possession.as_player_w_puck(x) for x in actual.tolist()] == [InfoWrapper(x).player_w_puck for x in infos]
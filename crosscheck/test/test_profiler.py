@@ -0,0 +1,61 @@
+import pickle
+import pytest
+from crosscheck.neat_.profiler import FrameProfiler, StageHistogram
+
+
+def test_percentile_within_a_bin():
+    """
+    Percentiles come from the log bins, so they are within a bin width of the exact value
+    """
+    # Arrange
+    object_under_test = StageHistogram()
+    samples = list(range(1000, 101000, 100))
+
+    # Act
+    for sample in samples:
+        object_under_test.add(sample)
+
+    # Assert
+    exact = sorted(samples)[int(0.95 * len(samples)) - 1]
+    assert exact <= object_under_test.percentile_ns(0.95) <= exact * 1.1
+    assert object_under_test.mean_ns == pytest.approx(sum(samples) / len(samples))
+
+
+def test_profilers_sum_like_stats():
+    """
+    Profilers from different workers add up to the same as one profiler that saw everything
+    """
+    # Arrange
+    first, second, expected = FrameProfiler(), FrameProfiler(), FrameProfiler()
+    for ns in (100, 2000, 30000):
+        first.stages['tick'].add(ns)
+        expected.stages['tick'].add(ns)
+    for ns in (5, 500):
+        second.stages['tick'].add(ns)
+        expected.stages['tick'].add(ns)
+    second.add_rollout(10, 1000)
+    expected.add_rollout(10, 1000)
+
+    # Act
+    actual = 0 + pickle.loads(pickle.dumps(first)) + second
+
+    # Assert
+    assert actual.rows() == expected.rows()
+    assert actual.frames_per_second == expected.frames_per_second
+    assert first.stages['tick'].count == 3
+
+
+def test_timed_records_calls():
+    """
+    A timed function returns the same as the function, and is counted under its stage
+    """
+    # Arrange
+    object_under_test = FrameProfiler()
+
+    # Act
+    timed = object_under_test.timed('activate', lambda x: x * 2)
+    actual = [timed(x) for x in range(5)]
+
+    # Assert
+    assert actual == [0, 2, 4, 6, 8]
+    assert object_under_test.stages['activate'].count == 5
@@ -0,0 +1,61 @@
+import json
+import pickle
+import struct
+import numpy as np
+import pytest
+from crosscheck.info_utils.ram_decoder import RamDecoder, DATA_JSON, GENESIS_RAM_BASE
+
+
+def _reference_info(ram: np.ndarray, swap_bytes: bool) -> dict:
+    """
+    Decode each variable on its own, one byte at a time
+    """
+    with open(DATA_JSON) as f:
+        variables = json.load(f)['info']
+
+    swap = 1 if swap_bytes else 0
+    info = {}
+    for name, spec in variables.items():
+        offset = spec['address'] - GENESIS_RAM_BASE
+        size = np.dtype(spec['type']).itemsize
+        raw = bytes(ram[(offset + i) ^ swap] for i in range(size))
+        value = struct.unpack({'>i2': '>h', '>u2': '>H', '|i1': 'b', '|u1': 'B'}[spec['type']], raw)[0]
+        if 'mask' in spec:
+            value &= spec['mask']
+        info[name] = value
+    return info
+
+
+@pytest.mark.parametrize('swap_bytes', [False, True])
+def test_matches_reference(swap_bytes):
+    """
+    Decoded values match a byte-by-byte decode for either RAM byte order
+    """
+    # Arrange
+    ram = np.random.RandomState(1).randint(0, 256, 1 << 16).astype(np.uint8)
+    expected = _reference_info(ram, swap_bytes)
+    object_under_test = RamDecoder.from_data_json()
+
+    # Act
+    object_under_test.calibrate(ram, expected)
+    actual = object_under_test.decode_info(ram)
+
+    # Assert
+    assert object_under_test.swap_bytes == swap_bytes
+    assert dict(actual) == expected
+    assert dict(pickle.loads(pickle.dumps(actual))) == expected
+
+
+def test_calibrate_mismatch():
+    """
+    Calibrating against an unrelated info fails loudly
+    """
+    # Arrange
+    ram = np.random.RandomState(2).randint(0, 256, 1 << 16).astype(np.uint8)
+    info = _reference_info(ram, False)
+    info['time'] += 1
+    object_under_test = RamDecoder.from_data_json()
+
+    # Act / Assert
+    with pytest.raises(ValueError, match='time'):
+        object_under_test.calibrate(ram, info)
@@ -0,0 +1,143 @@
+import json
+import pickle
+import random
+import numpy as np
+import pytest
+from crosscheck.info_utils.ram_decoder import DecodedInfo
+from crosscheck.info_utils import recording
+from crosscheck.info_utils.recording import Episode, EpisodeRecorder, read_episodes, write_episode
+
+
+class _Scorekeeper:
+    def __init__(self, frame):
+        self.buttons_pressed = ['A', 'UP'] if frame % 3 else []
+        self.score = frame * 1.5
+        self.score_vector = {'first': frame * 2.0} if frame < 5 else {'first': 10.0, 'later': -1.0}
+
+
+@pytest.fixture(name='_data_json')
+def _data_json_fixture(tmp_path):
+    filename = tmp_path / 'data.json'
+    filename.write_text(json.dumps({'info': {
+        'time': {'address': 1, 'type': '>u2'},
+        'x': {'address': 3, 'type': '>i2'},
+        'x-alias': {'address': 3, 'type': '>i2'},
+        'y-alias': {'address': 5, 'type': '>i2'},
+        'y': {'address': 7, 'type': '>i2'},
+    }}))
+    return filename
+
+
+def _infos(frames):
+    rng = random.Random(0)
+    infos = []
+    for frame in range(frames):
+        x = rng.randint(-300, 300)
+        infos.append({'time': 600 - frame, 'x': x, 'x-alias': x, 'y-alias': frame, 'y': 70000})
+    return infos
+
+
+def test_round_trip(tmp_path, _data_json):
+    """
+    Everything recorded reads back the same, with true aliases stored once
+    """
+    # Arrange
+    object_under_test = EpisodeRecorder(tmp_path / 'episodes', _data_json)
+    infos = _infos(20)
+
+    # Act
+    for frame, info in enumerate(infos):
+        object_under_test(None, 0, False, info, {'scorekeeper': _Scorekeeper(frame)})
+    object_under_test.end_episode({'scenario': 'test'})
+    episodes = list(read_episodes(tmp_path / 'episodes'))
+
+    # Assert
+    assert len(episodes) == 1
+    episode = episodes[0]
+    assert episode.metadata == {'scenario': 'test'}
+    assert episode.aliases == {'x-alias': 'x'}
+    assert [episode.info(frame) for frame in range(20)] == infos
+    assert episode['x'].dtype == np.int16
+    assert episode['y'].dtype == np.int32
+    assert episode.buttons_pressed(1) == ['A', 'UP']
+    assert episode.buttons_pressed(3) == []
+    assert list(episode['score']) == [frame * 1.5 for frame in range(20)]
+    assert np.isnan(episode.score_vector['later'][0])
+    assert episode.score_vector['first'][4] == 8.0
+
+
+def test_decoded_infos(tmp_path, _data_json):
+    """
+    Infos from a RamDecoder are recorded from their arrays
+    """
+    # Arrange
+    object_under_test = EpisodeRecorder(tmp_path, _data_json)
+    infos = _infos(10)
+    index = {name: i for i, name in enumerate(infos[0])}
+
+    # Act
+    for frame, info in enumerate(infos):
+        decoded = DecodedInfo(np.array(list(info.values()), dtype=np.int32), index)
+        object_under_test(None, 0, False, decoded, {'scorekeeper': _Scorekeeper(frame)})
+    filename = object_under_test.end_episode()
+
+    # Assert
+    episode = next(read_episodes(filename))
+    assert [episode.info(frame) for frame in range(10)] == infos
+
+
+def test_pickled_recorders_do_not_overwrite(tmp_path, _data_json):
+    """
+    Recorders unpickled for each genome (as pool workers receive the trainer) write separate files
+    """
+    # Arrange
+    original = EpisodeRecorder(tmp_path, _data_json)
+    infos = _infos(5)
+
+    # Act
+    filenames = []
+    for _ in range(3):
+        object_under_test = pickle.loads(pickle.dumps(original))
+        for frame, info in enumerate(infos):
+            object_under_test(None, 0, False, info, {'scorekeeper': _Scorekeeper(frame)})
+        filenames.append(object_under_test.end_episode())
+
+    # Assert
+    assert len(set(filenames)) == 3
+    assert len(list(read_episodes(tmp_path))) == 3
+
+
+def test_episodes_are_read_in_recorded_order(tmp_path, _data_json, monkeypatch):
+    """
+    Episodes of different processes come back in the order they were recorded, not by file name
+    """
+    # Arrange
+    object_under_test = EpisodeRecorder(tmp_path, _data_json)
+    infos = _infos(3)
+
+    # Act
+    for pid in (9, 10, 2):
+        monkeypatch.setattr(recording.os, 'getpid', lambda: pid)
+        for frame, info in enumerate(infos):
+            object_under_test(None, 0, False, info, {'scorekeeper': _Scorekeeper(frame)})
+        object_under_test.end_episode({'pid': pid})
+
+    # Assert
+    assert [x.metadata['pid'] for x in read_episodes(tmp_path)] == [9, 10, 2]
+
+
+def test_episode_without_frames(tmp_path):
+    """
+    The columns of an episode without frames are empty
+    """
+    # Arrange
+    filename = tmp_path / 'empty.ccrec'
+    write_episode(filename, {'score': np.zeros(0)}, {'score': 'score'}, {'aliases': {}, 'buttons': [], 'metadata': {}})
+
+    # Act
+    object_under_test = Episode(filename)
+
+    # Assert
+    assert object_under_test.frames == 0
+    assert len(object_under_test['score']) == 0
+    assert object_under_test.score_vector == {}
@@ -0,0 +1,89 @@
+from crosscheck.neat_.rollout_trie import RolloutTrie, Snapshot
+
+MB = 1024 * 1024
+
+
+def _snapshot(nbytes: int) -> Snapshot:
+    return Snapshot(b'\0' * nbytes, b'', 0)
+
+
+def test_snapshots_are_taken_at_intervals():
+    """
+    A snapshot is wanted every snapshot_interval frames, once per node, up to max_depth
+    """
+    # Arrange
+    object_under_test = RolloutTrie(memory_mb=1, max_depth=4, snapshot_interval=2)
+    node = object_under_test.root(('scenario',))
+    wanted = []
+
+    # Act
+    for depth in range(1, 6):
+        wanted.append(object_under_test.wants_snapshot(node, depth, ('A',)))
+        node = object_under_test.extend(node, depth, ('A',), {'frame': depth},
+                                        _snapshot(10) if wanted[-1] else None)
+
+    # Assert
+    assert wanted == [False, True, False, True, False]
+    assert node is None
+    root = object_under_test.root(('scenario',))
+    assert not object_under_test.wants_snapshot(root.children[('A',)], 2, ('A',))
+    assert object_under_test.wants_snapshot(root.children[('A',)], 2, ('B',))
+    assert not object_under_test.wants_snapshot(None, 2, ('A',))
+
+
+def test_extend_follows_existing_children():
+    """
+    Taking the same actions again walks the same path, and different actions branch off it
+    """
+    # Arrange
+    object_under_test = RolloutTrie(memory_mb=1)
+    root = object_under_test.root(('scenario',))
+    first = object_under_test.extend(root, 1, ('A',), {'frame': 1}, None)
+
+    # Act
+    same = object_under_test.extend(root, 1, ('A',), {'frame': 'ignored'}, None)
+    other = object_under_test.extend(root, 1, ('B',), {'frame': 1}, None)
+
+    # Assert
+    assert same is first
+    assert same.info == {'frame': 1}
+    assert other is not first
+    assert sorted(root.children) == [('A',), ('B',)]
+    assert object_under_test.root(('scenario',)) is root
+    assert object_under_test.root(('other',)) is not root
+
+
+def test_least_recently_used_snapshot_is_evicted():
+    """
+    Once over the memory cap, the snapshot used longest ago is dropped first
+    """
+    # Arrange
+    object_under_test = RolloutTrie(memory_mb=1)
+    root = object_under_test.root(('scenario',))
+    nodes = [object_under_test.extend(root, 1, (x,), {}, _snapshot(MB // 3)) for x in 'AB']
+    object_under_test.use(nodes[0])
+
+    # Act
+    nodes.append(object_under_test.extend(root, 1, ('C',), {}, _snapshot(MB // 3)))
+
+    # Assert
+    assert [x.snapshot is not None for x in nodes] == [True, False, True]
+    assert object_under_test.nbytes <= object_under_test.memory_cap
+
+
+def test_no_new_nodes_once_full():
+    """
+    When only frames are left to drop, rollouts stop being tracked rather than going over the cap
+    """
+    # Arrange
+    object_under_test = RolloutTrie(memory_mb=1)
+    root = object_under_test.root(('scenario',))
+    # An info with enough variables to count for more than the cap
+    object_under_test.extend(root, 1, ('A',), {x: 0 for x in range(MB // 64)}, None)
+
+    # Act
+    actual = object_under_test.extend(root, 1, ('B',), {}, None)
+
+    # Assert
+    assert actual is None
+    assert ('B',) not in root.children
@@ -0,0 +1,212 @@
+import pickle
+import random
+import pytest
+from crosscheck import scorekeeper
+from crosscheck.info_utils import possession
+from crosscheck.scorekeeper.game_scoring_1 import GameScoring1
+from crosscheck.scorekeeper.point_per_frame import PointPerFrame
+from crosscheck.scorekeeper.reward_spec import RewardSpec
+
+
+@pytest.fixture(name='trace')
+def _trace():
+    """
+    The home team carries the puck up ice, passing it around, and shoots late
+    """
+    rng = random.Random(3)
+    trace = []
+    for frame in range(1200):
+        info = {name: rng.randint(-100, 100) for name in possession.PLAYER_KEYS}
+        position = possession.POSITIONS[(frame // 40) % 3]
+        info.update({'player-home-{}-x'.format(position): 5, 'player-home-{}-y'.format(position): frame // 10,
+                     'player-w-puck-ice-x': 5, 'player-w-puck-ice-y': frame // 10,
+                     'puck-ice-x': rng.randint(-30, 30), 'puck-ice-y': frame // 10,
+                     'time': 600 - frame // 60, 'home-shots': frame // 900, 'home-goals': 0, 'away-goals': 0})
+        if frame % 40 >= 36:
+            # The puck is loose while being passed
+            info['player-w-puck-ice-x'] = 200
+        trace.append(info)
+    return trace
+
+
+@pytest.fixture(name='games')
+def _games():
+    """
+    Games where either team may get the puck, pass it around, lose it, shoot and score
+    """
+    rng = random.Random(4)
+    games = []
+    for _ in range(40):
+        trace = []
+        player = None
+        for frame in range(rng.randint(100, 1500)):
+            if rng.random() < 0.05:
+                player = rng.choice(list(possession.PLAYERS) + [None] * 4)
+            info = {name: rng.randint(-100, 100) for name in possession.PLAYER_KEYS}
+            info.update({'player-w-puck-ice-x': 200, 'player-w-puck-ice-y': frame // 10,
+                         'puck-ice-x': rng.randint(-30, 30), 'puck-ice-y': rng.randint(-260, 280),
+                         'time': 600 - frame // 50, 'home-shots': frame // 700, 'home-goals': int(frame > 1400),
+                         'away-goals': int(rng.random() < 0.001)})
+            if player is not None:
+                info.update({'player-w-puck-ice-x': 5, 'player-{}-{}-x'.format(*player): 5,
+                             'player-{}-{}-y'.format(*player): frame // 10})
+            trace.append(info)
+        games.append(trace)
+    return games
+
+
+def _play(scorekeeper: GameScoring1, trace: list, read_every_tick: bool) -> list:
+    scores = []
+    for frame, info in enumerate(trace):
+        scorekeeper.info = info
+        if frame % 4 == 0:
+            scorekeeper.buttons_pressed = ['B'] if frame % 3 else ['A', 'C']
+            scorekeeper.frames_per_tick = 4
+            scorekeeper.tick()
+            if read_every_tick:
+                scores.append(scorekeeper.score)
+        elif scorekeeper.check_done():
+            scorekeeper.frames_per_tick = frame % 4
+            scorekeeper.tick()
+        if scorekeeper.done:
+            break
+    return scores
+
+
+def test_deferred_score_same_as_every_tick(trace):
+    """
+    Reading the score only at the end gives the same score, score vector and stats as reading it
+    after every tick (e.g. for a movie overlay)
+    """
+    # Arrange
+    expected = GameScoring1()
+    scores = _play(expected, trace, read_every_tick=True)
+    object_under_test = GameScoring1()
+
+    # Act
+    _play(object_under_test, trace, read_every_tick=False)
+
+    # Assert
+    assert len(set(scores)) > 1
+    assert object_under_test.score == expected.score == scores[-1]
+    assert object_under_test.score_vector == expected.score_vector
+    assert object_under_test.stats == expected.stats
+
+
+def test_point_per_frame_counts_frames():
+    """
+    A scorekeeper that only implements _update() scores every frame it covered, including repeated ones
+    """
+    # Arrange
+    object_under_test = PointPerFrame()
+    object_under_test.frames_per_tick = 4
+
+    # Act
+    for _ in range(76):
+        object_under_test.tick()
+
+    # Assert
+    assert object_under_test.score == 304
+    assert object_under_test.done_reasons() == {'long': True}
+
+
+def test_score_is_of_latest_tick(trace):
+    """
+    Infos given after the last tick (e.g. frames played after done) don't change the score
+    """
+    # Arrange
+    object_under_test = GameScoring1()
+    _play(object_under_test, trace[:100], read_every_tick=False)
+    expected = GameScoring1()
+    _play(expected, trace[:100], read_every_tick=True)
+
+    # Act
+    object_under_test.info = dict(trace[100], **{'home-shots': 3, 'home-goals': 1})
+
+    # Assert
+    assert object_under_test.score == expected.score
+    assert object_under_test.score_vector['home-shots'] == 0
+
+
+def test_spec_same_as_game_scoring_1(games):
+    """
+    GameScoring1 written as a reward spec scores the same, has the same stats and is done at the same frame
+    """
+    rng = random.Random(5)
+    for trace in games:
+        # Arrange
+        expected = GameScoring1()
+        object_under_test = scorekeeper.string_to_class['game-scoring-1-spec']()
+
+        for frame, info in enumerate(trace):
+            # Act
+            buttons = [x for x in ('A', 'B', 'C', 'UP') if rng.random() < 0.5]
+            for x in (expected, object_under_test):
+                x.info = info
+                x.buttons_pressed = buttons
+                if frame % 4 == 0:
+                    x.frames_per_tick = 4
+                    x.tick()
+                else:
+                    x.check_done()
+
+            # Assert
+            assert object_under_test.done_reasons() == expected.done_reasons()
+            if frame % 50 == 0 or expected.done:
+                assert object_under_test.score == expected.score
+                assert object_under_test.score_vector == expected.score_vector
+                assert object_under_test.stats == expected.stats
+            if expected.done:
+                break
+
+
+def test_spec_pickles(trace):
+    """
+    A scorekeeper from a spec (e.g. in a rollout snapshot) picks up where it left off
+    """
+    # Arrange
+    spec = pickle.loads(pickle.dumps(scorekeeper.string_to_class['game-scoring-1-spec']))
+    expected = spec()
+    _play(expected, trace, read_every_tick=False)
+    object_under_test = spec()
+    _play(object_under_test, trace[:600], read_every_tick=False)
+
+    # Act
+    object_under_test = pickle.loads(pickle.dumps(object_under_test))
+    _play(object_under_test, trace[600:], read_every_tick=False)
+
+    # Assert
+    assert not expected.done_reasons().get('lost_faceoff')
+    assert expected.score > 0
+    assert spec.__name__ == 'game-scoring-1-spec'
+    assert spec.fitness_threshold() == GameScoring1.fitness_threshold()
+    assert object_under_test.score == expected.score
+    assert object_under_test.stats == expected.stats
+
+
+@pytest.mark.parametrize('term', [{'name': 'x', 'source': 'time', 'weight': 1, 'typo': 2},
+                                  {'name': 'x', 'source': 'time', 'when': {'source': 'time', 'above': 'import os'}},
+                                  {'name': 'x', 'source': 'time', 'when': {'source': 'time', 'above': 1, 'below': 2}},
+                                  {'name': 'x', 'source': 'time', 'when': {'source': 'time', 'above': float('nan')}},
+                                  {'name': 'x', 'source': 'time', 'when': {'source': 'time', 'below': float('inf')}},
+                                  {'name': 'x', 'source': 'time', 'cap': float('inf')},
+                                  {'name': 'x', 'source': 'time', 'weight': '2'}])
+def test_spec_is_checked(term):
+    """
+    Mistakes in a spec are reported when it's loaded
+    """
+    # Act / Assert
+    with pytest.raises(ValueError):
+        RewardSpec({'name': 'bad', 'fitness-threshold': 1, 'terms': [term]})
+
+
+@pytest.mark.parametrize('stat', [{'name': 'x', 'sources': ['time', 'home-shots']},
+                                  {'name': 'x', 'sources': 'time', 'format': '{}'},
+                                  {'name': 'x', 'sources': ['time'], 'format': 2}])
+def test_spec_stats_are_checked(stat):
+    """
+    Mistakes in the stats of a spec are reported when it's loaded
+    """
+    # Act / Assert
+    with pytest.raises(ValueError):
+        RewardSpec({'name': 'bad', 'fitness-threshold': 1, 'terms': [], 'stats': [stat]})
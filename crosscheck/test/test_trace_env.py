@@ -0,0 +1,224 @@
+import copy
+import dataclasses
+import pickle
+import random
+import neat
+import pytest
+pytest.importorskip('gym')
+from crosscheck import definitions, scorekeeper
+from crosscheck.bench import suite
+from crosscheck.neat_ import rollout_trie
+from crosscheck.bench.trace_env import BUTTONS, TraceEnv, TraceEnvFactory, synthetic_trace
+from crosscheck.game_env import SaveStateCache
+from crosscheck.info_utils.recording import EpisodeRecorder, read_episodes
+from crosscheck.scorekeeper.game_scoring_1 import GameScoring1
+
+
+class _SteeredTraceEnv(TraceEnv):
+    """
+    Trace env where the puck goes deeper for every frame that UP was held, so that the game depends
+    on the actions. The emulator state covers both
+    """
+    def __init__(self, traces):
+        super().__init__(traces)
+        self.depth = 0
+        self.em = self
+
+    def reset(self):
+        self.depth = 0
+        return super().reset()
+
+    def step(self, action):
+        self.depth += int(bool(action[BUTTONS.index('UP')]))
+        observation, reward, done, info = super().step(action)
+        info['puck-ice-y'] += self.depth
+        return observation, reward, done, info
+
+    def get_state(self) -> tuple:
+        return self.frame, self.depth
+
+    def set_state(self, state: tuple):
+        self.frame, self.depth = state
+
+
+class _SteeredTraceEnvFactory:
+    def __init__(self, frames: int):
+        self.envs = {}
+        self.traces = {'synthetic': synthetic_trace(frames, seed=1)}
+
+    def __call__(self, index: int = 0) -> TraceEnv:
+        if index not in self.envs:
+            self.envs[index] = _SteeredTraceEnv(self.traces)
+        return self.envs[index]
+
+
+@pytest.fixture(name='_trace', scope='module')
+def _trace_fixture():
+    return synthetic_trace()
+
+
+def test_synthetic_trace_is_played_to_the_end(_trace):
+    """
+    The synthetic game has no reason to stop early, so it lasts until the clock runs down
+    """
+    # Arrange
+    env = TraceEnv({'synthetic': _trace})
+    env.load_state('anything.state')
+    env.reset()
+    scorekeeper = GameScoring1()
+    frames = 0
+
+    # Act
+    while not scorekeeper.done:
+        _, _, _, scorekeeper.info = env.step([0] * len(env.buttons))
+        scorekeeper.tick()
+        frames += 1
+
+    # Assert
+    assert [key for key, value in scorekeeper.done_reasons().items() if value] == ['timeout']
+    assert frames <= len(_trace)
+    assert scorekeeper.score > 0
+
+
+def test_emulator_state_round_trip(_trace):
+    """
+    Restoring the emulator state resumes the replay from the same frame
+    """
+    # Arrange
+    env = TraceEnv({'synthetic': _trace})
+    env.reset()
+    for _ in range(10):
+        env.step([])
+    state = env.unwrapped.em.get_state()
+    expected = env.step([])[3]
+
+    # Act
+    env.unwrapped.em.set_state(state)
+    actual = env.step([])[3]
+
+    # Assert
+    assert actual == expected
+
+
+@pytest.mark.parametrize('network', ['generated', 'compiled'])
+def test_lockstep_matches_serial_evaluation(network):
+    """
+    Genomes played side by side end up with the same fitness and stats as when played one by one,
+    whether or not their networks can be merged
+    """
+    # Arrange
+    trainer = suite.bench_trainer(TraceEnvFactory(frames=300, seed=1))
+    trainer.network = network
+    trainer.lockstep_size = 3
+    trainer.frame_budget = 500
+    config = suite.neat_config(trainer, 7)
+    random.seed(0)
+    genomes = list(neat.Population(config).population.items())
+    expected = copy.deepcopy(genomes)
+    # Both start with an empty save state cache, so that they count the same hits and misses
+    SaveStateCache.clear()
+    trainer._eval_genomes(expected, config)
+    SaveStateCache.clear()
+
+    # Act
+    trainer._eval_genomes_lockstep(genomes, config)
+
+    # Assert
+    for (_, expected_genome), (_, actual_genome) in zip(expected, genomes):
+        assert actual_genome.fitness == expected_genome.fitness
+        assert actual_genome.metascorekeeper.eval_stats == expected_genome.metascorekeeper.eval_stats
+        assert actual_genome.metascorekeeper.scenario_scores == expected_genome.metascorekeeper.scenario_scores
+
+
+def test_resumed_rollouts_match_played_from_scratch(monkeypatch):
+    """
+    Genomes that skip ahead along the rollout trie end up with the same fitness and stats as when
+    every frame is played
+    """
+    # Arrange
+    trainer = suite.bench_trainer(_SteeredTraceEnvFactory(frames=300))
+    config = suite.neat_config(trainer, 5)
+    random.seed(0)
+    genomes = list(neat.Population(config).population.items())
+    # Slightly different networks take the same actions for a while, then part ways
+    for key, genome in list(genomes):
+        for offset in (100, 200):
+            clone = copy.deepcopy(genome)
+            clone.key = key + offset
+            for connection in clone.connections.values():
+                connection.weight += random.gauss(0, 0.1 * offset / 100)
+            genomes.append((clone.key, clone))
+    expected = copy.deepcopy(genomes)
+    trainer._eval_genomes(expected, config)
+    monkeypatch.setattr(rollout_trie._Singleton, 'trie', None)
+    trainer.rollout_trie_settings = {'memory-mb': 64, 'max-depth': 600, 'snapshot-interval': 10}
+
+    # Act
+    trainer._eval_genomes(genomes, config)
+
+    # Assert
+    saved = 0
+    for (_, expected_genome), (_, actual_genome) in zip(expected, genomes):
+        assert actual_genome.fitness == expected_genome.fitness
+        assert actual_genome.metascorekeeper.scenario_scores == expected_genome.metascorekeeper.scenario_scores
+        assert actual_genome.metascorekeeper.stats == expected_genome.metascorekeeper.stats
+        saved += actual_genome.metascorekeeper.eval_stats.get('prefix_frames_saved', 0)
+    assert saved > 0
+
+
+def test_recorded_genomes_have_their_own_files(tmp_path):
+    """
+    Each genome evaluated through a pickled trainer (as the 'pool' evaluator does) keeps its episode
+    """
+    # Arrange
+    trainer = suite.bench_trainer(TraceEnvFactory(seed=1))
+    trainer.listeners.append(EpisodeRecorder(tmp_path, data_json=None))
+    config = suite.neat_config(trainer, 3)
+    random.seed(0)
+    genomes = list(neat.Population(config).population.items())
+
+    # Act
+    for _, genome in genomes:
+        pickle.loads(pickle.dumps(trainer))._eval_genome_parallel(genome, config)
+
+    # Assert
+    episodes = list(read_episodes(tmp_path))
+    assert len(episodes) == len(genomes) * len(trainer.scenarios)
+
+
+def test_eval_identity_of_spec_scorekeeper():
+    """
+    A scenario judged by a reward spec can be memoized, and isn't confused with the hand-written scorekeeper
+    """
+    # Arrange
+    trainer = suite.bench_trainer(TraceEnvFactory(seed=1))
+    expected = trainer._eval_identity()
+    spec = scorekeeper.string_to_class['game-scoring-1-spec']
+    trainer.scenarios = [dataclasses.replace(x, scorekeeper=spec) for x in trainer.scenarios]
+
+    # Act
+    actual = trainer._eval_identity()
+
+    # Assert
+    assert [x[2] for x in actual[0]] == ['game-scoring-1-spec'] * len(trainer.scenarios)
+    assert actual != expected
+
+
+def test_eval_identity_keeps_save_state_folders():
+    """
+    Save states with the same file name in different folders don't share evaluations
+    """
+    # Arrange
+    trainer = suite.bench_trainer(TraceEnvFactory(seed=1))
+    scenario = trainer.scenarios[0]
+    folder = definitions.SAVE_STATE_FOLDER
+    trainer.scenarios = [dataclasses.replace(scenario, save_state=folder / '01' / '01-faceoff.state')]
+    expected = trainer._eval_identity()
+    trainer.scenarios = [dataclasses.replace(scenario, save_state=folder / '02-2p' / '01-faceoff.state')]
+
+    # Act
+    actual = trainer._eval_identity()
+
+    # Assert
+    assert actual[0][0][1] == '02-2p/01-faceoff.state'
+    assert actual != expected